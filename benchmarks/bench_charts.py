@@ -0,0 +1,101 @@
+"""
+Benchmark building the candlestick chart of the */candles widgets.
+
+Compares the previous path (``go.Figure`` with ``create_base_layout`` and
+``apply_config_to_figure``, then ``to_json`` and ``json.loads``) with
+``routes.charts.build_candlestick_figure``, which reuses the per-theme
+layout and writes the trace arrays directly.
+
+Usage:
+    python -m benchmarks.bench_charts --bars 5000 --repeat 20
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from core.plotly_config import apply_config_to_figure, create_base_layout, get_chart_colors
+from core.serialization import dumps
+from routes.charts import build_candlestick_figure
+
+
+def make_bars(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum() * 0.5
+    idx = pd.bdate_range("2000-01-03", periods=n)
+    return pd.DataFrame({
+        "open": close + rng.standard_normal(n) * 0.1,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": rng.integers(100, 10_000, n).astype(float),
+    }, index=pd.Index(idx.date, name="date"))
+
+
+def legacy_figure(data: pd.DataFrame, theme: str = "dark") -> dict:
+    """The figure routes.charts.get_chart_data built before the direct builder."""
+    colors = get_chart_colors(theme)
+    figure = go.Figure(
+        layout=create_base_layout(
+            x_title="Date",
+            y_title="Price",
+            y_dtype="$,.4f",
+            theme=theme
+        )
+    )
+    figure.add_candlestick(
+        x=data.index,
+        open=data['open'],
+        high=data['high'],
+        low=data['low'],
+        close=data['close'],
+        name="Price",
+        increasing_line_color=colors['positive'],
+        decreasing_line_color=colors['negative']
+    )
+    figure.update_layout(
+        yaxis=dict(
+            rangemode="nonnegative",
+            zeroline=True,
+            zerolinewidth=2,
+            zerolinecolor="lightgrey"
+        ),
+    )
+    figure = apply_config_to_figure(figure, theme=theme)
+    return json.loads(figure.to_json())
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(bars: int = 5000, repeat: int = 20) -> dict:
+    frame = make_bars(bars)
+    assert build_candlestick_figure(frame) == legacy_figure(frame)
+    # Both paths include encoding the response body
+    legacy = best_of(lambda: dumps(legacy_figure(frame)), repeat)
+    fast = best_of(lambda: dumps(build_candlestick_figure(frame)), repeat)
+    return {
+        "benchmark": "candlestick_figure",
+        "bars": bars,
+        "legacy_seconds": round(legacy, 5),
+        "direct_seconds": round(fast, 5),
+        "speedup": round(legacy / fast, 1),
+        "payload_bytes": len(dumps(build_candlestick_figure(frame))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.bars, args.repeat), indent=2))
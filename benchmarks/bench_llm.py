@@ -0,0 +1,167 @@
+"""
+Benchmark the time to first token of the chat agents.
+
+Compares a client built per conversation turn (how ``/a/chatglm`` used to
+call the LLM) with the shared client of ``core.llm``. By default both talk to
+a local OpenAI compatible stub that waits ``--handshake-ms`` on every new
+connection, standing in for the TCP and TLS handshakes with a remote
+provider, then ``--first-token-ms`` before streaming ``--chunks`` tokens.
+Pass ``--base-url``, ``--api-key`` and ``--model`` to measure a real
+endpoint instead.
+
+``--concurrency`` turns run at a time, ``--turns`` in total per mode. The
+report has the p50/p95 time to first token and time to last token of each
+mode.
+
+Usage:
+    python -m benchmarks.bench_llm --turns 50 --handshake-ms 150
+    python -m benchmarks.bench_llm --base-url https://openrouter.ai/api/v1 --api-key $OPENROUTER_API_KEY \\
+        --model deepseek/deepseek-chat-v3-0324 --turns 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import openai
+
+
+class StubLLM(ThreadingHTTPServer):
+    """Streams ``chunks`` chat completion chunks, with a delay per connection and before the first chunk."""
+
+    daemon_threads = True
+
+    def __init__(self, handshake: float, first_token: float, chunks: int):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.handshake = handshake
+        self.first_token = first_token
+        self.chunks = chunks
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubLLM
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+        time.sleep(self.server.handshake)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.first_token)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(self.server.chunks):
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                     "choices": [{"index": 0, "delta": {"content": f"token{i} "}, "finish_reason": None}]}
+            self._write(f"data: {json.dumps(chunk)}\n\n")
+        self._write("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def turn(client: openai.AsyncOpenAI, model: str) -> tuple:
+    """Return the seconds to the first and to the last token of one streamed answer."""
+    started = time.perf_counter()
+    first = None
+    stream = await client.chat.completions.create(
+        model=model, messages=[{"role": "user", "content": "总结一下腾讯控股的业绩"}], stream=True,
+    )
+    async for event in stream:
+        if first is None and event.choices and event.choices[0].delta.content:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+async def per_request(base_url: str, api_key: str, model: str) -> tuple:
+    client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key)
+    try:
+        return await turn(client, model)
+    finally:
+        await client.close()
+
+
+async def shared(model: str) -> tuple:
+    from core.llm import openai_client
+    return await turn(openai_client(), model)
+
+
+async def measure(call, turns: int, concurrency: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            return await call()
+
+    results = await asyncio.gather(*(one() for _ in range(turns)))
+    ttft = np.array([r[0] for r in results]) * 1000
+    total = np.array([r[1] for r in results]) * 1000
+    return {
+        "ttft_p50_ms": round(float(np.percentile(ttft, 50)), 1),
+        "ttft_p95_ms": round(float(np.percentile(ttft, 95)), 1),
+        "total_p50_ms": round(float(np.percentile(total, 50)), 1),
+        "total_p95_ms": round(float(np.percentile(total, 95)), 1),
+        "turns": turns,
+    }
+
+
+async def run(base_url: str, api_key: str, model: str, turns: int, concurrency: int) -> dict:
+    os.environ["BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = api_key
+    from core.llm import close_llm_clients
+
+    results = {"per_request": await measure(lambda: per_request(base_url, api_key, model), turns, concurrency)}
+    try:
+        results["shared"] = await measure(lambda: shared(model), turns, concurrency)
+    finally:
+        await close_llm_clients()
+    results["ttft_speedup"] = round(results["per_request"]["ttft_p50_ms"] / results["shared"]["ttft_p50_ms"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--handshake-ms", type=float, default=150, help="Stub delay per new connection")
+    parser.add_argument("--first-token-ms", type=float, default=200, help="Stub delay before the first token")
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--base-url", help="OpenAI compatible endpoint to measure instead of the stub")
+    parser.add_argument("--api-key", default="stub")
+    parser.add_argument("--model", default="stub")
+    args = parser.parse_args()
+
+    stub = None
+    base_url = args.base_url
+    if not base_url:
+        stub = StubLLM(args.handshake_ms / 1000, args.first_token_ms / 1000, args.chunks)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        base_url = stub.url
+    report = asyncio.run(run(base_url, args.api_key, args.model, args.turns, args.concurrency))
+    report["params"] = vars(args)
+    if stub is not None:
+        report["connections"] = stub.connections
+        stub.shutdown()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,116 @@
+"""
+Benchmark the cold start of the app.
+
+Reports, from fresh interpreters:
+
+- the import time of ``main`` and of its slowest modules (``python -X importtime``);
+- the time from launching ``uvicorn main:app`` until ``/health`` answers,
+  until the first ``/widgets.json`` is served and until the background
+  warm-up of OpenBB, akshare, plotly and magentic has finished.
+
+The environment variables of ``core.config`` must be set (or present in
+``.env``), as for running the server.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 3 --top 15
+    python -m benchmarks.bench_startup --no-warmup
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str = "main") -> dict:
+    """Return the cumulative import time in seconds of every module imported by ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = max(times.get(name.strip(), 0.0), int(cumulative) / 1e6)
+    return times
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str, timeout: float = 1.0):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status, response.read()
+    except OSError:
+        return None, b""
+
+
+def wait_for(predicate, started: float, deadline: float = 120.0, interval: float = 0.01) -> float:
+    while time.perf_counter() - started < deadline:
+        if predicate():
+            return time.perf_counter() - started
+        time.sleep(interval)
+    raise TimeoutError("server did not become ready")
+
+
+def time_to_first_request(warmup: bool = True) -> dict:
+    """Launch uvicorn and time readiness, the first registry request and the warm-up."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, STARTUP_WARMUP="1" if warmup else "0")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_for(lambda: get(f"{base}/health")[0] == 200, started)
+        get(f"{base}/widgets.json")
+        widgets = time.perf_counter() - started
+        result = {
+            "health_seconds": round(health, 3),
+            "first_widgets_json_seconds": round(widgets, 3),
+        }
+        if warmup:
+            done = wait_for(lambda: json.loads(get(f"{base}/health")[1] or b"{}")
+                            .get("warmup", {}).get("done", False), started, interval=0.05)
+            result["warmup_done_seconds"] = round(done, 3)
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def run(repeat: int = 3, top: int = 15, warmup: bool = True) -> dict:
+    imports = [import_times() for _ in range(repeat)]
+    best = {name: min(sample.get(name, float("inf")) for sample in imports) for name in imports[0]}
+    slowest = sorted(((name, seconds) for name, seconds in best.items() if name != "main"),
+                     key=lambda item: item[1], reverse=True)[:top]
+    starts = [time_to_first_request(warmup) for _ in range(repeat)]
+    return {
+        "benchmark": "startup",
+        "import_main_seconds": round(best["main"], 3),
+        "slowest_imports": {name: round(seconds, 3) for name, seconds in slowest},
+        "server": {key: min(start[key] for start in starts) for key in starts[0]},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-warmup", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.top, not args.no_warmup), indent=2))
@@ -0,0 +1,210 @@
+"""
+Benchmark suite over a synthetic OpenBB at production scale.
+
+The app runs in-process against ``benchmarks.fake_openbb`` (10k symbols,
+20 years of daily bars per symbol, full statements) and an LLM client that
+streams a fixed answer, so only this code is measured. Every scenario is
+timed once cold (empty caches and bar store) and ``--repeat`` times warm:
+
+- ``/udf/search``, ``/udf/history`` (daily and weekly over 20 years);
+- ``get_tickers`` and ``/cn/tickers`` over the whole universe;
+- ``get_chart_data`` and ``/hk/candles`` over 20 years;
+- the ``/hk`` and ``/cn`` income, balance and cash flow routes;
+- resampling and UDF encoding of 1 year of 1-minute bars;
+- the ``/a/chatglm/query`` SSE stream, without and with a widget of this
+  backend, whose data is fetched in-process.
+
+Results are printed (or written with ``--output``) as JSON. ``--compare``
+checks them against an earlier result file and exits with status 1 when a
+warm p50 regressed by more than ``--tolerance``.
+
+Usage:
+    python -m benchmarks.bench_suite --output bench.json
+    python -m benchmarks.bench_suite --symbols 2000 --repeat 5 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks import fake_openbb
+
+API_KEY = "benchmark"
+HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+
+
+def configure(data_dir: str):
+    """Point the app at a scratch bar store and keep background work out of the timings."""
+    for key in ("AGENT_HOST_URL", "OPENROUTER_API_KEY", "FMP_API_KEY", "AKSHARE_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["APP_API_KEY"] = API_KEY
+    os.environ["BAR_STORE_PATH"] = os.path.join(data_dir, "bars")
+    os.environ["STARTUP_WARMUP"] = "0"
+    os.environ["UNIVERSE_REFRESH_SECONDS"] = "0"
+    os.environ["TRACE_SLOW_MS"] = "0"
+
+
+class FakeLLM:
+    """Stands in for ``openai.AsyncOpenAI``, streaming ``chunks`` deltas."""
+
+    chunks = 500
+
+    def __init__(self, **_):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **_):
+        async def stream():
+            for i in range(self.chunks):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=f"token{i} "))])
+        return stream()
+
+
+def summarize(cold: float, warm: list) -> dict:
+    warm_ms = np.array(warm) * 1000
+    return {
+        "cold_ms": round(cold * 1000, 3),
+        "p50_ms": round(float(np.percentile(warm_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(warm_ms, 95)), 3),
+        "min_ms": round(float(warm_ms.min()), 3),
+        "mean_ms": round(float(warm_ms.mean()), 3),
+        "runs": len(warm),
+    }
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    status = getattr(result, "status_code", 200)
+    if status >= 400:
+        raise RuntimeError(f"request failed with {status}: {result.text[:200]}")
+    return elapsed
+
+
+def scenarios(client, years: int) -> dict:
+    from core.resample import resample_bars
+    from core.serialization import encode_udf_history
+    from fin_data.profile import get_tickers
+    from routes.charts import get_chart_data
+
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    span = {"from": int(datetime.combine(start, datetime.min.time()).timestamp()),
+            "to": int(datetime.combine(end, datetime.min.time()).timestamp())}
+    dates = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+    statement = {"period": "annual", "limit": 10}
+    minute_bars = fake_openbb.make_minute_bars(250)
+    chat = {"messages": [{"role": "human", "content": "总结一下腾讯控股的业绩"}]}
+    widget = {"origin": "OpenBB HKA", "widget_id": "hk/income", "name": "利润表", "description": "",
+              "params": [{"name": "ticker", "type": "endpoint", "description": "", "current_value": "00700"},
+                         {"name": "period", "type": "text", "description": "", "current_value": "annual"},
+                         {"name": "limit", "type": "number", "description": "", "current_value": 10}]}
+    widget_chat = {**chat, "widgets": {"primary": [widget]}}
+
+    def get(path, **params):
+        return lambda: client.get(path, params=params, headers=HEADERS)
+
+    return {
+        "udf_search": get("/udf/search", query="6000", limit=30),
+        "udf_search_name": get("/udf/search", query="科技", limit=30),
+        "udf_history_daily": get("/udf/history", symbol="600000", resolution="D", **span),
+        "udf_history_weekly": get("/udf/history", symbol="600001", resolution="W", **span),
+        "get_tickers_cn": lambda: get_tickers(),
+        "cn_tickers": get("/cn/tickers"),
+        "get_chart_data": lambda: get_chart_data("600002", "day", 1, dates["start_date"], dates["end_date"]),
+        "hk_candles": get("/hk/candles", ticker="00700", interval="day", interval_multiplier=1, **dates),
+        "hk_prices": get("/hk/prices", ticker="00700", interval="day", interval_multiplier=1, max_points=1000, **dates),
+        **{f"{market}_{name}": get(f"/{market}/{name}", ticker=ticker, **statement)
+           for market, ticker in (("hk", "00700"), ("cn", "600000"))
+           for name in ("income", "balance", "cash_flow")},
+        "resample_minute_5m": lambda: resample_bars(minute_bars, "minute", 5, "SSE"),
+        "encode_udf_minute": lambda: encode_udf_history(minute_bars),
+        "agent_sse": lambda: client.post("/a/chatglm/query", json=chat),
+        "agent_sse_widget": lambda: client.post("/a/chatglm/query", json=widget_chat),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(symbols: int = 10_000, years: int = 20, repeat: int = 20, latency: float = 0.0) -> dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        configure(data_dir)
+        fake_openbb.install(symbols=symbols, years=years, latency=latency)
+        from fastapi.testclient import TestClient
+
+        import main
+        import core.llm
+        core.llm.openai.AsyncOpenAI = FakeLLM
+
+        results = {}
+        with TestClient(main.app) as client:
+            from core.universe import universe
+            universe.refresh()
+            for name, scenario in scenarios(client, years).items():
+                cold = timed(scenario)
+                warm = [timed(scenario) for _ in range(repeat)]
+                results[name] = summarize(cold, warm)
+
+    return {
+        "benchmark": "suite",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"symbols": symbols, "years": years, "repeat": repeat, "latency": latency},
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return the scenarios whose warm p50 is more than ``tolerance`` slower than in ``baseline``."""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"]
+        result["baseline_p50_ms"] = before["p50_ms"]
+        result["ratio"] = round(ratio, 2)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every fake provider call sleeps")
+    parser.add_argument("--output", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    report = run(args.symbols, args.years, args.repeat, args.latency)
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(1 if regressions else 0)
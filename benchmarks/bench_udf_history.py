@@ -0,0 +1,80 @@
+"""
+Benchmark the /udf/history response encoding.
+
+Compares the previous encoder (per-element ``series_list`` comprehension,
+FastAPI ``jsonable_encoder`` and ``json.dumps``) with the NumPy/orjson
+encoder in ``core.serialization`` on a large minute-bar frame.
+
+Usage:
+    python -m benchmarks.bench_udf_history --bars 1000000 --repeat 3
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from core.serialization import encode_udf_history
+
+
+def make_bars(n: int, nan_ratio: float = 0.01) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum() * 0.05
+    frame = pd.DataFrame({
+        "open": close + rng.standard_normal(n) * 0.01,
+        "high": close + 0.05,
+        "low": close - 0.05,
+        "close": close,
+        "volume": rng.integers(100, 10_000, n).astype(float),
+    }, index=pd.date_range("2020-01-02 09:30", periods=n, freq="min"))
+    frame.iloc[rng.random(n) < nan_ratio, 0] = np.nan
+    return frame
+
+
+def legacy_encode(resampled: pd.DataFrame) -> bytes:
+    """The encoder /udf/history used before core.serialization."""
+    t = (resampled.index.astype('int64') // 10**9).astype(int).tolist()
+
+    def series_list(n):
+        if n in resampled.columns:
+            return [None if pd.isna(x) else float(x) for x in resampled[n].tolist()]
+        return [None] * len(resampled)
+
+    content = {"s": "ok", "t": t, "o": series_list("open"), "h": series_list("high"),
+               "l": series_list("low"), "c": series_list("close"), "v": series_list("volume")}
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(bars: int = 1_000_000, repeat: int = 3) -> dict:
+    frame = make_bars(bars)
+    assert json.loads(legacy_encode(frame.head(1000))) == json.loads(encode_udf_history(frame.head(1000)))
+    legacy = best_of(lambda: legacy_encode(frame), repeat)
+    fast = best_of(lambda: encode_udf_history(frame), repeat)
+    return {
+        "benchmark": "udf_history_encode",
+        "bars": bars,
+        "legacy_seconds": round(legacy, 4),
+        "numpy_orjson_seconds": round(fast, 4),
+        "speedup": round(legacy / fast, 1),
+        "payload_bytes": len(encode_udf_history(frame)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.bars, args.repeat), indent=2))
@@ -0,0 +1,199 @@
+"""
+A synthetic ``openbb.obb`` for benchmarks.
+
+``install`` puts a fake ``openbb`` module in ``sys.modules`` before the app
+is imported, in the spirit of the ``SimpleNamespace`` fakes of
+``tests/test_tradingview.py``, but at production scale: a universe of
+thousands of CN and HK symbols, decades of daily bars per symbol and full
+financial statements. Data is generated deterministically from the symbol,
+so runs are comparable. ``latency`` adds a fixed delay to every call to
+model the upstream round trip; with ``upstream`` every call instead makes
+a request to a stub HTTP server (see ``benchmarks.stub_upstream``), which
+adds its latency and fails calls at its error rate.
+
+``install_akshare`` points the direct akshare calls of the app (xueqiu
+quotes and company facts) at the same stand-in.
+"""
+import sys
+import time
+import types
+import urllib.error
+import urllib.request
+import zlib
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+NAMES = ("银行", "证券", "保险", "地产", "能源", "科技", "医药", "汽车", "消费", "电力")
+
+
+def make_universe(n: int) -> pd.DataFrame:
+    """Return ``n`` symbols: 40% SSE, 30% SZSE and 30% HKEX."""
+    sse, szse = int(n * 0.4), int(n * 0.3)
+    hkex = n - sse - szse
+    symbols = ([f"{600000 + i:06d}" for i in range(sse)]
+               + [f"{1 + i:06d}" for i in range(szse)]
+               + [f"{1 + i:05d}" for i in range(hkex)])
+    exchanges = ["SSE"] * sse + ["SZSE"] * szse + ["HKEX"] * hkex
+    names = [f"{NAMES[i % len(NAMES)]}{i:05d}控股" for i in range(n)]
+    return pd.DataFrame({"symbol": symbols, "name": names, "exchange": exchanges})
+
+
+def _rng(symbol: str) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(symbol.encode("utf-8")))
+
+
+def make_daily_bars(symbol: str, start: date, end: date) -> pd.DataFrame:
+    """Return business-day bars between ``start`` and ``end``, indexed by date."""
+    idx = pd.bdate_range(start, end)
+    n = len(idx)
+    rng = _rng(symbol)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.005, n)),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.integers(10_000, 1_000_000, n),
+    }, index=pd.Index(idx.date, name="date"))
+
+
+def make_minute_bars(days: int, symbol: str = "600000") -> pd.DataFrame:
+    """Return ``days`` trading days of end-stamped SSE minute bars (240 per day)."""
+    sessions = pd.bdate_range(end=date.today(), periods=days)
+    minutes = np.r_[np.arange(571, 691), np.arange(781, 901)]
+    stamps = (sessions.values[:, None] + minutes[None, :].astype("timedelta64[m]")).ravel()
+    n = len(stamps)
+    rng = _rng(symbol)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.0005, n)),
+        "high": close * 1.001,
+        "low": close * 0.999,
+        "close": close,
+        "volume": rng.integers(100, 10_000, n),
+    }, index=pd.DatetimeIndex(stamps, name="date"))
+
+
+def make_statement(statement: str, symbol: str, period: str, limit: int) -> pd.DataFrame:
+    """Return ``limit`` statements with the columns of both the CN and HK providers."""
+    rng = _rng(f"{statement}{symbol}{period}")
+    step = 365 if period == "annual" else 91
+    ends = [date.today() - timedelta(days=step * (i + 1)) for i in range(limit)]
+    values = rng.uniform(1e8, 1e11, (limit, 6))
+    columns = {
+        "income": ["总营收", "净利润", "经营收入总额", "营业额", "股东应占溢利", "OPERATE_INCOME"],
+        "balance": ["股东权益", "股东权益合计", "总权益", "总负债", "总资产", "少数股东权益"],
+        "cash": ["营业性现金流", "投资性现金流", "融资性现金流", "现金净额", "期初现金", "期末现金"],
+    }[statement]
+    frame = pd.DataFrame(values, columns=columns)
+    frame.insert(0, "fiscal_period", "FY" if period == "annual" else "Q")
+    frame.insert(0, "period_ending", [d.isoformat() for d in ends])
+    return frame
+
+
+def call_upstream(upstream: str, function: str):
+    """Make one request to the stub upstream; raise if it answers with an error."""
+    try:
+        with urllib.request.urlopen(f"{upstream}/{function}", timeout=30) as response:
+            response.read()
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"upstream {function} failed with {e.code}") from None
+
+
+def _delay(upstream: str, latency: float, function: str):
+    if upstream:
+        call_upstream(upstream, function)
+    elif latency:
+        time.sleep(latency)
+
+
+class _Result:
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self._frame
+
+
+def install(symbols: int = 10_000, years: int = 20, latency: float = 0.0, upstream: str = "") -> SimpleNamespace:
+    """
+    Install the fake ``openbb`` module and return its ``obb``.
+
+    Args:
+        symbols (int): Size of the symbol universe.
+        years (int): Years of daily history available per symbol.
+        latency (float): Seconds every provider call sleeps.
+        upstream (str): Base URL of a stub upstream server called instead
+            of sleeping, e.g. ``"http://127.0.0.1:8765"``.
+    """
+    universe = make_universe(symbols)
+    first_day = date.today() - timedelta(days=365 * years)
+
+    def call(function, build):
+        def fake(*args, **kwargs):
+            _delay(upstream, latency, function)
+            return _Result(build(*args, **kwargs))
+        return fake
+
+    def historical(symbol, start_date=None, end_date=None, **_):
+        start = max(date.fromisoformat(start_date) if start_date else first_day, first_day)
+        end = date.fromisoformat(end_date) if end_date else date.today()
+        return make_daily_bars(symbol, start, end)
+
+    def metrics(symbol, **_):
+        rng = _rng(symbol)
+        return pd.DataFrame({"证券简称": [f"{symbol}控股"], "market_cap": [rng.uniform(1e9, 1e12)], "pe_ratio": [rng.uniform(5, 50)],
+                             "dividend_yield": [rng.uniform(0, 0.08)]})
+
+    def news(symbol, limit=20, **_):
+        return pd.DataFrame({"date": pd.date_range(end=date.today(), periods=limit).astype(str),
+                             "title": [f"{symbol} 新闻 {i}" for i in range(limit)],
+                             "url": [f"https://example.com/{symbol}/{i}" for i in range(limit)]})
+
+    def statement(name):
+        return lambda symbol, period="annual", limit=5, **_: make_statement(name, symbol, period, limit)
+
+    obb = SimpleNamespace(
+        equity=SimpleNamespace(
+            search=call("equity.search", lambda *a, **k: universe),
+            price=SimpleNamespace(historical=call("equity.price.historical", historical)),
+            fundamental=SimpleNamespace(
+                income=call("equity.fundamental.income", statement("income")),
+                balance=call("equity.fundamental.balance", statement("balance")),
+                cash=call("equity.fundamental.cash", statement("cash")),
+                metrics=call("equity.fundamental.metrics", metrics),
+            ),
+        ),
+        news=SimpleNamespace(company=call("news.company", news)),
+    )
+    module = types.ModuleType("openbb")
+    module.obb = obb
+    sys.modules["openbb"] = module
+    return obb
+
+
+def install_akshare(latency: float = 0.0, upstream: str = ""):
+    """Replace the akshare calls the app makes directly with synthetic data."""
+    import akshare
+    from openbb_akshare.utils import ak_compare_company_facts
+
+    def spot_xq(symbol, **_):
+        _delay(upstream, latency, "xueqiu.spot")
+        rng = _rng(symbol)
+        price = rng.uniform(1, 500)
+        items = {"代码": symbol, "名称": f"{symbol}控股", "现价": price, "52周最低": price * 0.7,
+                 "52周最高": price * 1.3, "成交量": int(rng.integers(1e5, 1e8)),
+                 "股息率(TTM)": rng.uniform(0, 8), "股息(TTM)": rng.uniform(0, 5)}
+        return pd.DataFrame({"item": list(items), "value": list(items.values())})
+
+    def compare_company(symbol, *_, **__):
+        _delay(upstream, latency, "compare_company")
+        rng = _rng(symbol)
+        return pd.DataFrame({"metric": ["ROE", "毛利率", "净利率"], symbol: rng.uniform(0, 40, 3),
+                             "行业平均": rng.uniform(0, 40, 3)})
+
+    akshare.stock_individual_spot_xq = spot_xq
+    ak_compare_company_facts.fetch_compare_company = compare_company
@@ -0,0 +1,297 @@
+"""
+End-to-end load test of the app behind uvicorn against a stub upstream.
+
+A stub upstream (``benchmarks.stub_upstream``) stands in for akshare and
+xueqiu with ``--latency-ms``, ``--jitter-ms`` and ``--error-rate``. For
+each ``--workers`` count the app is started with ``uvicorn --workers`` on
+the synthetic provider (``benchmarks.loadtest_app``) and driven by
+``--users`` levels of simulated users for ``--duration`` seconds each. A
+user keeps repeating a dashboard session:
+
+- open ``templates/hk.json`` or ``templates/cn.json`` for a random symbol of
+  that market and load every widget of each tab concurrently, with the
+  widget defaults and a one-year date range;
+- scroll the TradingView chart back through ``--scroll-years`` of daily
+  history, one ``/udf/history`` request per year;
+- type the symbol into the TradingView search, one ``/udf/search`` per key;
+
+with an exponential think time of mean ``--think-ms`` between actions.
+
+Per user level the report has the throughput and the p50/p95/p99 latency
+and error count of every endpoint. The saturation point of a worker count
+is the last level before throughput stops growing by ``--min-gain``, the
+p95 exceeds ``--slo-p95-ms`` or more than ``--max-error-rate`` of the
+requests fail.
+
+Usage:
+    python -m benchmarks.loadtest --workers 1,2,4 --users 10,25,50,100 --duration 30 --output load.json
+    python -m benchmarks.loadtest --workers 2 --users 20 --latency-ms 150 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_suite import git_revision
+from benchmarks.fake_openbb import make_universe
+from benchmarks.stub_upstream import start_stub
+
+API_KEY = "loadtest"
+HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+TEMPLATES = Path(__file__).resolve().parent.parent / "templates"
+MARKETS = {"hk": ("HKEX",), "cn": ("SSE", "SZSE")}
+
+
+class Recorder:
+    """Latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint: str, elapsed: float, ok: bool):
+        self.latencies[endpoint].append(elapsed)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        def stats(latencies, errors):
+            ms = np.array(latencies) * 1000
+            return {
+                "requests": len(latencies),
+                "errors": errors,
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                "p95_ms": round(float(np.percentile(ms, 95)), 1),
+                "p99_ms": round(float(np.percentile(ms, 99)), 1),
+            }
+
+        endpoints = {name: stats(values, self.errors[name]) for name, values in sorted(self.latencies.items())}
+        everything = [value for values in self.latencies.values() for value in values]
+        total = stats(everything, sum(self.errors.values())) if everything else {"requests": 0, "errors": 0, "rps": 0}
+        return {"total": total, "endpoints": endpoints}
+
+
+async def request(client: httpx.AsyncClient, recorder: Recorder, path: str, **params):
+    started = time.perf_counter()
+    try:
+        response = await client.get(path, params=params)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    recorder.add(path, time.perf_counter() - started, ok)
+
+
+def widget_params(widget: dict, ticker: str, state: dict) -> dict:
+    """The query a dashboard sends for ``widget``: its defaults, the template state and ``ticker``."""
+    end = date.today()
+    params = {}
+    for param in widget.get("params", []):
+        name = param["paramName"]
+        if param.get("type") == "endpoint":
+            params[name] = ticker
+        elif param.get("type") == "date":
+            params[name] = (end if name.startswith("end") else end - timedelta(days=365)).isoformat()
+        elif param.get("value") is not None:
+            params[name] = param["value"]
+    params.update((state or {}).get("params", {}))
+    return params
+
+
+async def dashboard(client, recorder, widgets: dict, template: dict, ticker: str, think):
+    for tab in template["tabs"].values():
+        calls = [request(client, recorder, f"/{widgets[item['i']]['endpoint']}",
+                         **widget_params(widgets[item["i"]], ticker, item.get("state")))
+                 for item in tab["layout"] if item["i"] in widgets]
+        await asyncio.gather(*calls)
+        await think()
+
+
+async def scroll_history(client, recorder, ticker: str, years: int, think):
+    to = int(time.time())
+    for _ in range(years):
+        since = to - 365 * 86400
+        await request(client, recorder, "/udf/history", symbol=ticker, resolution="D", to=to, countback=300,
+                      **{"from": since})
+        to = since
+        await think()
+
+
+async def search(client, recorder, ticker: str, think):
+    for size in range(1, min(len(ticker), 4) + 1):
+        await request(client, recorder, "/udf/search", query=ticker[:size], limit=30)
+        await think()
+
+
+async def user(client, recorder, widgets: dict, templates: dict, symbols: dict, deadline: float,
+               think_ms: float, scroll_years: int):
+    rng = random.Random()
+
+    async def think():
+        await asyncio.sleep(rng.expovariate(1000 / think_ms) if think_ms else 0)
+
+    while time.monotonic() < deadline:
+        market = rng.choice(list(templates))
+        ticker = rng.choice(symbols[market])
+        await dashboard(client, recorder, widgets, templates[market], ticker, think)
+        await scroll_history(client, recorder, ticker, scroll_years, think)
+        await search(client, recorder, ticker, think)
+
+
+async def run_level(base_url: str, users: int, duration: float, widgets: dict, templates: dict,
+                    symbols: dict, think_ms: float, scroll_years: int) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users * 4, max_keepalive_connections=users * 4)
+    async with httpx.AsyncClient(base_url=base_url, headers=HEADERS, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(user(client, recorder, widgets, templates, symbols, deadline, think_ms, scroll_years)
+                               for _ in range(users)))
+        elapsed = time.monotonic() - started
+    return {"users": users, "seconds": round(elapsed, 1), **recorder.summary(elapsed)}
+
+
+def saturation(levels: list, slo_p95_ms: float, max_error_rate: float, min_gain: float) -> dict:
+    """Return the last healthy user level and why the next one was not."""
+    best, reason = None, None
+    for level in levels:
+        total = level["total"]
+        if not total["requests"]:
+            reason = "no requests completed"
+        elif total["errors"] / total["requests"] > max_error_rate:
+            reason = f"error rate above {max_error_rate:.1%}"
+        elif total["p95_ms"] > slo_p95_ms:
+            reason = f"p95 above {slo_p95_ms:g} ms"
+        elif best and total["rps"] < best["total"]["rps"] * (1 + min_gain):
+            reason = f"throughput grew less than {min_gain:.0%}"
+        if reason:
+            break
+        best = level
+    return {"users": best["users"] if best else 0, "rps": best["total"]["rps"] if best else 0, "reason": reason}
+
+
+def wait_healthy(base_url: str, server: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("uvicorn did not become healthy")
+
+
+def start_app(workers: int, port: int, upstream: str, data_dir: str, symbols: int, years: int, log) -> subprocess.Popen:
+    env = dict(os.environ,
+               APP_API_KEY=API_KEY,
+               LOADTEST_UPSTREAM=upstream,
+               LOADTEST_SYMBOLS=str(symbols),
+               LOADTEST_YEARS=str(years),
+               BAR_STORE_PATH=os.path.join(data_dir, f"bars-{workers}"),
+               STARTUP_WARMUP="0",
+               TRACE_SLOW_MS="0")
+    command = [sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(command, env=env, cwd=TEMPLATES.parent, stdout=log, stderr=subprocess.STDOUT)
+
+
+def run(workers: list, users: list, duration: float = 30, think_ms: float = 500, scroll_years: int = 5,
+        symbols: int = 10_000, years: int = 20, latency_ms: float = 50, jitter_ms: float = 50,
+        error_rate: float = 0.0, port: int = 8100, slo_p95_ms: float = 2000, max_error_rate: float = 0.01,
+        min_gain: float = 0.1, server_log: str = "") -> dict:
+    templates = {market: json.loads((TEMPLATES / f"{market}.json").read_text(encoding="utf-8"))
+                 for market in MARKETS}
+    universe = make_universe(symbols)
+    market_symbols = {market: universe.loc[universe["exchange"].isin(exchanges), "symbol"].tolist()
+                      for market, exchanges in MARKETS.items()}
+    stub = start_stub(latency=latency_ms / 1000, jitter=jitter_ms / 1000, error_rate=error_rate)
+    base_url = f"http://127.0.0.1:{port}"
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as data_dir, \
+                open(server_log or os.devnull, "a", encoding="utf-8") as log:
+            for count in workers:
+                server = start_app(count, port, stub.url, data_dir, symbols, years, log)
+                try:
+                    wait_healthy(base_url, server)
+                    widgets = httpx.get(f"{base_url}/widgets.json", headers=HEADERS, timeout=30).json()
+                    levels = []
+                    for level in users:
+                        levels.append(asyncio.run(run_level(base_url, level, duration, widgets, templates,
+                                                            market_symbols, think_ms, scroll_years)))
+                        print(f"workers={count} users={level} rps={levels[-1]['total']['rps']} "
+                              f"p95={levels[-1]['total'].get('p95_ms')}ms errors={levels[-1]['total']['errors']}",
+                              file=sys.stderr)
+                    results.append({"workers": count, "levels": levels,
+                                    "saturation": saturation(levels, slo_p95_ms, max_error_rate, min_gain)})
+                finally:
+                    server.terminate()
+                    server.wait(30)
+    finally:
+        upstream_stats = stub.stats()
+        stub.shutdown()
+
+    return {
+        "benchmark": "loadtest",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {"users": users, "duration": duration, "think_ms": think_ms, "scroll_years": scroll_years,
+                   "symbols": symbols, "years": years, "latency_ms": latency_ms, "jitter_ms": jitter_ms,
+                   "error_rate": error_rate, "slo_p95_ms": slo_p95_ms, "max_error_rate": max_error_rate,
+                   "min_gain": min_gain},
+        "upstream": upstream_stats,
+        "results": results,
+    }
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int_list, default=[1, 2, 4], help="Comma separated uvicorn worker counts")
+    parser.add_argument("--users", type=int_list, default=[10, 25, 50, 100], help="Comma separated user levels")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per user level")
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean think time between actions")
+    parser.add_argument("--scroll-years", type=int, default=5)
+    parser.add_argument("--symbols", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Extra random upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream calls failing with 503")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--slo-p95-ms", type=float, default=2000)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Throughput growth that counts as scaling")
+    parser.add_argument("--server-log", help="Append the uvicorn output to this file")
+    parser.add_argument("--output", help="Write the results to this file")
+    args = parser.parse_args()
+
+    report = run(args.workers, args.users, args.duration, args.think_ms, args.scroll_years, args.symbols,
+                 args.years, args.latency_ms, args.jitter_ms, args.error_rate, args.port, args.slo_p95_ms,
+                 args.max_error_rate, args.min_gain, args.server_log)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,23 @@
+"""
+The app wired to the synthetic provider, for ``uvicorn --workers``.
+
+Each worker process imports this module, which installs
+``benchmarks.fake_openbb`` (calling the stub upstream at
+``LOADTEST_UPSTREAM``) before importing ``main``. Started by
+``benchmarks.loadtest``; can also be run by hand:
+
+    LOADTEST_UPSTREAM=http://127.0.0.1:8765 uvicorn benchmarks.loadtest_app:app --workers 4
+"""
+import os
+
+from benchmarks import fake_openbb
+
+for _key in ("AGENT_HOST_URL", "APP_API_KEY", "OPENROUTER_API_KEY", "FMP_API_KEY", "AKSHARE_API_KEY"):
+    os.environ.setdefault(_key, "loadtest")
+
+_upstream = os.getenv("LOADTEST_UPSTREAM", "")
+fake_openbb.install(symbols=int(os.getenv("LOADTEST_SYMBOLS", "10000")),
+                    years=int(os.getenv("LOADTEST_YEARS", "20")), upstream=_upstream)
+fake_openbb.install_akshare(upstream=_upstream)
+
+from main import app  # noqa: E402
@@ -0,0 +1,93 @@
+"""
+A local stand-in for the akshare / xueqiu upstreams.
+
+Every ``GET /<function>`` waits ``latency`` plus up to ``jitter`` seconds
+and answers ``200``, or ``503`` with probability ``error_rate``. The
+synthetic data itself is generated by ``benchmarks.fake_openbb`` in the app
+process; the stub only adds the network round trip and the failures. ``GET
+/stats`` returns the calls and errors per function.
+
+Usage:
+    python -m benchmarks.stub_upstream --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class StubUpstream(ThreadingHTTPServer):
+    """HTTP server with configurable latency and error rate."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.05, jitter: float = 0.0,
+                 error_rate: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubUpstream
+
+    def do_GET(self):
+        function = self.path.lstrip("/")
+        if function == "stats":
+            self._send(200, self.server.stats())
+            return
+        time.sleep(self.server.latency + random.random() * self.server.jitter)
+        failed = random.random() < self.server.error_rate
+        with self.server._lock:
+            self.server.calls[function] += 1
+            if failed:
+                self.server.errors[function] += 1
+        self._send(503 if failed else 200, {"function": function})
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port: int = 0, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0) -> StubUpstream:
+    """Start a stub upstream on a background thread and return it (``shutdown()`` stops it)."""
+    server = StubUpstream(("127.0.0.1", port), latency, jitter, error_rate)
+    threading.Thread(target=server.serve_forever, name="stub-upstream", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    stub = StubUpstream(("127.0.0.1", args.port), args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate)
+    print(f"Stub upstream on {stub.url}")
+    stub.serve_forever()
@@ -1,4 +1,5 @@
 import logging
+import time
 from datetime import date
 from typing import AsyncGenerator, Callable
 
@@ -10,7 +11,6 @@ from magentic import (
     chatprompt,
     prompt,
 )
-from magentic.chat_model.openrouter_chat_model import OpenRouterChatModel
 from magentic.chat_model.retry_chat_model import RetryChatModel
 from openbb_ai.helpers import (  # type: ignore[import-untyped]
     citations,
@@ -26,6 +26,10 @@ from openbb_ai.models import (  # type: ignore[import-untyped]
     WidgetParam,
 )
 
+from .answer_cache import answer_key, cached_answer
+from .llm import OPENROUTER_MODEL, openrouter_model, stream_ttft
+from .metrics import LLM_TTFT
+from .sse import coalesced
 from .utils import generate_id, is_last_message, sanitize_message
 
 SYSTEM_PROMPT = """
@@ -70,12 +74,7 @@ def make_llm(chat_messages: list) -> Callable:
     @chatprompt(
         SystemMessage(SYSTEM_PROMPT),
         *chat_messages,
-        model=OpenRouterChatModel(
-            model="deepseek/deepseek-chat-v3-0324",
-            temperature=0.7,
-            provider_sort="latency",
-            require_parameters=True,
-        ),
+        model=openrouter_model(),
         max_retries=5,
     )
     async def _llm() -> AsyncStreamedStr | str: ...  # type: ignore[empty-body]
@@ -87,24 +86,35 @@ async def execution_loop(request: QueryRequest) -> AsyncGenerator[BaseSSE, None]
 
     chat_messages: list = []
     citations_list: list = []
+    # (role, content) of the conversation, for the answer cache key
+    conversation: list = []
     for message in request.messages:
         if message.role == "ai":
             if hasattr(message, "content") and isinstance(message.content, str):
+                conversation.append((message.role, message.content))
                 chat_messages.append(
                     AssistantMessage(content=await sanitize_message(message.content))
                 )
         elif message.role == "human":
             if hasattr(message, "content") and isinstance(message.content, str):
+                conversation.append((message.role, message.content))
                 user_message_content = await sanitize_message(message.content)
                 chat_messages.append(UserMessage(content=user_message_content))
                             
     _llm = make_llm(chat_messages)
-    llm_result = await _llm()
 
-    if isinstance(llm_result, str):
-        yield message_chunk(text=llm_result)
-    else:
-        async for chunk in llm_result:
-            yield message_chunk(text=chunk)
+    async def answer() -> AsyncGenerator[str, None]:
+        started = time.perf_counter()
+        llm_result = await _llm()
+        if isinstance(llm_result, str):
+            LLM_TTFT.labels("openrouter").observe(time.perf_counter() - started)
+            yield llm_result
+        else:
+            async for chunk in stream_ttft("openrouter", llm_result, started):
+                yield chunk
+
+    key = answer_key("openrouter", OPENROUTER_MODEL, conversation)
+    async for chunk in coalesced("openrouter", cached_answer(key, answer)):
+        yield message_chunk(text=chunk)
     if len(citations_list) > 0:
         yield citations(citations_list)
@@ -0,0 +1,85 @@
+"""
+Opt-in cache of agent answers.
+
+Analysts ask the same question about the same widget data many times a
+day. With ``ANSWER_CACHE_SECONDS`` above 0, a streamed answer is stored
+under a key of the agent, the model, the normalized conversation and a hash
+of the attached widget data, and an identical request within that many
+seconds replays the stored chunks instead of calling the LLM. The chunks are
+replayed as they were streamed, so the ``message_chunk`` events the
+Workspace receives are the same as for a fresh answer. Answers that fail
+or are cut off are not stored.
+
+Hits and misses are reported as the ``answers`` cache on ``/metrics``.
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from typing import AsyncIterator, Callable, Iterable, Optional, Tuple
+
+from core.cache import MISSING, TTLCache
+
+ANSWER_CACHE_SECONDS = float(os.getenv("ANSWER_CACHE_SECONDS", "0"))
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", "512"))
+
+_answers = TTLCache(ttl=ANSWER_CACHE_SECONDS, maxsize=ANSWER_CACHE_MAXSIZE, name="answers")
+
+_SPACES = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.。？！…]+$")
+
+
+def normalize(text: str) -> str:
+    """Normalize a message for matching: NFKC, case-folded, whitespace collapsed, final punctuation dropped."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _TRAILING.sub("", _SPACES.sub(" ", text).strip())
+
+
+def answer_key(agent: str, model: Optional[str], messages: Iterable[Tuple[str, str]],
+               data: Iterable[str] = ()) -> str:
+    """
+    Return the cache key of an answer.
+
+    Args:
+        agent (str): The agent, e.g. ``"chatglm"``.
+        model (str): The LLM model.
+        messages (Iterable[tuple[str, str]]): ``(role, content)`` of the
+            human and AI messages, in order.
+        data (Iterable[str]): The widget data given to the LLM; its order
+            does not matter.
+    """
+    fingerprint = sorted(hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest() for content in data)
+    payload = [agent, model, [[role, normalize(content)] for role, content in messages], fingerprint]
+    return hashlib.blake2b(json.dumps(payload, ensure_ascii=False).encode("utf-8"), digest_size=20).hexdigest()
+
+
+async def cached_answer(key: str, answer: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """
+    Yield the chunks of a cached answer, or of ``answer()`` and cache them.
+
+    ``answer`` is only called on a miss, so a hit makes no LLM request. With
+    the cache disabled this is ``answer()`` itself.
+    """
+    if ANSWER_CACHE_SECONDS <= 0:
+        async for chunk in answer():
+            yield chunk
+        return
+
+    chunks = _answers.get(key, MISSING)
+    if chunks is not MISSING:
+        for chunk in chunks:
+            yield chunk
+        return
+
+    chunks = []
+    async for chunk in answer():
+        chunks.append(chunk)
+        yield chunk
+    # Only reached when the whole answer was streamed
+    _answers.set(key, tuple(chunks), ANSWER_CACHE_SECONDS)
+
+
+def clear_answers():
+    """Drop every cached answer."""
+    _answers.clear()
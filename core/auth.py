@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from core.config import config
+from core.tracing import span
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -13,10 +14,16 @@ def validate_api_key(token: str, api_key: str) -> bool:
     return False
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    if not validate_api_key(token=token, api_key=config.app_api_key):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or missing API key",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return token
+    with span("auth"):
+        if not validate_api_key(token=token, api_key=config.app_api_key):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing API key",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return token
+
+def websocket_authorized(websocket) -> bool:
+    """Validate the API key of a WebSocket, sent as a bearer header or a ``token`` query parameter."""
+    token = websocket.headers.get("authorization") or websocket.query_params.get("token")
+    return validate_api_key(token=token, api_key=config.app_api_key)
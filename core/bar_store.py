@@ -0,0 +1,401 @@
+"""
+Local OHLCV bar store.
+
+Daily bars fetched from ``obb.equity.price.historical`` are kept in one
+Parquet file per symbol under ``$DATA_FOLDER_PATH/bars``. The file metadata
+records which date ranges have already been fetched, so a request only
+downloads the dates it is missing, merges them into the file and serves the
+requested slice locally.
+
+Dates from today onwards are never marked as covered, because today's bar
+keeps changing until the market closes. They are refetched once the last
+fetch is older than ``BAR_STORE_LIVE_SECONDS``. A range the provider
+returned no bars for is only marked as covered once it ended more than
+``BAR_STORE_EMPTY_GRACE_DAYS`` ago, so an empty answer caused by a rate
+limit or a hiccup is asked again, while the holidays and the dates before a
+listing are not fetched forever.
+
+The version of a symbol only changes when its stored bars change, so it can
+be used as a validator for anything derived from them.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Directory that holds the per-symbol Parquet files
+BAR_STORE_PATH = os.getenv("BAR_STORE_PATH", os.path.join(os.getenv("DATA_FOLDER_PATH", "data"), "bars"))
+
+# Number of symbols kept in memory after they were read from disk
+MEMORY_SYMBOLS = 256
+
+# Seconds fetched ranges that include today are served without refetching
+LIVE_SECONDS = float(os.getenv("BAR_STORE_LIVE_SECONDS", "30"))
+
+# Days after which a range that returned no bars is taken to have none
+EMPTY_GRACE_DAYS = int(os.getenv("BAR_STORE_EMPTY_GRACE_DAYS", "7"))
+
+DateRange = Tuple[date, date]
+
+_UNSAFE_CHARS = re.compile(r"[^0-9A-Za-z._-]")
+
+
+def to_date(value: Union[str, date, datetime, pd.Timestamp]) -> date:
+    """Convert a ``YYYY-MM-DD`` string, date or datetime to a date."""
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def merge_ranges(ranges: List[DateRange]) -> List[DateRange]:
+    """Merge overlapping or adjacent inclusive date ranges."""
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """
+    Return the parts of ``[start, end]`` that are not in ``covered``.
+
+    Weekends at either end of a gap are trimmed and gaps that only span a
+    weekend are dropped, since there are no bars to fetch for them.
+    """
+    gaps = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start - timedelta(days=1)))
+        cursor = max(cursor, c_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+
+    trimmed = []
+    for g_start, g_end in gaps:
+        while g_start <= g_end and g_start.weekday() >= 5:
+            g_start += timedelta(days=1)
+        while g_end >= g_start and g_end.weekday() >= 5:
+            g_end -= timedelta(days=1)
+        if g_start <= g_end:
+            trimmed.append((g_start, g_end))
+    return trimmed
+
+
+def fetch_historical(symbol: str, start_date: date, end_date: date) -> Optional[pd.DataFrame]:
+    """Fetch daily bars for ``symbol`` from the akshare provider."""
+    from openbb import obb
+    from core.metrics import provider_call
+    with provider_call("akshare", "obb.equity.price.historical"):
+        return obb.equity.price.historical(
+            symbol=symbol,
+            start_date=start_date.isoformat(),
+            end_date=end_date.isoformat(),
+            provider="akshare"
+        ).to_dataframe()
+
+
+def as_date_index(frame: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of ``frame`` indexed by ``date`` objects if every bar is at midnight."""
+    frame = frame.copy()
+    index = frame.index
+    if isinstance(index, pd.DatetimeIndex) and len(index) and (index == index.normalize()).all():
+        frame.index = pd.Index(index.date, name=index.name)
+    return frame
+
+
+@dataclass
+class _Entry:
+    frame: pd.DataFrame
+    covered: List[DateRange]
+    version: int
+    # Recently fetched ranges, treated as covered until ``fresh_until``
+    fresh: List[DateRange] = field(default_factory=list)
+    fresh_until: float = 0.0
+
+    def gaps(self, start: date, end: date) -> List[DateRange]:
+        covered = self.covered
+        if self.fresh and time.monotonic() < self.fresh_until:
+            covered = merge_ranges(covered + self.fresh)
+        return missing_ranges(covered, start, end)
+
+
+class BarStore:
+    """
+    Per-symbol bar files with incremental gap filling.
+
+    Args:
+        root (str): Directory for the Parquet files.
+        fetcher (Callable): ``fetcher(symbol, start_date, end_date)`` returning
+            the provider bars for an inclusive date range.
+        live_seconds (float): Seconds a fetch of today's bars is reused.
+    """
+
+    def __init__(self, root: str = BAR_STORE_PATH, fetcher: Callable = fetch_historical, live_seconds: float = LIVE_SECONDS):
+        self.root = root
+        self._fetcher = fetcher
+        self._live_seconds = live_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._entries_lock = threading.Lock()
+        self._symbol_locks = {}
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{_UNSAFE_CHARS.sub('_', symbol)}.parquet")
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._entries_lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _load(self, symbol: str) -> _Entry:
+        with self._entries_lock:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                self._entries.move_to_end(symbol)
+                return entry
+
+        path = self._path(symbol)
+        entry = _Entry(pd.DataFrame(), [], 0)
+        if os.path.exists(path):
+            try:
+                import pyarrow.parquet as pq
+                table = pq.read_table(path)
+                meta = json.loads((table.schema.metadata or {}).get(b"bar_store", b"{}"))
+                entry = _Entry(
+                    table.to_pandas(),
+                    [(to_date(s), to_date(e)) for s, e in meta.get("covered", [])],
+                    int(meta.get("version", 0)),
+                )
+            except Exception as e:
+                logger.warning(f"Discarding unreadable bar file {path}: {e}")
+        self._remember(symbol, entry)
+        return entry
+
+    def _remember(self, symbol: str, entry: _Entry):
+        with self._entries_lock:
+            self._entries[symbol] = entry
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > MEMORY_SYMBOLS:
+                self._entries.popitem(last=False)
+
+    def _save(self, symbol: str, entry: _Entry):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(entry.frame)
+        meta = dict(table.schema.metadata or {})
+        meta[b"bar_store"] = json.dumps({
+            "covered": [[s.isoformat(), e.isoformat()] for s, e in entry.covered],
+            "version": entry.version,
+        }).encode()
+        path = self._path(symbol)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table.replace_schema_metadata(meta), tmp_path)
+        os.replace(tmp_path, path)
+
+    def version(self, symbol: str) -> int:
+        """Return a number that changes whenever the stored bars change."""
+        return self._load(symbol).version
+
+    def sync(
+        self,
+        symbol: str,
+        start_date: Union[str, date, datetime],
+        end_date: Union[str, date, datetime]
+    ) -> int:
+        """
+        Fetch the missing bars of ``[start_date, end_date]`` and return the version.
+
+        The returned version identifies the bars ``get_bars`` serves for the
+        range until more data arrives.
+        """
+        entry, _ = self._sync(symbol, to_date(start_date), to_date(end_date))
+        return entry.version
+
+    def _sync(self, symbol: str, start: date, end: date) -> Tuple[_Entry, Optional[Exception]]:
+        error = None
+        with self._lock(symbol):
+            entry = self._load(symbol)
+            gaps = entry.gaps(start, end)
+            if gaps:
+                entry, error = self._fill(symbol, entry, gaps)
+        return entry, error
+
+    def get_bars(
+        self,
+        symbol: str,
+        start_date: Union[str, date, datetime],
+        end_date: Union[str, date, datetime]
+    ) -> pd.DataFrame:
+        """
+        Return the bars of ``symbol`` between two dates (inclusive).
+
+        Missing date ranges are fetched from the provider first. If some
+        ranges fail to download, the bars that are available are returned;
+        if nothing is available the first provider error is raised.
+
+        Args:
+            symbol (str): The ticker, as passed to the provider.
+            start_date (str | date): First date of the range.
+            end_date (str | date): Last date of the range.
+
+        Returns:
+            pd.DataFrame: Bars indexed by ``date``. Daily bars use ``date``
+            objects like the provider does, intraday bars a DatetimeIndex.
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        entry, error = self._sync(symbol, start, end)
+        return self._slice(entry, start, end, error)
+
+    def sync_range(
+        self,
+        symbol: str,
+        start_date: Union[str, date, datetime],
+        end_date: Union[str, date, datetime]
+    ) -> Tuple[int, Callable[[], pd.DataFrame]]:
+        """
+        Fetch the missing bars of ``[start_date, end_date]`` like ``get_bars``, without reading them yet.
+
+        Returns:
+            tuple: The version of the bars and a function returning them as
+            ``get_bars`` does, so a caller holding a result built from that
+            version can skip reading them.
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        entry, error = self._sync(symbol, start, end)
+        return entry.version, lambda: self._slice(entry, start, end, error)
+
+    @staticmethod
+    def _slice(entry: _Entry, start: date, end: date, error: Optional[Exception]) -> pd.DataFrame:
+        frame = entry.frame
+        if not frame.empty:
+            index = frame.index
+            lo = index.searchsorted(pd.Timestamp(start), side="left")
+            hi = index.searchsorted(pd.Timestamp(end) + pd.Timedelta(days=1), side="left")
+            frame = frame.iloc[lo:hi]
+        if frame.empty and error is not None:
+            raise error
+        return as_date_index(frame)
+
+    def _fill(self, symbol: str, entry: _Entry, gaps: List[DateRange]) -> Tuple[_Entry, Optional[Exception]]:
+        """Fetch ``gaps`` from the provider and persist the merged bars."""
+        yesterday = date.today() - timedelta(days=1)
+        settled = date.today() - timedelta(days=EMPTY_GRACE_DAYS)
+        fetched = []
+        filled = []
+        covered = list(entry.covered)
+        error = None
+        for g_start, g_end in gaps:
+            try:
+                data = self._fetcher(symbol, g_start, g_end)
+            except Exception as e:
+                logger.warning(f"Error fetching bars for {symbol} {g_start}..{g_end}: {e}")
+                error = error or e
+                continue
+            lo, hi = pd.Timestamp(g_start), pd.Timestamp(g_end) + pd.Timedelta(days=1)
+            filled.append((lo, hi))
+            if data is not None and not data.empty:
+                data = self._normalize(data)
+                fetched.append(data[(data.index >= lo) & (data.index < hi)])
+            elif g_end >= settled:
+                # No bars yet for recent dates may be a transient answer, ask again later
+                continue
+            # Today's bar is still moving, only cover completed days
+            if min(g_end, yesterday) >= g_start:
+                covered.append((g_start, min(g_end, yesterday)))
+
+        if not filled:
+            return entry, error
+
+        frame = entry.frame
+        if not frame.empty:
+            keep = pd.Series(True, index=frame.index)
+            for lo, hi in filled:
+                keep &= (frame.index < lo) | (frame.index >= hi)
+            frame = frame[keep.to_numpy()]
+        pieces = [f for f in [frame, *fetched] if not f.empty]
+        frame = pd.concat(pieces).sort_index() if pieces else pd.DataFrame()
+
+        # Keep the version when a refetch (e.g. of today) brought no changes
+        version = entry.version if frame.equals(entry.frame) else time.time_ns()
+        new_entry = _Entry(
+            frame,
+            merge_ranges(covered),
+            version,
+            fresh=[(lo.date(), (hi - pd.Timedelta(days=1)).date()) for lo, hi in filled],
+            fresh_until=time.monotonic() + self._live_seconds,
+        )
+        try:
+            self._save(symbol, new_entry)
+        except Exception as e:
+            logger.warning(f"Error writing bar file for {symbol}: {e}")
+        self._remember(symbol, new_entry)
+        return new_entry, error
+
+    @staticmethod
+    def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+        """Index provider bars by a sorted DatetimeIndex named ``date``."""
+        if not isinstance(data.index, pd.DatetimeIndex):
+            if "date" in data.columns:
+                data = data.set_index("date")
+            data = data.copy()
+            data.index = pd.to_datetime(data.index)
+        data.index.name = "date"
+        return data.sort_index()
+
+    def clear(self):
+        """Forget the bars held in memory (files on disk are kept)."""
+        with self._entries_lock:
+            self._entries.clear()
+
+
+bar_store = BarStore()
+
+
+def sync_bars(
+    symbol: str,
+    start_date: Union[str, date, datetime],
+    end_date: Union[str, date, datetime]
+) -> int:
+    """Bring the bars of ``symbol`` between two dates up to date and return their version."""
+    return bar_store.sync(symbol, start_date, end_date)
+
+
+def sync_range(
+    symbol: str,
+    start_date: Union[str, date, datetime],
+    end_date: Union[str, date, datetime]
+) -> Tuple[int, Callable[[], pd.DataFrame]]:
+    """Bring the bars of ``symbol`` between two dates up to date; return their version and a reader of them."""
+    return bar_store.sync_range(symbol, start_date, end_date)
+
+
+def get_bars(
+    symbol: str,
+    start_date: Union[str, date, datetime],
+    end_date: Union[str, date, datetime]
+) -> pd.DataFrame:
+    """Return the bars of ``symbol`` between two dates from the local store."""
+    return bar_store.get_bars(symbol, start_date, end_date)
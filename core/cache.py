@@ -0,0 +1,147 @@
+"""
+In-process TTL cache.
+
+``TTLCache`` keeps values for a fixed number of seconds with LRU eviction
+beyond ``maxsize`` entries. ``get_or_load`` de-duplicates concurrent loads
+of the same key: while one thread runs the loader, other threads asking for
+that key wait for its result instead of calling the provider again.
+
+Every cache is listed in a process-wide registry, so ``cache_stats`` can
+report all of them (e.g. on ``/metrics``) without each owner exporting them.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire ``ttl`` seconds after being set.
+
+    Args:
+        ttl (float): Seconds an entry stays fresh.
+        maxsize (int): Maximum number of entries before the least recently
+            used one is evicted.
+        name (str): Name used when reporting cache statistics.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, name: str = ""):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        _caches.add(self)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the fresh value of ``key``, or ``default``."""
+        with self._lock:
+            return self._get(key, default)
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Like ``get``, without counting a hit or miss."""
+        with self._lock:
+            return self._get(key, default, count=False)
+
+    def _get(self, key, default, count=True):
+        item = self._data.get(key)
+        if item is not None:
+            expires, value = item
+            if expires > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Store ``value`` under ``key`` for ``ttl`` (default: the cache TTL) seconds."""
+        with self._lock:
+            self._set(key, value, self.ttl if ttl is None else ttl)
+
+    def _set(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the value of ``key``, calling ``loader()`` on a miss.
+
+        Concurrent misses for the same key share one ``loader`` call. Errors
+        are raised to every waiting caller and are not cached.
+        """
+        with self._lock:
+            value = self._get(key, MISSING)
+            if value is not MISSING:
+                return value
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._set(key, value, self.ttl)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Drop ``key`` from the cache."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+            }
+
+
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return the counters of every live cache by name (unnamed caches are skipped)."""
+    return {cache.name: cache.stats() for cache in list(_caches) if cache.name}
@@ -0,0 +1,232 @@
+"""
+Compaction of widget data for LLM prompts.
+
+Widget data reaches the agent as JSON: a price table with years of OHLCV
+rows or a full statement history easily runs to tens of thousands of
+tokens, which makes the LLM slower and more expensive without making the
+answer better. ``compact_contents`` fits every piece of data into a share of
+``PROMPT_DATA_TOKEN_BUDGET``:
+
+- tables (lists of records) become CSV, with all-empty columns dropped,
+  columns holding one value stated once, midnight timestamps shortened to
+  dates and floats written with ``PROMPT_SIGNIFICANT_DIGITS`` digits;
+- a table still over its budget is replaced by summary statistics of its
+  numeric columns plus the rows Largest-Triangle-Three-Buckets keeps on its
+  main series (see ``core.downsample``), as many as fit;
+- other JSON is written without whitespace or ``\\u`` escapes, and text that
+  is still too long is cut.
+
+Tokens are estimated (one per CJK character, one per four other
+characters). The estimated tokens before and after compaction are counted in
+``openbb_hka_prompt_data_tokens_total``.
+"""
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.downsample import lttb_indices
+from core.metrics import PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+PROMPT_DATA_TOKEN_BUDGET = int(os.getenv("PROMPT_DATA_TOKEN_BUDGET", "6000"))
+PROMPT_SIGNIFICANT_DIGITS = int(os.getenv("PROMPT_SIGNIFICANT_DIGITS", "4"))
+
+# Fewer sampled rows than this say little about a series
+MIN_SAMPLE_ROWS = 10
+
+# Columns preferred as the series the sampled rows follow
+SERIES_COLUMNS = ("close", "收盘", "price", "value")
+
+_CJK = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_MIDNIGHT = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ]00:00:00(?:\.0+)?(?:Z|[+-]00:?00)?$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of ``text``: one per CJK character, one per four other characters."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass(frozen=True)
+class Compacted:
+    """One piece of widget data as put into the prompt."""
+
+    text: str
+    tokens_before: int
+    tokens_after: int
+    method: str
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def to_frame(data) -> Optional[pd.DataFrame]:
+    """Return ``data`` as a DataFrame if it is a non-empty list of records, else ``None``."""
+    if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+        return pd.DataFrame.from_records(data)
+    return None
+
+
+def _nested_json(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return value
+
+
+def prune_frame(frame: pd.DataFrame) -> tuple:
+    """
+    Drop the columns that carry no per-row information, and write nested values as JSON.
+
+    Returns:
+        tuple: The remaining frame and a dict of the dropped columns that
+        hold a single value, with that value.
+    """
+    frame = frame.dropna(axis=1, how="all")
+    # Nested lists and dicts (the images of a news item) are written as
+    # compact JSON, which can also be counted and compared
+    for column in frame.columns[frame.dtypes.to_numpy() == object]:
+        values = frame[column]
+        if values.map(lambda value: isinstance(value, (list, dict))).any():
+            frame[column] = values.map(_nested_json)
+    if len(frame) < 2:
+        return frame, {}
+    constant = frame.columns[frame.nunique(dropna=False).to_numpy() == 1]
+    constants = {str(column): frame[column].iloc[0] for column in constant}
+    frame = frame.drop(columns=constant)
+    # Midnight timestamps are dates
+    for column in frame.columns[frame.dtypes.to_numpy() == object]:
+        values = frame[column]
+        if pd.api.types.infer_dtype(values, skipna=True) == "string":
+            shortened = values.str.replace(_MIDNIGHT, r"\1", regex=True)
+            if not shortened.equals(values):
+                frame[column] = shortened
+    return frame, constants
+
+
+def to_csv(frame: pd.DataFrame) -> str:
+    return frame.to_csv(index=False, float_format=f"%.{PROMPT_SIGNIFICANT_DIGITS}g").strip()
+
+
+def _series_column(numeric: pd.DataFrame) -> Optional[str]:
+    for column in SERIES_COLUMNS:
+        if column in numeric.columns:
+            return column
+    return numeric.columns[0] if len(numeric.columns) else None
+
+
+def summarize_frame(frame: pd.DataFrame) -> str:
+    """Return first, last, min, max and mean of every numeric column, one row per column, as CSV."""
+    numeric = frame.select_dtypes("number")
+    if numeric.empty:
+        return ""
+    values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(all="ignore"):
+        summary = pd.DataFrame({
+            "column": numeric.columns,
+            "first": values[0],
+            "last": values[-1],
+            "min": np.nanmin(values, axis=0),
+            "max": np.nanmax(values, axis=0),
+            "mean": np.nanmean(values, axis=0),
+            "change_pct": (values[-1] / values[0] - 1) * 100,
+        })
+    return to_csv(summary)
+
+
+def sample_rows(frame: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """Keep ``rows`` rows: the LTTB picks on the main numeric series, else evenly spaced rows."""
+    if len(frame) <= rows:
+        return frame
+    numeric = frame.select_dtypes("number")
+    column = _series_column(numeric)
+    if column is not None:
+        values = numeric[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        picked = lttb_indices(np.arange(len(frame), dtype=np.float64), values, rows)
+        if len(picked):
+            return frame.iloc[picked]
+    return frame.iloc[np.linspace(0, len(frame) - 1, rows).astype(np.int64)]
+
+
+def truncate(text: str, budget: int) -> str:
+    """Cut ``text`` to about ``budget`` tokens, saying how much was left out."""
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        return text
+    keep = max(0, int(len(text) * budget / tokens))
+    return f"{text[:keep]}\n[... truncated, about {tokens - budget} tokens omitted]"
+
+
+def compact_frame(frame: pd.DataFrame, budget: int) -> tuple:
+    """Return the frame as CSV within ``budget`` tokens if possible, and the method used."""
+    frame, constants = prune_frame(frame)
+    header = "".join(f"{column}: {value}\n" for column, value in constants.items())
+    text = header + to_csv(frame)
+    if estimate_tokens(text) <= budget:
+        return text, "csv"
+
+    summary = summarize_frame(frame)
+    intro = f"{header}{len(frame)} rows. Summary of the numeric columns:\n{summary}\n" if summary else header
+    per_row = estimate_tokens(to_csv(frame)) / max(len(frame), 1)
+    rows = max(MIN_SAMPLE_ROWS, int((budget - estimate_tokens(intro) - 20) / per_row))
+    sampled = sample_rows(frame, rows)
+    text = f"{intro}{len(sampled)} of {len(frame)} rows:\n{to_csv(sampled)}"
+    return truncate(text, budget), "summary"
+
+
+def compact(content: str, budget: int = PROMPT_DATA_TOKEN_BUDGET) -> Compacted:
+    """
+    Compact one piece of widget data to about ``budget`` tokens.
+
+    Args:
+        content (str): The data as returned by the widget endpoint, usually JSON.
+        budget (int): Token budget of the result.
+
+    Returns:
+        Compacted: The text for the prompt and its estimated tokens before
+        and after.
+    """
+    before = estimate_tokens(content)
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        text, method = truncate(content, budget), "text"
+    else:
+        frame = to_frame(data)
+        if frame is not None:
+            text, method = compact_frame(frame, budget)
+        elif isinstance(data, str):
+            text, method = truncate(data, budget), "text"
+        else:
+            text, method = truncate(json.dumps(data, ensure_ascii=False, separators=(",", ":")), budget), "json"
+    if method == "text" and text == content:
+        method = "verbatim"
+    return Compacted(text, before, estimate_tokens(text), method)
+
+
+def compact_contents(contents: Iterable[str], budget: int = PROMPT_DATA_TOKEN_BUDGET) -> List[Compacted]:
+    """
+    Compact several pieces of widget data, sharing ``budget`` evenly between them.
+
+    Returns:
+        list[Compacted]: One result per content, in order.
+    """
+    contents = list(contents)
+    if not contents:
+        return []
+    share = max(budget // len(contents), 1)
+    results = [compact(content, share) for content in contents]
+    before = sum(r.tokens_before for r in results)
+    after = sum(r.tokens_after for r in results)
+    PROMPT_TOKENS.labels("before").inc(before)
+    PROMPT_TOKENS.labels("after").inc(after)
+    logger.info("Compacted widget data from about %d to %d tokens (%s)", before, after,
+                ", ".join(r.method for r in results))
+    return results
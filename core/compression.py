@@ -0,0 +1,230 @@
+"""
+Response body compression.
+
+gzip is always available; brotli and zstd are used when the ``brotli`` and
+``zstandard`` packages are installed. ``choose_encoding`` picks the best
+coding a client accepts from the ones a payload is available in.
+
+``CompressionMiddleware`` compresses JSON and text responses above a size
+threshold. Compressed bodies are cached by the response ETag (or a digest of
+the body), so a payload requested again, e.g. the same candle figure or
+ticker list, is compressed once and served many times.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from core.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Preferred first
+PREFERENCE = ("br", "zstd", "gzip")
+
+# Responses smaller than this are sent as they are
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Levels used for responses, trading ratio for CPU; static payloads use the best level
+LEVELS = {"br": 5, "zstd": 3, "gzip": 6}
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# coding -> (compress(data, level), best level)
+ENCODERS = {"gzip": (_gzip, 9)}
+if brotli is not None:
+    ENCODERS["br"] = (_brotli, 11)
+if zstandard is not None:
+    ENCODERS["zstd"] = (_zstd, 19)
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress ``data`` with ``encoding`` at ``level`` (default: best compression)."""
+    func, best = ENCODERS[encoding]
+    return func(data, best if level is None else level)
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse an ``Accept-Encoding`` header into ``{coding: q}``."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """
+    Return the coding to send, or ``None`` for an uncompressed body.
+
+    Args:
+        accept_encoding (str): The request's ``Accept-Encoding`` header.
+        available (Iterable[str]): Codings the body can be sent in.
+    """
+    accepted = accepted_encodings(accept_encoding or "")
+    available = set(available)
+    for coding in PREFERENCE:
+        if coding in available and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+# (key, coding) -> compressed body
+_compressed = TTLCache(ttl=int(os.getenv("COMPRESSION_CACHE_SECONDS", "300")), maxsize=256, name="compression")
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _record(coding: str, size: int, compressed: int, seconds: float, cached: bool):
+    with _stats_lock:
+        stats = _stats.setdefault(coding, {
+            "responses": 0, "cached": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0,
+        })
+        stats["responses"] += 1
+        stats["cached"] += cached
+        stats["bytes_in"] += size
+        stats["bytes_out"] += compressed
+        stats["cpu_seconds"] += seconds
+
+
+def compression_stats() -> Dict[str, Dict[str, float]]:
+    """Return per-coding response counts, byte totals, compression ratio and CPU time."""
+    with _stats_lock:
+        stats = {coding: dict(values) for coding, values in _stats.items()}
+    for values in stats.values():
+        values["ratio"] = round(values["bytes_in"] / values["bytes_out"], 2) if values["bytes_out"] else 0.0
+    stats["cache"] = _compressed.stats()
+    return stats
+
+
+def compress_cached(key, data: bytes, encoding: str) -> bytes:
+    """
+    Compress ``data`` for a response, reusing the result stored under ``key``.
+
+    Args:
+        key: Identifies ``data``, e.g. the path and strong ETag of the response.
+        data (bytes): The response body.
+        encoding (str): The coding to compress with.
+    """
+    cached = _compressed.get((key, encoding), None)
+    if cached is not None:
+        _record(encoding, len(data), len(cached), 0.0, True)
+        return cached
+    started = time.thread_time()
+    compressed = compress(data, encoding, LEVELS.get(encoding))
+    _record(encoding, len(data), len(compressed), time.thread_time() - started, False)
+    _compressed.set((key, encoding), compressed)
+    return compressed
+
+
+def _compressible(headers: Dict[bytes, bytes]) -> bool:
+    if b"content-encoding" in headers:
+        return False
+    content_type = headers.get(b"content-type", b"").decode("latin-1")
+    # Events must reach the client as they are sent, not after the stream ends
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best coding the client accepts.
+
+    Only complete ``200`` responses with a compressible content type, no
+    ``Content-Encoding`` and at least ``minimum_size`` bytes are compressed;
+    everything else, including streamed event responses, passes through
+    untouched. A strong ETag becomes weak on compressed responses, because
+    the bytes differ from the identity representation while routes keep
+    validating the ETag they computed.
+
+    Args:
+        app: The ASGI application.
+        minimum_size (int): Smallest body that is compressed.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        coding = choose_encoding(accept, ENCODERS)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start
+            if start is False:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                if message["status"] != 200 or not _compressible(headers):
+                    start = False
+                    await send(message)
+                    return
+                start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                etag = next((v for k, v in headers if k.lower() == b"etag"), None)
+                if etag is not None and not etag.startswith(b"W/"):
+                    key = (scope.get("path"), scope.get("query_string"), etag)
+                    headers = [(k, b"W/" + v if k.lower() == b"etag" else v) for k, v in headers]
+                else:
+                    key = hashlib.blake2b(body, digest_size=16).digest()
+                body = compress_cached(key, body, coding)
+                headers.append((b"content-encoding", coding.encode("latin-1")))
+                headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,131 @@
+"""
+Server-side downsampling of price series.
+
+A chart cannot show more points than it has pixels, so long ranges are
+reduced before they are sent:
+
+- ``downsample_ohlc`` merges runs of consecutive bars into at most
+  ``max_points`` bars (first open, highest high, lowest low, last close,
+  summed volume), so every high and low stays visible.
+- ``downsample_line`` keeps the rows picked by Largest-Triangle-Three-Buckets
+  (LTTB) on one column, which preserves the visual shape of a line.
+
+The default number of points comes from the ``gridData`` width of the
+widget, see ``default_max_points``.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.resample import aggregate_runs
+
+# Points drawn per grid column of an OpenBB Workspace widget
+POINTS_PER_GRID_COLUMN = int(os.getenv("DOWNSAMPLE_POINTS_PER_COLUMN", "25"))
+
+
+def default_max_points(endpoint: str) -> int:
+    """
+    Return the default ``max_points`` of a widget from its ``gridData`` width.
+
+    Args:
+        endpoint (str): The widget endpoint, e.g. ``"hk/candles"``.
+
+    Returns:
+        int: Points for the widget width, 0 (no downsampling) if the widget
+        has no width.
+    """
+    from core.registry import WIDGETS
+    width = WIDGETS.get(endpoint, {}).get("gridData", {}).get("w", 0)
+    return int(width) * POINTS_PER_GRID_COLUMN
+
+
+def _timestamps(index: pd.Index) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(index)).asi8
+
+
+def downsample_ohlc(frame: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Merge consecutive bars so that at most ``max_points`` remain.
+
+    Args:
+        frame (pd.DataFrame): Sorted OHLCV bars indexed by date or datetime.
+        max_points (int): Maximum number of bars, 0 or less for no limit.
+
+    Returns:
+        pd.DataFrame: ``frame`` itself if it is small enough, otherwise the
+        merged bars indexed by the datetime of their first bar.
+    """
+    n = len(frame)
+    if max_points <= 0 or n <= max_points:
+        return frame
+    keys = np.arange(n) * max_points // n
+    return aggregate_runs(frame, keys, _timestamps(frame.index))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Return the positions of the points LTTB keeps from a line.
+
+    The first and last points are always kept; the points in between are
+    split into ``max_points - 2`` buckets and from each bucket the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket is kept. Bucket averages and triangle areas
+    are computed with NumPy; only the walk over buckets is a Python loop,
+    because each pick depends on the previous one.
+
+    Args:
+        x (np.ndarray): Ascending x values.
+        y (np.ndarray): y values, NaN points are never picked.
+        max_points (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Ascending positions into ``x``/``y``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if max_points <= 0 or n <= max_points:
+        return valid
+    if max_points < 3:
+        return valid[[0, n - 1][:max_points]]
+    x, y = x[valid] - x[valid[0]], y[valid]
+
+    buckets = max_points - 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # The last bucket looks ahead to the last point
+    next_x = np.r_[avg_x[1:], x[-1]]
+    next_y = np.r_[avg_y[1:], y[-1]]
+
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return valid[picked]
+
+
+def downsample_line(frame: pd.DataFrame, column: str, max_points: int) -> pd.DataFrame:
+    """
+    Keep the rows LTTB picks on ``column`` so that at most ``max_points`` remain.
+
+    Args:
+        frame (pd.DataFrame): Rows indexed by date or datetime.
+        column (str): The plotted column, e.g. ``"close"``.
+        max_points (int): Maximum number of rows, 0 or less for no limit.
+
+    Returns:
+        pd.DataFrame: ``frame`` itself if it is small enough, otherwise the
+        selected rows.
+    """
+    if max_points <= 0 or len(frame) <= max_points or column not in frame.columns:
+        return frame
+    values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return frame.iloc[lttb_indices(_timestamps(frame.index), values, max_points)]
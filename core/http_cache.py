@@ -0,0 +1,115 @@
+"""
+Conditional GET support for widget responses.
+
+Widget routes compute an ETag from the request parameters and the version
+of the data they are built from (the bar store version of a symbol, the
+version of a cached statement). When the client already holds that ETag the
+route answers ``304 Not Modified`` before building the figure or table.
+
+``StaticPayload`` serves content that never changes after startup from
+bytes encoded and compressed once.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from core.compression import ENCODERS, choose_encoding, compress
+
+# Clients may keep responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*validators) -> str:
+    """Return a strong ETag for the given request parameters and data versions."""
+    digest = hashlib.blake2b(repr(validators).encode("utf-8"), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the ``If-None-Match`` header of ``request`` matches ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # GET uses weak comparison, so W/ prefixes are ignored
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Return the validator headers sent with a response."""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """Return an empty ``304 Not Modified`` response."""
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def check_etag(request: Request, response: Response, *validators) -> Optional[Response]:
+    """
+    Handle a conditional GET for a route that returns plain data.
+
+    Args:
+        request (Request): The incoming request.
+        response (Response): The response FastAPI injects into the route; the
+            validator headers are set on it.
+        validators: Request parameters and data versions the response is
+            built from.
+
+    Returns:
+        Response | None: A 304 response if the client's copy is current,
+        otherwise ``None`` and the route builds its response as usual.
+    """
+    etag = make_etag(*validators)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    return None
+
+
+@dataclass(frozen=True)
+class StaticPayload:
+    """
+    A JSON document encoded and compressed once, served without per-request work.
+
+    Attributes:
+        body (bytes): The encoded JSON.
+        encoded (dict): The body compressed with each available coding.
+        etag (str): Strong ETag of ``body``; compressed representations use
+            it with a ``-<coding>`` suffix.
+    """
+    body: bytes
+    encoded: Dict[str, bytes]
+    etag: str
+
+    @classmethod
+    def build(cls, content: Any) -> "StaticPayload":
+        """Encode ``content`` as JSON and compress it with every available coding."""
+        from core.serialization import dumps
+
+        body = dumps(content)
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return cls(
+            body=body,
+            encoded={coding: compress(body, coding) for coding in ENCODERS},
+            etag=f'"{digest}"',
+        )
+
+    def _etag(self, coding: Optional[str]) -> str:
+        return self.etag if coding is None else f'{self.etag[:-1]}-{coding}"'
+
+    def response(self, request: Request) -> Response:
+        """Return the best representation for ``request``, or 304 if the client has it."""
+        coding = choose_encoding(request.headers.get("accept-encoding", ""), self.encoded)
+        etag = self._etag(coding)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        # Every representation has the same content, so any of its ETags validates
+        if any(etag_matches(request, self._etag(c)) for c in (None, *self.encoded)):
+            return Response(status_code=304, headers=headers)
+        if coding is None:
+            return Response(self.body, media_type="application/json", headers=headers)
+        headers["Content-Encoding"] = coding
+        return Response(self.encoded[coding], media_type="application/json", headers=headers)
@@ -0,0 +1,164 @@
+"""
+Shared LLM clients for the agent endpoints.
+
+Building an ``openai.AsyncOpenAI`` (or a magentic chat model, which builds
+one) per request costs a new connection pool, and with it a TCP and TLS
+handshake, on every conversation turn. The clients here are created once per
+process, by ``start_llm_clients`` in the lifespan or on first use, and share
+one ``httpx.AsyncClient`` that keeps connections alive and speaks HTTP/2
+when the ``h2`` package is installed. ``close_llm_clients`` closes them on
+shutdown.
+
+``stream_ttft`` records the time to first token of a streamed answer in the
+``openbb_hka_llm_time_to_first_token_seconds`` histogram.
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import AsyncIterable, AsyncIterator, Optional, TypeVar
+
+import httpx
+import openai
+
+from core.metrics import LLM_TTFT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+OPENROUTER_MODEL = "deepseek/deepseek-chat-v3-0324"
+
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") != "0"
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.AsyncClient] = None
+_openai_client: Optional[openai.AsyncOpenAI] = None
+_openrouter_model = None
+
+
+def http2_enabled() -> bool:
+    """Whether the shared client negotiates HTTP/2 (needs ``LLM_HTTP2`` and the ``h2`` package)."""
+    return LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client of the LLM clients."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.AsyncClient(
+                http2=http2_enabled(),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def openai_client() -> openai.AsyncOpenAI:
+    """Return the shared client of the OpenAI compatible endpoint (``BASE_URL``, ``OPENAI_API_KEY``)."""
+    global _openai_client
+    client = http_client()
+    with _lock:
+        if _openai_client is None:
+            _openai_client = openai.AsyncOpenAI(
+                base_url=os.getenv("BASE_URL"),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=client,
+            )
+        return _openai_client
+
+
+def openai_model() -> Optional[str]:
+    """Return the model the ``/a/chatglm`` agent asks for (``OPENAI_MODEL``)."""
+    return os.getenv("OPENAI_MODEL")
+
+
+def _use_shared_client(model, client: httpx.AsyncClient) -> bool:
+    """
+    Swap the OpenAI client magentic built for ``model`` for one on ``client``.
+
+    magentic cannot be handed a client, so this replaces a private attribute
+    of magentic 0.40. If a magentic upgrade moves it, the model keeps its own
+    client (and connection pool) rather than failing.
+    """
+    inner = getattr(model, "_openrouter_openai_chat_model", None)
+    default = getattr(inner, "_async_client", None)
+    if not isinstance(default, openai.AsyncOpenAI):
+        logger.warning("magentic %s has no OpenAI client to replace, keeping its own connection pool",
+                       type(model).__name__)
+        return False
+    inner._async_client = openai.AsyncOpenAI(
+        api_key=default.api_key,
+        base_url=default.base_url,
+        http_client=client,
+    )
+    return True
+
+
+def openrouter_model():
+    """
+    Return the shared magentic OpenRouter chat model of the ``/a/openrouter`` agent.
+
+    magentic imports are deferred to the first call, like ``core.agent``.
+    """
+    global _openrouter_model
+    from magentic.chat_model.openrouter_chat_model import OpenRouterChatModel
+
+    client = http_client()
+    with _lock:
+        if _openrouter_model is None:
+            model = OpenRouterChatModel(
+                model=OPENROUTER_MODEL,
+                temperature=0.7,
+                provider_sort="latency",
+                require_parameters=True,
+            )
+            _use_shared_client(model, client)
+            _openrouter_model = model
+        return _openrouter_model
+
+
+def start_llm_clients():
+    """Create the shared HTTP and OpenAI clients, so the first chat request does not."""
+    try:
+        openai_client()
+    except openai.OpenAIError as e:
+        logger.warning("OpenAI client not created at startup: %s", e)
+        return
+    logger.info("LLM clients ready (HTTP/2 %s)", "on" if http2_enabled() else "off")
+
+
+async def close_llm_clients():
+    """Close the shared connection pool; the clients are rebuilt on next use."""
+    global _http_client, _openai_client, _openrouter_model
+    with _lock:
+        client, _http_client, _openai_client, _openrouter_model = _http_client, None, None, None
+    if client is not None:
+        await client.aclose()
+
+
+async def stream_ttft(agent: str, chunks: AsyncIterable[T], started: float) -> AsyncIterator[T]:
+    """
+    Yield ``chunks`` and record the time from ``started`` to the first one.
+
+    Args:
+        agent (str): The ``agent`` label, e.g. ``"chatglm"``.
+        chunks (AsyncIterable): The streamed answer.
+        started (float): ``time.perf_counter()`` before the request was sent.
+    """
+    first = True
+    async for chunk in chunks:
+        if first:
+            LLM_TTFT.labels(agent).observe(time.perf_counter() - started)
+            first = False
+        yield chunk
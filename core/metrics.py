@@ -0,0 +1,182 @@
+"""
+Prometheus metrics, exposed on ``/metrics``.
+
+- ``MetricsMiddleware`` times every HTTP request by route template and
+  counts the requests in flight.
+- ``widget_call`` times the handler of every ``register_widget`` endpoint;
+  ``core.registry`` applies it, so new widgets are covered automatically.
+- ``provider_call`` times one upstream call (an ``obb.*`` or ``ak.*``
+  function) and counts its errors.
+- ``LLM_TTFT`` is the time to first token of the agents (see ``core.llm``),
+  ``PROMPT_TOKENS`` the widget data tokens before and after compaction (see
+  ``core.compaction``), ``SSE_*`` the events, deltas and encoding CPU of
+  the streamed answers (see ``core.sse``).
+- The counters kept by the caches, provider pools, single-flight groups and
+  response compression are read when ``/metrics`` is scraped.
+"""
+import time
+from contextlib import contextmanager
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.tracing import span
+
+PREFIX = "openbb_hka"
+
+# Cached widgets answer in milliseconds, cold provider calls take seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_LATENCY = Histogram(
+    f"{PREFIX}_http_request_duration_seconds", "HTTP request latency by route template.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(f"{PREFIX}_http_requests_in_flight", "HTTP requests being served.")
+
+WIDGET_LATENCY = Histogram(
+    f"{PREFIX}_widget_duration_seconds", "Widget handler latency.", ["widget"], buckets=LATENCY_BUCKETS,
+)
+WIDGET_IN_FLIGHT = Gauge(f"{PREFIX}_widget_in_flight", "Widget handlers running.", ["widget"])
+WIDGET_ERRORS = Counter(f"{PREFIX}_widget_errors_total", "Widget handlers that raised.", ["widget", "exception"])
+
+PROVIDER_LATENCY = Histogram(
+    f"{PREFIX}_provider_call_duration_seconds", "Upstream provider call latency.",
+    ["provider", "function"], buckets=LATENCY_BUCKETS,
+)
+PROVIDER_ERRORS = Counter(
+    f"{PREFIX}_provider_call_errors_total", "Upstream provider calls that raised.",
+    ["provider", "function", "exception"],
+)
+
+LLM_TTFT = Histogram(
+    f"{PREFIX}_llm_time_to_first_token_seconds", "Time from sending a chat request to its first streamed token.",
+    ["agent"], buckets=LATENCY_BUCKETS,
+)
+SSE_EVENTS = Histogram(
+    f"{PREFIX}_sse_events_per_answer", "SSE message events sent per streamed agent answer.", ["endpoint"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000),
+)
+SSE_TOKENS = Counter(f"{PREFIX}_sse_tokens_total", "LLM deltas streamed to agent clients.", ["endpoint"])
+SSE_CPU = Counter(f"{PREFIX}_sse_cpu_seconds_total", "CPU time spent encoding agent SSE events.", ["endpoint"])
+PROMPT_TOKENS = Counter(
+    f"{PREFIX}_prompt_data_tokens_total", "Estimated tokens of widget data put into agent prompts.", ["stage"],
+)
+
+
+@contextmanager
+def provider_call(provider: str, function: str):
+    """
+    Time an upstream call and count it as an error if it raises.
+
+    The call is also a tracing span named ``provider <function>``.
+
+    Args:
+        provider (str): The data source, e.g. ``"akshare"``.
+        function (str): The called function, e.g. ``"obb.equity.price.historical"``.
+    """
+    started = time.perf_counter()
+    try:
+        with span(f"provider {function}", provider=provider):
+            yield
+    except Exception as e:
+        PROVIDER_ERRORS.labels(provider, function, type(e).__name__).inc()
+        raise
+    finally:
+        PROVIDER_LATENCY.labels(provider, function).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def widget_call(widget: str):
+    """Time a widget handler, count it while it runs and count its errors."""
+    in_flight = WIDGET_IN_FLIGHT.labels(widget)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        WIDGET_ERRORS.labels(widget, type(e).__name__).inc()
+        raise
+    finally:
+        WIDGET_LATENCY.labels(widget).observe(time.perf_counter() - started)
+        in_flight.dec()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing HTTP requests.
+
+    Requests are labelled with the template of the matched route (e.g.
+    ``/hk/candles``), never the raw path, so the number of series stays
+    bounded; requests matching no route are labelled ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            HTTP_IN_FLIGHT.dec()
+
+
+def _families(name: str, doc: str, stats: dict, label: str, counters: tuple, gauges: tuple):
+    families = {}
+    for key in counters:
+        families[key] = CounterMetricFamily(f"{PREFIX}_{name}_{key}", f"{doc} {key}.", labels=[label])
+    for key in gauges:
+        families[key] = GaugeMetricFamily(f"{PREFIX}_{name}_{key}", f"{doc} {key}.", labels=[label])
+    for value, counts in stats.items():
+        for key, family in families.items():
+            if key in counts:
+                family.add_metric([value], counts[key])
+    return families.values()
+
+
+class StatsCollector:
+    """Exports the counters the caches, pools, single-flight groups, compression and quote hub keep."""
+
+    def collect(self):
+        from core.cache import cache_stats
+        from core.compression import compression_stats
+        from core.providers import provider_stats
+        from core.quote_hub import quote_hub_stats
+        from core.singleflight import singleflight_stats
+
+        yield from _families("cache", "Cache", cache_stats(), "cache",
+                             ("hits", "misses", "evictions", "coalesced"), ("size",))
+        yield from _families("provider_pool", "Provider pool", provider_stats(), "provider",
+                             ("completed", "failed", "rejected"), ("queued", "active", "max_workers"))
+        yield from _families("singleflight", "Single-flight", singleflight_stats(), "group",
+                             ("calls", "executions", "collapsed"), ("inflight",))
+        compression = compression_stats()
+        compression.pop("cache", None)
+        yield from _families("compression", "Compressed responses", compression, "encoding",
+                             ("responses", "cached", "bytes_in", "bytes_out", "cpu_seconds"), ())
+        yield from _families("quote_hub", "Streamed quotes", quote_hub_stats(), "exchange",
+                             ("polls", "updates", "errors"), ("symbols", "subscriptions"))
+
+
+REGISTRY.register(StatsCollector())
+
+
+def metrics_response() -> Response:
+    """Return the current metrics in the Prometheus text format."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -3,7 +3,32 @@ Plotly config settings for consistent chart behavior.
 
 This module provides standardized configuration options for Plotly charts,
 ensuring consistent interactivity, responsiveness, and appearance.
+
+It also holds the pieces of a fast path that builds figure dicts without
+``plotly.graph_objects``: layouts resolved once per theme with
+``get_figure_layout``, and ``typed_array``/``axis_values`` which encode trace
+data exactly like ``Figure.to_json`` does.
 """
+import base64
+import json
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+THEMES = ("dark", "light")
+
+# NumPy dtype -> plotly.js typed array type
+PLOTLYJS_TYPES = {
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "i2",
+    "uint16": "u2",
+    "int32": "i4",
+    "uint32": "u4",
+    "float32": "f4",
+    "float64": "f8",
+}
 
 def create_base_layout(
     x_title: str, 
@@ -310,3 +335,91 @@ def apply_config_to_figure(figure, theme="dark"):
     
     # Return both the figure and the config
     return figure
+
+
+@lru_cache(maxsize=None)
+def get_figure_layout(
+    theme: str = "dark",
+    x_title: str = "Date",
+    y_title: str = "Price",
+    y_dtype: str = ".2s",
+    yaxis: tuple = ()
+) -> dict:
+    """
+    Returns the complete layout of a chart as ``Figure.to_json`` writes it.
+
+    The layout is ``create_base_layout``, updated with the ``yaxis`` items,
+    then with ``apply_config_to_figure`` and the default Plotly template. It
+    is resolved with Plotly once per argument combination; the returned dict
+    is shared and must not be modified.
+
+    Parameters:
+        theme (str): The theme to use, either "light" or "dark"
+        x_title, y_title, y_dtype: As for ``create_base_layout``
+        yaxis (tuple): ``(key, value)`` pairs applied to the y-axis after the
+            base layout
+
+    Returns:
+        dict: The layout of the figure
+    """
+    import plotly.graph_objects as go
+
+    figure = go.Figure(layout=create_base_layout(x_title=x_title, y_title=y_title, y_dtype=y_dtype, theme=theme))
+    if yaxis:
+        figure.update_layout(yaxis=dict(yaxis))
+    figure = apply_config_to_figure(figure, theme=theme)
+    return json.loads(figure.to_json())["layout"]
+
+
+def typed_array(values):
+    """
+    Encodes an array the way Plotly serializes NumPy data.
+
+    Numeric arrays become ``{"dtype", "bdata"}`` typed array specs, with
+    int64/uint64 narrowed to the smallest type that holds the values, as
+    ``Figure.to_json`` does. Other data is returned as a list.
+
+    Parameters:
+        values: A NumPy array, pandas Series or Index
+
+    Returns:
+        dict | list: The value to put in the trace
+    """
+    v = np.asarray(values)
+    if v.size == 0 or v.dtype.kind not in "iuf":
+        return v.tolist()
+    if v.dtype == np.int64 or v.dtype == np.uint64:
+        for dtype in (("int8", "int16", "int32") if v.dtype == np.int64 else ("uint8", "uint16", "uint32")):
+            info = np.iinfo(dtype)
+            if v.min() >= info.min and v.max() <= info.max:
+                v = v.astype(dtype)
+                break
+        else:
+            return v.tolist()
+    dtype = str(v.dtype)
+    if dtype not in PLOTLYJS_TYPES:
+        return v.tolist()
+    return {
+        "dtype": PLOTLYJS_TYPES[dtype],
+        "bdata": base64.b64encode(np.ascontiguousarray(v)).decode("ascii"),
+    }
+
+
+def axis_values(index: pd.Index) -> list:
+    """
+    Returns the x values of a trace as Plotly writes them.
+
+    Datetimes become ISO strings at microsecond precision
+    (``2024-01-02T09:30:00``) and ``date`` objects ``YYYY-MM-DD`` strings.
+
+    Parameters:
+        index (pd.Index): The index of the plotted frame
+
+    Returns:
+        list: The x values
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is None and not (index.asi8 % 10**9).any():
+            return np.datetime_as_string(index.values, unit="s").tolist()
+        return [v.isoformat() for v in index.to_pydatetime()]
+    return [v.isoformat() if hasattr(v, "isoformat") else v for v in index]
@@ -0,0 +1,168 @@
+"""
+Bounded thread pools for provider calls.
+
+The OpenBB and akshare clients are synchronous. Async routes hand their
+provider work to a dedicated pool per provider through ``run_provider``, so a
+slow upstream call only occupies a pool thread and never the event loop.
+
+Pool sizes are configured with ``PROVIDER_MAX_WORKERS`` (default for every
+provider) or ``PROVIDER_MAX_WORKERS_<NAME>`` for one provider, and the number
+of calls allowed to wait for a thread with ``PROVIDER_MAX_QUEUE`` /
+``PROVIDER_MAX_QUEUE_<NAME>`` (0 means unbounded).
+
+Identical calls that are already running on a pool are not submitted again:
+the new caller awaits the running call (see ``core.singleflight``).
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.singleflight import call_key, get_flight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = int(os.getenv("PROVIDER_MAX_WORKERS", "8"))
+DEFAULT_MAX_QUEUE = int(os.getenv("PROVIDER_MAX_QUEUE", "256"))
+
+
+class ProviderBusyError(RuntimeError):
+    """Raised when a provider pool already has ``max_queue`` calls waiting."""
+
+
+class ProviderPool:
+    """
+    A bounded thread pool for one provider, with queue-depth accounting.
+
+    Args:
+        name (str): Provider name, used for thread names and metrics.
+        max_workers (int): Maximum number of concurrent provider calls.
+        max_queue (int): Maximum number of calls waiting for a thread,
+            0 for no limit.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"provider-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Schedule ``func(*args, **kwargs)`` on the pool.
+
+        Raises:
+            ProviderBusyError: If the queue is full.
+        """
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ProviderBusyError(f"Provider {self.name} has {self.queued} calls waiting")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def task():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        try:
+            # Run in the caller's context, so tracing spans nest under its request
+            return self._executor.submit(contextvars.copy_context().run, task)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """Return the current pool counters."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_queued": self.max_queued,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, ProviderPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(provider: str) -> ProviderPool:
+    """Return the pool of ``provider``, creating it from the environment on first use."""
+    pool = _pools.get(provider)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(provider)
+            if pool is None:
+                suffix = provider.upper()
+                pool = ProviderPool(
+                    provider,
+                    max_workers=int(os.getenv(f"PROVIDER_MAX_WORKERS_{suffix}", DEFAULT_MAX_WORKERS)),
+                    max_queue=int(os.getenv(f"PROVIDER_MAX_QUEUE_{suffix}", DEFAULT_MAX_QUEUE)),
+                )
+                _pools[provider] = pool
+    return pool
+
+
+async def run_provider(provider: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking provider call on the pool of ``provider`` and await it.
+
+    If the same call is already running, its result is shared instead of
+    calling the provider again.
+
+    Args:
+        provider (str): Pool name, e.g. ``"akshare"``.
+        func (Callable): The blocking function that calls the provider.
+
+    Returns:
+        The result of ``func(*args, **kwargs)``.
+    """
+    pool = get_pool(provider)
+    future = get_flight(provider).future(call_key(func, args, kwargs), lambda: pool.submit(func, *args, **kwargs))
+    # Shielded, so a caller that goes away does not cancel the call for the others
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+def provider_stats() -> Dict[str, Dict[str, int]]:
+    """Return the counters of every provider pool."""
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def shutdown_pools():
+    """Stop all provider pools without waiting for running calls."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
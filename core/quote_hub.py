@@ -0,0 +1,268 @@
+"""
+Real-time quotes with one upstream poller per symbol.
+
+A quote widget refreshed by many viewers used to cost one xueqiu call per
+viewer and refresh. ``/hk/quote/stream`` and ``/cn/quote/stream`` (SSE) and
+``/hk/quote/ws`` and ``/cn/quote/ws`` (WebSocket) instead subscribe the
+client to ``hub``, which runs one background poller per distinct symbol,
+started by its first subscriber and stopped when the last one leaves. Upstream
+calls therefore grow with the number of distinct symbols watched, not with
+the number of viewers.
+
+A poller refreshes every ``QUOTE_STREAM_OPEN_SECONDS`` while the symbol's
+exchange is in session (``core.resample.SESSIONS``, exchange time, Monday to
+Friday) and every ``QUOTE_STREAM_CLOSED_SECONDS`` otherwise. Each refresh also
+updates the quote cache of ``/hk/quote`` and ``/cn/quote``.
+
+Clients receive ``{symbol: fields}`` messages: the full quote when they
+subscribe, then only the fields that changed. A client that reads slower than
+the quotes change gets the changes merged into its next message rather than
+a growing backlog.
+
+Symbols, subscriptions, polls, changes and failed polls per exchange are
+exported on ``/metrics`` and ``/health``.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from core.resample import SESSIONS, exchange_of
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+QUOTE_STREAM_OPEN_SECONDS = float(os.getenv("QUOTE_STREAM_OPEN_SECONDS", "3"))
+QUOTE_STREAM_CLOSED_SECONDS = float(os.getenv("QUOTE_STREAM_CLOSED_SECONDS", "300"))
+QUOTE_STREAM_MAX_SYMBOLS = int(os.getenv("QUOTE_STREAM_MAX_SYMBOLS", "50"))
+
+# HKEX, SSE, SZSE and BSE all trade in UTC+8, without daylight saving
+MARKET_TZ = timezone(timedelta(hours=8))
+
+
+def encode(message: Dict) -> str:
+    # Not ``core.serialization.dumps``: its span per message would pile up in
+    # the trace of a stream that stays open for hours
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+
+def parse_symbols(symbols: str) -> List[str]:
+    """Split a comma separated list of tickers, without duplicates, up to ``QUOTE_STREAM_MAX_SYMBOLS``."""
+    return list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))[:QUOTE_STREAM_MAX_SYMBOLS]
+
+
+def market_open(symbol: str, now: datetime = None) -> bool:
+    """Whether the exchange of ``symbol`` is in a trading session at ``now`` (default: now)."""
+    sessions = SESSIONS.get(exchange_of(symbol))
+    if sessions is None:
+        return False
+    local = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if local.weekday() >= 5:
+        return False
+    minute = local.hour * 60 + local.minute
+    return any(start <= minute < end for start, end in sessions)
+
+
+def poll_interval(symbol: str, now: datetime = None) -> float:
+    """Return the seconds between two refreshes of ``symbol`` at ``now``."""
+    return QUOTE_STREAM_OPEN_SECONDS if market_open(symbol, now) else QUOTE_STREAM_CLOSED_SECONDS
+
+
+def _same(old, new) -> bool:
+    if old is new:
+        return True
+    try:
+        if old == new:
+            return True
+    except (TypeError, ValueError):
+        return False
+    return isinstance(old, float) and isinstance(new, float) and math.isnan(old) and math.isnan(new)
+
+
+def diff_quote(old: Dict, new: Dict) -> Dict:
+    """Return the fields of ``new`` whose value differs from ``old`` (NaN equals NaN)."""
+    return {field: value for field, value in new.items() if field not in old or not _same(old[field], value)}
+
+
+async def fetch_quote(symbol: str) -> Dict:
+    """Fetch the quote of ``symbol`` on the xueqiu provider pool."""
+    from core.providers import run_provider
+    from fin_data.profile import refresh_quote
+    return await run_provider("xueqiu", refresh_quote, symbol)
+
+
+class Subscriber:
+    """The quote changes not yet sent to one client, merged per symbol."""
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, Dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, symbol: str, fields: Dict):
+        self._pending.setdefault(symbol, {}).update(fields)
+        self._ready.set()
+
+    async def updates(self) -> AsyncIterator[Dict[str, Dict]]:
+        """Yield ``{symbol: fields}`` with every change since the previous message."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            pending, self._pending = self._pending, {}
+            if pending:
+                yield pending
+
+
+class QuoteHub:
+    """
+    Fans out quotes polled once per symbol to every subscriber of the symbol.
+
+    Args:
+        fetch (Callable): Coroutine function returning the quote of a
+            symbol as a dict, defaults to ``fetch_quote``.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Dict]] = None):
+        self._fetch = fetch or fetch_quote
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._last: Dict[str, Dict] = {}
+        self._counts = defaultdict(lambda: {"polls": 0, "updates": 0, "errors": 0})
+
+    def subscribe(self, subscriber: Subscriber, symbols: Iterable[str]):
+        """Send the quotes of ``symbols`` to ``subscriber``, starting the pollers still missing."""
+        for symbol in symbols:
+            if symbol in subscriber.symbols:
+                continue
+            if len(subscriber.symbols) >= QUOTE_STREAM_MAX_SYMBOLS:
+                logger.warning("Quote subscriber at %d symbols, ignoring %s", QUOTE_STREAM_MAX_SYMBOLS, symbol)
+                break
+            subscriber.symbols.add(symbol)
+            self._subscribers.setdefault(symbol, set()).add(subscriber)
+            if symbol in self._last:
+                subscriber.push(symbol, self._last[symbol])
+            if symbol not in self._pollers:
+                # In a context of its own: the poller serves every subscriber, and
+                # its spans must not pile up in the trace of the request starting it
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol), name=f"quote_hub.{symbol}",
+                                                            context=contextvars.Context())
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Optional[Iterable[str]] = None):
+        """Stop sending ``symbols`` (default: all) to ``subscriber``, stopping pollers nobody needs."""
+        for symbol in list(subscriber.symbols if symbols is None else symbols):
+            if symbol not in subscriber.symbols:
+                continue
+            subscriber.symbols.discard(symbol)
+            subscribers = self._subscribers[symbol]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._pollers.pop(symbol).cancel()
+                self._last.pop(symbol, None)
+
+    async def _poll(self, symbol: str):
+        counts = self._counts[exchange_of(symbol) or "other"]
+        while True:
+            try:
+                with span("quote_hub.poll", symbol=symbol):
+                    record = await self._fetch(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                counts["errors"] += 1
+                logger.warning("Error polling the quote of %s: %s", symbol, e)
+            else:
+                counts["polls"] += 1
+                changes = diff_quote(self._last.get(symbol, {}), record)
+                self._last[symbol] = dict(record)
+                if changes:
+                    counts["updates"] += 1
+                    for subscriber in self._subscribers.get(symbol, ()):
+                        subscriber.push(symbol, changes)
+            await asyncio.sleep(poll_interval(symbol))
+
+    async def stream(self, symbols: Iterable[str]) -> AsyncIterator[Dict[str, Dict]]:
+        """Subscribe to ``symbols`` for as long as the returned iterator is consumed."""
+        subscriber = Subscriber()
+        self.subscribe(subscriber, symbols)
+        try:
+            async for message in subscriber.updates():
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def close(self):
+        """Stop every poller."""
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._last.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return symbols and subscriptions polled, and poll counters, per exchange."""
+        stats = {exchange: dict(counts, symbols=0, subscriptions=0) for exchange, counts in self._counts.items()}
+        for symbol, subscribers in self._subscribers.items():
+            counts = stats.setdefault(exchange_of(symbol) or "other",
+                                      {"polls": 0, "updates": 0, "errors": 0, "symbols": 0, "subscriptions": 0})
+            counts["symbols"] += 1
+            counts["subscriptions"] += len(subscribers)
+        return stats
+
+
+hub = QuoteHub()
+
+
+def quote_hub_stats() -> Dict[str, Dict[str, int]]:
+    return hub.stats()
+
+
+async def quote_events(symbols: Iterable[str]) -> AsyncIterator[Dict]:
+    """SSE events of the quotes of ``symbols`` for ``EventSourceResponse``."""
+    async for message in hub.stream(symbols):
+        yield {"event": "quotes", "data": encode(message)}
+
+
+async def serve_websocket(websocket, symbols: Iterable[str]):
+    """
+    Send the quotes of ``symbols`` over an accepted WebSocket until it closes.
+
+    The client can change its symbols with ``{"subscribe": "00700,09988"}``
+    and ``{"unsubscribe": "00700"}`` messages; other frames are ignored.
+    """
+    subscriber = Subscriber()
+    hub.subscribe(subscriber, symbols)
+
+    async def send():
+        async for message in subscriber.updates():
+            await websocket.send_text(encode(message))
+
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                request = json.loads(message.get("text") or message.get("bytes") or "")
+            except ValueError:
+                logger.debug("Ignoring a quote stream frame that is not JSON")
+                continue
+            if not isinstance(request, dict):
+                continue
+            if request.get("subscribe"):
+                hub.subscribe(subscriber, parse_symbols(str(request["subscribe"])))
+            if request.get("unsubscribe"):
+                hub.unsubscribe(subscriber, parse_symbols(str(request["unsubscribe"])))
+    finally:
+        sender.cancel()
+        hub.unsubscribe(subscriber)
@@ -3,14 +3,25 @@ import json
 import os
 import asyncio
 from pathlib import Path
+from core.metrics import widget_call
+from core.tracing import span
 
 # Initialize empty dictionaries for widgets and templates
 WIDGETS = {}
 TEMPLATES = {}
 
+# Agent configurations by template name, read from disk once
+_AGENT_CONFIGS = {}
+
+# Pre-serialized /widgets.json, /apps.json and /agents.json, see frozen_payload()
+_PAYLOADS = {}
+
 def register_widget(widget_config):
     """
     Decorator that registers a widget configuration in the WIDGETS dictionary.
+
+    Calls of the decorated endpoint are timed and counted on ``/metrics``
+    under the widget endpoint, and traced as a ``widget <endpoint>`` span.
     
     Args:
         widget_config (dict): The widget configuration to add to the WIDGETS 
@@ -21,24 +32,29 @@ def register_widget(widget_config):
         function: The decorated function.
     """
     def decorator(func):
+        # Extract the endpoint from the widget_config
+        endpoint = widget_config.get("endpoint")
+        widget = endpoint or func.__name__
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             # Call the original function
-            return await func(*args, **kwargs)
+            with widget_call(widget), span(f"widget {widget}"):
+                return await func(*args, **kwargs)
             
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             # Call the original function
-            return func(*args, **kwargs)
+            with widget_call(widget), span(f"widget {widget}"):
+                return func(*args, **kwargs)
         
-        # Extract the endpoint from the widget_config
-        endpoint = widget_config.get("endpoint")
         if endpoint:
             # Add an id field to the widget_config if not already present
             if "id" not in widget_config:
                 widget_config["id"] = endpoint
             
             WIDGETS[endpoint] = widget_config
+            _PAYLOADS.clear()
         
         # Return the appropriate wrapper based on whether the function is async
         if asyncio.iscoroutinefunction(func):
@@ -72,6 +88,7 @@ def add_template(template_name: str):
             template_data = json.load(f)
             # Register the template in the TEMPLATES dictionary
             TEMPLATES[template_name] = template_data
+            _PAYLOADS.clear()
             return True
     except json.JSONDecodeError as e:
         print(f"Invalid JSON in template {template_name}: {e}")
@@ -84,6 +101,8 @@ def add_template(template_name: str):
 def load_agent_config(template_name: str = "agents"):
     """
     Function that loads the agent configuration from a JSON file in the templates directory.
+
+    The file is read once; later calls return the same configuration.
     
     Args:
         template_name (str): The name of the template file (without .json 
@@ -92,6 +111,9 @@ def load_agent_config(template_name: str = "agents"):
     Returns:
         str: JSON string containing the agent configuration
     """
+    if template_name in _AGENT_CONFIGS:
+        return _AGENT_CONFIGS[template_name]
+
     template_path = os.path.join(Path(__file__).parent.parent.resolve(), "templates", f"{template_name}.json")
     
     # Check if file exists
@@ -103,7 +125,7 @@ def load_agent_config(template_name: str = "agents"):
     try:
         with open(template_path, 'r') as f:
             template_data = json.load(f)
-            # Register the template in the TEMPLATES dictionary
+            _AGENT_CONFIGS[template_name] = template_data
             return template_data
     except json.JSONDecodeError as e:
         print(f"Invalid JSON in template {template_name}: {e}")
@@ -111,3 +133,44 @@ def load_agent_config(template_name: str = "agents"):
     except Exception as e:
         print(f"Error loading template {template_name}: {e}")
         return False
+
+
+def freeze_registry():
+    """
+    Serialize and compress the registry documents served to the OpenBB Workspace.
+
+    ``/widgets.json``, ``/apps.json`` and ``/agents.json`` only change when a
+    widget or template is registered, so they are encoded once and served
+    from the stored bytes. Registering a widget or template afterwards
+    discards the payloads and they are rebuilt on next use.
+
+    Returns:
+        dict: The ``StaticPayload`` of each document by file name.
+    """
+    from core.http_cache import StaticPayload
+
+    documents = {
+        "widgets.json": WIDGETS,
+        "apps.json": list(TEMPLATES.values()),
+        "agents.json": load_agent_config(),
+    }
+    payloads = {name: StaticPayload.build(content) for name, content in documents.items()}
+    _PAYLOADS.clear()
+    _PAYLOADS.update(payloads)
+    return payloads
+
+
+def frozen_payload(name: str):
+    """
+    Function that returns the pre-serialized payload of a registry document.
+
+    Args:
+        name (str): ``"widgets.json"``, ``"apps.json"`` or ``"agents.json"``.
+
+    Returns:
+        StaticPayload: The encoded and compressed document.
+    """
+    payload = _PAYLOADS.get(name)
+    if payload is None:
+        payload = freeze_registry()[name]
+    return payload
@@ -0,0 +1,282 @@
+"""
+Shared OHLCV resampling engine.
+
+Every price endpoint (``*/candles``, ``*/prices`` and ``/udf/history``)
+turns stored bars into the requested interval through ``resample_bars``.
+Bars are grouped with NumPy on integer keys computed from the index, so
+aggregation is a handful of ``reduceat`` calls instead of a pandas
+``resample`` per request.
+
+Minute bars follow the trading sessions of the symbol's exchange: buckets
+start at each session open and never span the lunch break, so a 60 minute
+bar on SSE covers 09:30-10:30, 10:30-11:30, 13:00-14:00 and 14:00-15:00.
+Exchange minute bars are stamped with the minute they close on (09:31 is the
+first bar of the day, 11:30 the last one of the morning), as akshare does.
+Week, month and year bars are labelled with the first trading day they
+contain.
+
+``get_resampled_bars`` reads the bars from the local bar store and
+memoizes the result per (symbol, resolution, range), keyed on the bar store
+version so new data is never hidden by the memo.
+"""
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache
+from core.tracing import traced
+
+INTERVALS = ("minute", "day", "week", "month", "year")
+
+# Trading sessions as (open, close) minutes after midnight, local time
+SESSIONS = {
+    "SSE": ((570, 690), (780, 900)),
+    "SZSE": ((570, 690), (780, 900)),
+    "BSE": ((570, 690), (780, 900)),
+    "HKEX": ((570, 720), (780, 960)),
+}
+
+# Market suffix from ``normalize_symbol`` -> exchange
+MARKET_EXCHANGES = {"SH": "SSE", "SZ": "SZSE", "BJ": "BSE", "HK": "HKEX"}
+
+# TradingView resolution suffix -> interval
+UDF_UNITS = {"D": "day", "W": "week", "M": "month"}
+
+# Aggregation per OHLCV column
+AGGREGATIONS = (
+    ("open", "first"),
+    ("high", "max"),
+    ("low", "min"),
+    ("close", "last"),
+    ("volume", "sum"),
+    ("amount", "sum"),
+)
+
+_MINUTE_NS = 60 * 10**9
+_DAY_NS = 24 * 60 * _MINUTE_NS
+
+# Resampled frames are reused while the stored bars are unchanged
+_memo = TTLCache(ttl=int(os.getenv("RESAMPLE_CACHE_SECONDS", "300")), maxsize=256, name="resample")
+
+
+def parse_resolution(resolution: str) -> Tuple[str, int]:
+    """
+    Convert a TradingView resolution to ``(interval, multiplier)``.
+
+    ``"5"`` is five minutes, ``"D"``/``"1D"`` one day, ``"2W"`` two weeks and
+    ``"M"`` one month.
+
+    Raises:
+        ValueError: If the resolution is not supported.
+    """
+    res = resolution.strip().upper()
+    if res.isdigit():
+        return "minute", int(res)
+    count, unit = res[:-1] or "1", res[-1:]
+    if unit not in UDF_UNITS or not count.isdigit():
+        raise ValueError(f"Unsupported resolution: {resolution}")
+    return UDF_UNITS[unit], int(count)
+
+
+def exchange_of(symbol: str) -> Optional[str]:
+    """Return the exchange of a CN/HK symbol, or ``None`` if it is unknown."""
+    from mysharelib.tools import normalize_symbol
+    try:
+        _, _, market = normalize_symbol(symbol)
+    except Exception:
+        return None
+    return MARKET_EXCHANGES.get(market)
+
+
+def is_intraday(index: pd.Index) -> bool:
+    """Whether any bar of a datetime index is not at midnight."""
+    return bool(len(index)) and bool((pd.DatetimeIndex(index).asi8 % _DAY_NS).any())
+
+
+def _minute_keys(ns: np.ndarray, multiplier: int, exchange: Optional[str]) -> np.ndarray:
+    """Return the bucket start of every bar, in nanoseconds."""
+    if exchange in SESSIONS:
+        # Exchange minute bars are stamped with their closing minute
+        ns = ns - 1
+    sessions = np.array(SESSIONS.get(exchange, ((0, 1440),)), dtype=np.int64)
+    opens, closes = sessions[:, 0], sessions[:, 1]
+    day = ns - ns % _DAY_NS
+    minute = (ns - day) // _MINUTE_NS
+    # Bars before the first open (the opening auction) join the first bucket,
+    # bars after a close join the session's last bucket.
+    session = np.clip(np.searchsorted(opens, minute, side="right") - 1, 0, len(opens) - 1)
+    start = opens[session]
+    last_bucket = (closes[session] - start - 1) // multiplier
+    bucket = np.clip((minute - start) // multiplier, 0, last_bucket)
+    return day + (start + bucket * multiplier) * _MINUTE_NS
+
+
+def _calendar_keys(ns: np.ndarray, interval: str, multiplier: int) -> np.ndarray:
+    """Return the period number of every bar for day/week/month/year bars."""
+    values = ns.view("datetime64[ns]")
+    if interval == "day":
+        days = values.astype("datetime64[D]").astype(np.int64)
+        # Count trading days, so "5 day" bars hold five sessions
+        trading_day = np.cumsum(np.r_[True, days[1:] != days[:-1]]) - 1
+        return trading_day // multiplier
+    if interval == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (values.astype("datetime64[D]").astype(np.int64) + 3) // 7 // multiplier
+    if interval == "month":
+        return values.astype("datetime64[M]").astype(np.int64) // multiplier
+    return values.astype("datetime64[Y]").astype(np.int64) // multiplier
+
+
+def aggregate_runs(frame: pd.DataFrame, keys: np.ndarray, labels: np.ndarray) -> pd.DataFrame:
+    """
+    Aggregate consecutive runs of equal ``keys`` into one bar each.
+
+    Args:
+        frame (pd.DataFrame): Sorted OHLCV bars.
+        keys (np.ndarray): Group key of every bar, equal within a run.
+        labels (np.ndarray): Nanosecond timestamp of every bar; each output
+            bar is labelled with the one of its first bar.
+
+    Returns:
+        pd.DataFrame: One row per run, indexed by a DatetimeIndex.
+    """
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    columns = {c.lower(): c for c in frame.columns}
+
+    data = {}
+    for name, how in AGGREGATIONS:
+        column = columns.get(name)
+        if column is None:
+            continue
+        values = frame[column].to_numpy()
+        if how == "sum":
+            if values.dtype.kind not in "iu":
+                values = np.nan_to_num(values.astype(np.float64))
+            data[column] = np.add.reduceat(values, starts)
+            continue
+        values = values.astype(np.float64)
+        if how == "first":
+            data[column] = values[starts]
+        elif how == "last":
+            data[column] = values[ends]
+        elif how == "max":
+            data[column] = np.fmax.reduceat(values, starts)
+        else:
+            data[column] = np.fmin.reduceat(values, starts)
+
+    index = pd.DatetimeIndex(labels[starts].view("datetime64[ns]"), name=frame.index.name or "date")
+    return pd.DataFrame(data, index=index)
+
+
+def resample_bars(
+    frame: pd.DataFrame,
+    interval: str,
+    multiplier: int = 1,
+    exchange: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Aggregate OHLCV bars into ``multiplier`` x ``interval`` bars.
+
+    Args:
+        frame (pd.DataFrame): Bars indexed by date or datetime, with any of
+            the ``open/high/low/close/volume/amount`` columns (any case).
+        interval (str): One of ``minute``, ``day``, ``week``, ``month``,
+            ``year``.
+        multiplier (int): Number of intervals per bar.
+        exchange (str): Exchange whose sessions bound minute bars, e.g.
+            ``"SSE"`` or ``"HKEX"``. Without one, minute bars are aligned
+            to midnight.
+
+    Returns:
+        pd.DataFrame: The aggregated bars indexed by a DatetimeIndex. Daily
+        bars at ``1 day`` are returned unchanged. Minute bars cannot be
+        built from daily data, so an empty frame is returned in that case.
+
+    Raises:
+        ValueError: If the interval or multiplier is invalid.
+    """
+    interval = interval.lower()
+    multiplier = int(multiplier)
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    if multiplier < 1:
+        raise ValueError(f"Interval multiplier must be positive, got {multiplier}")
+
+    if not isinstance(frame.index, pd.DatetimeIndex):
+        frame = frame.copy()
+        frame.index = pd.to_datetime(frame.index)
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+
+    intraday = is_intraday(frame.index)
+    if frame.empty or (interval == "minute" and not intraday):
+        return frame.iloc[:0]
+    if interval == "day" and multiplier == 1 and not intraday:
+        return frame
+
+    ns = frame.index.asi8
+    if interval == "minute":
+        keys = labels = _minute_keys(ns, multiplier, exchange)
+    else:
+        keys = _calendar_keys(ns, interval, multiplier)
+        labels = ns - ns % _DAY_NS
+    return aggregate_runs(frame, keys, labels)
+
+
+def _bounds(start, end) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Inclusive timestamps for a range; plain dates cover their whole day."""
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end)
+    if not isinstance(end, datetime):
+        end_ts = end_ts.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return start_ts, end_ts
+
+
+@traced("transform.resample")
+def get_resampled_bars(
+    symbol: str,
+    interval: str,
+    multiplier: int,
+    start,
+    end,
+    strict: bool = False
+) -> pd.DataFrame:
+    """
+    Return the bars of ``symbol`` in ``[start, end]`` at the requested interval.
+
+    Args:
+        symbol (str): The ticker.
+        interval (str): ``minute``, ``day``, ``week``, ``month`` or ``year``.
+        multiplier (int): Number of intervals per bar.
+        start: First date or timestamp of the range.
+        end: Last date (whole day) or timestamp (inclusive) of the range.
+        strict (bool): If set, a resolution finer than the stored data
+            yields an empty frame. Otherwise the stored bars are returned.
+
+    Returns:
+        pd.DataFrame: Bars indexed by a DatetimeIndex. The frame may be
+        shared with other callers and must not be modified.
+    """
+    from core import bar_store
+
+    start_ts, end_ts = _bounds(start, end)
+    # The bars are only read on a miss
+    version, read_bars = bar_store.sync_range(symbol, start_ts.date(), end_ts.date())
+    key = (symbol, interval, int(multiplier), start_ts, end_ts, strict, version)
+
+    def load():
+        frame = read_bars()
+        if not isinstance(frame.index, pd.DatetimeIndex):
+            frame = frame.copy()
+            frame.index = pd.to_datetime(frame.index)
+        frame = frame[(frame.index >= start_ts) & (frame.index <= end_ts)]
+        resampled = resample_bars(frame, interval, multiplier, exchange_of(symbol))
+        if resampled.empty and not strict:
+            return frame
+        return resampled
+
+    return _memo.get_or_load(key, load)
@@ -0,0 +1,186 @@
+"""
+Typeahead index over the symbol universe.
+
+The index is built once per universe snapshot and answers TradingView
+``/udf/search`` queries without scanning the symbol table. Every symbol is
+reachable by its code, its name, the full pinyin of its name and the pinyin
+initials (``zgyh`` finds 中国银行). Results are ranked exact > prefix >
+contains, keeping the universe order within each tier, and collection stops
+as soon as ``limit`` results are found.
+"""
+import heapq
+import re
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]")
+
+
+def normalize_key(text: str) -> str:
+    """Lower-case ``text`` and drop everything but ASCII letters and digits."""
+    return _NON_ALNUM.sub("", text.lower())
+
+
+def pinyin_keys(name: str) -> Tuple[str, str]:
+    """
+    Return the full pinyin and the pinyin initials of a symbol name.
+
+    Args:
+        name (str): The symbol name, e.g. ``"中国银行"``.
+
+    Returns:
+        tuple: ``("zhongguoyinhang", "zgyh")``. Latin parts of the name are
+        kept as they are, so ``"TCL科技"`` gives ``("tclkeji", "tclkj")``.
+    """
+    from pypinyin import Style, lazy_pinyin
+
+    full = normalize_key("".join(lazy_pinyin(name)))
+    initials = normalize_key("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)))
+    return full, initials
+
+
+class _Trie:
+    """Prefix trie whose nodes keep the ascending ids of every key below them."""
+
+    __slots__ = ("_root",)
+
+    def __init__(self):
+        # A node is a pair of (children, ids)
+        self._root = ({}, [])
+
+    def insert(self, key: str, item_id: int):
+        node = self._root
+        for char in key:
+            children = node[0]
+            child = children.get(char)
+            if child is None:
+                child = children[char] = ({}, [])
+            node = child
+            ids = node[1]
+            # ids are inserted in ascending order, so a duplicate is always last
+            if not ids or ids[-1] != item_id:
+                ids.append(item_id)
+
+    def prefixed(self, prefix: str) -> Sequence[int]:
+        """Return the ascending ids of all keys starting with ``prefix``."""
+        node = self._root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return ()
+        return node[1]
+
+
+class SymbolIndex:
+    """
+    Search index over a sequence of symbol records.
+
+    Args:
+        records (Sequence[dict]): Records with ``symbol`` and ``name`` keys,
+            in the order results should be returned within a tier.
+        use_pinyin (bool): Whether to index pinyin keys for the names.
+    """
+
+    def __init__(self, records: Sequence[dict], use_pinyin: bool = True):
+        self.records = tuple(records)
+        self._exact = {}
+        self._codes = _Trie()
+        self._names = _Trie()
+        self._pinyin = _Trie()
+        self._grams = {}
+        self._haystacks = []
+
+        for item_id, record in enumerate(self.records):
+            code = str(record.get("symbol") or "").lower()
+            name = str(record.get("name") or "").lower()
+            full, initials = pinyin_keys(name) if use_pinyin and name else ("", "")
+
+            for key in {code, name, full, initials}:
+                if key:
+                    self._exact.setdefault(key, []).append(item_id)
+            self._codes.insert(code, item_id)
+            self._names.insert(name, item_id)
+            for key in {full, initials}:
+                self._pinyin.insert(key, item_id)
+
+            haystack = "\x00".join((code, name, full, initials))
+            self._haystacks.append(haystack)
+            for gram in self._ngrams(haystack):
+                postings = self._grams.setdefault(gram, [])
+                if not postings or postings[-1] != item_id:
+                    postings.append(item_id)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _ngrams(text: str) -> Iterator[str]:
+        """Yield the unigrams and bigrams of ``text``."""
+        for i, char in enumerate(text):
+            if char == "\x00":
+                continue
+            yield char
+            pair = text[i:i + 2]
+            if len(pair) == 2 and pair[1] != "\x00":
+                yield pair
+
+    def _contains(self, query: str) -> Iterator[int]:
+        """Yield, in ascending order, the ids whose keys contain ``query``."""
+        if len(query) == 1:
+            yield from self._grams.get(query, ())
+            return
+        # Verify candidates from the rarest bigram of the query
+        candidates = None
+        for i in range(len(query) - 1):
+            ids = self._grams.get(query[i:i + 2])
+            if not ids:
+                return
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        haystacks = self._haystacks
+        for item_id in candidates:
+            if query in haystacks[item_id]:
+                yield item_id
+
+    def search(self, query: str, limit: int = 30) -> List[dict]:
+        """
+        Return at most ``limit`` records matching ``query``.
+
+        Args:
+            query (str): Code, name, pinyin or pinyin-initials fragment.
+            limit (int): Maximum number of records to return.
+
+        Returns:
+            list: Matching records ranked exact > prefix > contains.
+        """
+        if limit <= 0:
+            return []
+        q = query.strip().lower()
+        if not q:
+            return list(self.records[:limit])
+
+        keys = {q}
+        q_key = normalize_key(q)
+        if q_key:
+            keys.add(q_key)
+
+        exact = heapq.merge(*(self._exact.get(k, ()) for k in keys))
+        prefix = heapq.merge(
+            self._codes.prefixed(q),
+            self._names.prefixed(q),
+            *(self._pinyin.prefixed(k) for k in keys),
+        )
+        contains = heapq.merge(*(self._contains(k) for k in keys))
+        return self._collect((exact, prefix, contains), limit)
+
+    def _collect(self, tiers: Iterable[Iterator[int]], limit: int) -> List[dict]:
+        seen = set()
+        results = []
+        for tier in tiers:
+            for item_id in tier:
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                results.append(self.records[item_id])
+                if len(results) >= limit:
+                    return results
+        return results
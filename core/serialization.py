@@ -0,0 +1,75 @@
+"""
+Fast JSON encoding for large array payloads.
+
+Responses such as ``/udf/history`` are a handful of long numeric arrays.
+Encoding them with FastAPI's generic ``jsonable_encoder`` walks every value
+in Python; here the columns are converted to NumPy arrays once and written
+by orjson directly, with NaN written as ``null`` inside orjson.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import Response
+
+from core.tracing import traced
+
+# UDF field name -> OHLCV column name
+UDF_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("o", "open"),
+    ("h", "high"),
+    ("l", "low"),
+    ("c", "close"),
+    ("v", "volume"),
+)
+
+
+def float_array(frame: pd.DataFrame, column: str) -> np.ndarray:
+    """Return ``column`` as a contiguous float64 array, all-NaN if it is missing."""
+    if column not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return np.ascontiguousarray(frame[column].to_numpy(dtype=np.float64, na_value=np.nan))
+
+
+def epoch_seconds(index: pd.Index) -> np.ndarray:
+    """Return a datetime index as int64 Unix seconds."""
+    values = pd.DatetimeIndex(index).values.astype("datetime64[s]")
+    return np.ascontiguousarray(values.astype(np.int64))
+
+
+def udf_history_arrays(frame: pd.DataFrame, columns: Dict[str, str] = None) -> Dict[str, np.ndarray]:
+    """
+    Convert an OHLCV frame into the arrays of a UDF history response.
+
+    Args:
+        frame (pd.DataFrame): Bars indexed by datetime.
+        columns (dict): Optional mapping from OHLCV names to the frame's
+            actual column names.
+
+    Returns:
+        dict: ``t`` as int64 seconds and ``o/h/l/c/v`` as float64 arrays.
+    """
+    columns = columns or {}
+    arrays = {"t": epoch_seconds(frame.index)}
+    for field, name in UDF_FIELDS:
+        arrays[field] = float_array(frame, columns.get(name, name))
+    return arrays
+
+
+@traced("serialize")
+def dumps(content) -> bytes:
+    """Serialize ``content`` with orjson, NumPy arrays included."""
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+@traced("serialize.udf_history")
+def encode_udf_history(frame: pd.DataFrame, columns: Dict[str, str] = None) -> bytes:
+    """Encode an OHLCV frame as the JSON body of a ``{"s": "ok"}`` UDF response."""
+    return dumps({"s": "ok", **udf_history_arrays(frame, columns)})
+
+
+class JSONBytesResponse(Response):
+    """A JSON response whose body has already been encoded."""
+
+    media_type = "application/json"
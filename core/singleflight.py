@@ -0,0 +1,127 @@
+"""
+Single-flight coalescing of identical calls.
+
+When several requests ask for the same data at the same time (e.g. the
+``hk/candles`` and ``hk/prices`` widgets of one dashboard, or many users
+opening it at once), only the first call reaches the provider. The others
+wait for it and receive the same result or exception. Nothing is kept once
+the call completes; use ``TTLCache`` to also reuse results afterwards.
+
+Results are shared between callers and must not be modified in place.
+"""
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def call_key(func: Callable, args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """Return a key identifying ``func(*args, **kwargs)``, or ``None`` if an argument is unhashable."""
+    key = (getattr(func, "__module__", None), getattr(func, "__qualname__", func), args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    Args:
+        name (str): Name used when reporting statistics.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    def future(self, key: Optional[Hashable], start: Callable[[], Future]) -> Future:
+        """
+        Return the in-flight future for ``key``, or the one returned by ``start()``.
+
+        ``start`` schedules the work (e.g. ``pool.submit``) and is only called
+        when no call with the same key is running. A ``None`` key is never
+        coalesced.
+        """
+        with self._lock:
+            self.calls += 1
+            if key is not None:
+                future = self._inflight.get(key)
+                if future is not None:
+                    self.collapsed += 1
+                    return future
+            self.executions += 1
+            future = start()
+            if key is None:
+                return future
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def do(self, key: Optional[Hashable], func: Callable, *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` in the calling thread unless a call with ``key`` is running."""
+        owned = Future()
+        future = self.future(key, lambda: owned)
+        if future is not owned:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            owned.set_exception(e)
+            raise
+        owned.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters and the number of calls in flight."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "collapsed": self.collapsed,
+                "inflight": len(self._inflight),
+            }
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """Return the process-wide single-flight group ``name``."""
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.setdefault(name, SingleFlight(name))
+    return flight
+
+
+def singleflight(group: str) -> Callable:
+    """
+    Decorate a blocking function so identical concurrent calls run once.
+
+    Calls are identified by the function and its arguments; calls with
+    unhashable arguments are not coalesced.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_flight(group).do(call_key(func, args, kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Return the counters of every single-flight group."""
+    return {name: flight.stats() for name, flight in list(_flights.items())}
@@ -0,0 +1,117 @@
+"""
+Coalescing of streamed agent answers into fewer SSE events.
+
+An LLM streams its answer as many tiny deltas. Sending one
+``message_chunk`` event per delta costs a model dump, an SSE encode and a
+socket write each, which adds up under concurrent chats. ``coalesced``
+joins the deltas that arrive within ``SSE_COALESCE_MS`` of the first
+buffered one into a single chunk, sending earlier once ``SSE_COALESCE_BYTES``
+are buffered. The first delta is sent at once, so the time to first token
+does not change, and a slow stream is never held back longer than the
+window; the text the Workspace shows is the same, only in fewer events.
+
+Both settings can be overridden per endpoint, e.g.
+``SSE_COALESCE_MS_CHATGLM`` or ``SSE_COALESCE_BYTES_OPENROUTER``; a window
+of 0 sends every delta as it comes.
+
+``encode_events`` encodes the events for ``EventSourceResponse``. Events per
+answer, streamed deltas and the CPU time spent building and encoding events
+are exported on ``/metrics``; CPU per streamed token is
+``rate(openbb_hka_sse_cpu_seconds_total) / rate(openbb_hka_sse_tokens_total)``.
+"""
+import asyncio
+import contextlib
+import os
+import time
+from typing import AsyncIterable, AsyncIterator, Tuple
+
+from sse_starlette.sse import ServerSentEvent
+
+from core.metrics import SSE_CPU, SSE_EVENTS, SSE_TOKENS
+
+DEFAULT_WINDOW_MS = float(os.getenv("SSE_COALESCE_MS", "30"))
+DEFAULT_MAX_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "512"))
+
+
+def coalesce_settings(endpoint: str) -> Tuple[float, int]:
+    """Return the window in seconds and the byte limit of ``endpoint``."""
+    name = endpoint.upper()
+    window_ms = float(os.getenv(f"SSE_COALESCE_MS_{name}", DEFAULT_WINDOW_MS))
+    max_bytes = int(os.getenv(f"SSE_COALESCE_BYTES_{name}", DEFAULT_MAX_BYTES))
+    return window_ms / 1000, max_bytes
+
+
+async def coalesce(chunks: AsyncIterable[str], window: float, max_bytes: int) -> AsyncIterator[Tuple[str, int]]:
+    """
+    Join the chunks arriving within ``window`` seconds of the first buffered one.
+
+    The first chunk is yielded on its own, as soon as it arrives.
+
+    Yields:
+        tuple[str, int]: The joined text and the number of chunks in it.
+    """
+    iterator = chunks.__aiter__()
+    if window <= 0:
+        async for chunk in iterator:
+            yield chunk, 1
+        return
+
+    loop = asyncio.get_running_loop()
+    buffer, size, deadline = [], 0, None
+    pending, first = None, True
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if not done:
+                # The window closed before the next chunk arrived
+                yield "".join(buffer), len(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            buffer.append(chunk)
+            size += len(chunk.encode("utf-8"))
+            if deadline is None:
+                deadline = loop.time() + window
+            if first or (max_bytes and size >= max_bytes):
+                first = False
+                yield "".join(buffer), len(buffer)
+                buffer, size, deadline = [], 0, None
+        if buffer:
+            yield "".join(buffer), len(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await pending
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+async def coalesced(endpoint: str, chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Coalesce the streamed chunks of an answer with the settings of ``endpoint``."""
+    window, max_bytes = coalesce_settings(endpoint)
+    events = tokens = 0
+    try:
+        async for text, count in coalesce(chunks, window, max_bytes):
+            events += 1
+            tokens += count
+            yield text
+    finally:
+        SSE_EVENTS.labels(endpoint).observe(events)
+        SSE_TOKENS.labels(endpoint).inc(tokens)
+
+
+async def encode_events(endpoint: str, events: AsyncIterable) -> AsyncIterator[bytes]:
+    """Encode SSE models (e.g. ``message_chunk``) for ``EventSourceResponse``, counting the CPU it takes."""
+    async for event in events:
+        started = time.thread_time()
+        data = ServerSentEvent(**event.model_dump()).encode()
+        SSE_CPU.labels(endpoint).inc(time.thread_time() - started)
+        yield data
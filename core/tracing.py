@@ -0,0 +1,291 @@
+"""
+Lightweight request tracing.
+
+Spans follow the OpenTelemetry model: every span has a trace id, a span id,
+its parent's id, start and end times, attributes and an error status. The
+current span is kept in a ``contextvars.ContextVar``, so spans opened in a
+route, in FastAPI's thread pool or on a provider pool (``core.providers``
+copies the context) nest under the request that caused them.
+
+- ``TracingMiddleware`` opens the root span of every HTTP request.
+- ``span`` and ``traced`` open child spans around auth, provider calls,
+  DataFrame transforms, figure builds and serialization.
+
+Finished traces are written, one span per line, to ``TRACE_FILE`` and/or
+posted as OTLP/HTTP JSON to ``TRACE_OTLP_ENDPOINT`` (e.g. a local collector
+at ``http://localhost:4318/v1/traces``) by a background thread. Traces whose
+root takes longer than ``TRACE_SLOW_MS`` are logged with the time of each
+span, whether or not they are exported.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "openbb-hka")
+# 0 disables slow-call logging
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))
+
+
+@dataclass
+class Span:
+    """One timed operation of a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+# Spans of traces whose root is still open, by trace id
+_open: Dict[str, List[Span]] = {}
+_open_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span of the current context."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as a span, child of the current span if any.
+
+    Yields:
+        Span: The open span, to add attributes with ``set``.
+    """
+    parent = _current.get()
+    opened = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    if parent is None:
+        with _open_lock:
+            _open[opened.trace_id] = []
+    token = _current.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        opened.end_ns = time.time_ns()
+        _current.reset(token)
+        _finish(opened)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorate a function, sync or async, so each call is a span (default name: the qualified function name)."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(finished: Span):
+    with _open_lock:
+        if finished.parent_id is None:
+            spans = _open.pop(finished.trace_id, [])
+            spans.append(finished)
+        elif finished.trace_id in _open:
+            _open[finished.trace_id].append(finished)
+            return
+        else:
+            # Outlived its root, e.g. a shielded provider call
+            spans = [finished]
+    if finished.parent_id is None and TRACE_SLOW_MS and finished.duration_ms >= TRACE_SLOW_MS:
+        logger.warning("Slow %s (%.0f ms):\n%s", finished.name, finished.duration_ms, format_trace(spans))
+    if TRACE_FILE or TRACE_OTLP_ENDPOINT:
+        _exporter().put(spans)
+
+
+def format_trace(spans: List[Span]) -> str:
+    """Render the spans of a trace as an indented tree with their durations."""
+    children: Dict[Optional[str], List[Span]] = {}
+    ids = {s.span_id for s in spans}
+    for s in sorted(spans, key=lambda s: s.start_ns):
+        children.setdefault(s.parent_id if s.parent_id in ids else None, []).append(s)
+    lines = []
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            error = f"  !! {s.error}" if s.error else ""
+            lines.append(f"{'  ' * depth}{s.name}  {s.duration_ms:.1f} ms{error}")
+            walk(s.span_id, depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> dict:
+    """Encode spans as an OTLP/HTTP JSON ``ExportTraceServiceRequest``."""
+    encoded = []
+    for s in spans:
+        item = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            # SERVER for request roots, INTERNAL otherwise
+            "kind": 2 if s.parent_id is None else 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        encoded.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": encoded}],
+    }]}
+
+
+class _Exporter:
+    """Writes finished traces to the file and/or OTLP endpoint from a daemon thread."""
+
+    def __init__(self, path: str, endpoint: str, max_batch: int = 512):
+        self.path = path
+        self.endpoint = endpoint
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=10_000)
+        self.dropped = 0
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def put(self, spans: List[Span]):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _run(self):
+        while True:
+            batch = list(self._queue.get())
+            while len(batch) < self.max_batch:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+            except Exception as e:
+                logger.warning("Exporting %d spans failed: %s", len(batch), e)
+
+    def export(self, spans: List[Span]):
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in spans)
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint, data=json.dumps(to_otlp(spans)).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+
+
+_exporter_instance: Optional[_Exporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter() -> _Exporter:
+    global _exporter_instance
+    if _exporter_instance is None:
+        with _exporter_lock:
+            if _exporter_instance is None:
+                _exporter_instance = _Exporter(TRACE_FILE, TRACE_OTLP_ENDPOINT)
+    return _exporter_instance
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with span("HTTP " + scope["method"], **{"http.method": scope["method"]}) as root:
+            async def send_status(message):
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_status)
+            finally:
+                # The router stores the matched route in the shared scope
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
+                    root.set(**{"http.route": route})
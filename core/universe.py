@@ -0,0 +1,215 @@
+"""
+Process-wide symbol universe.
+
+The CN+HK symbol list returned by ``obb.equity.search`` is loaded once and
+kept as an immutable snapshot. A daemon thread reloads it on a schedule and
+swaps in the new snapshot with a single reference assignment, so readers
+never wait on a refresh and never see a half-built universe.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
+import pandas as pd
+
+from core.search_index import SymbolIndex
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background refreshes of the symbol universe (0 disables)
+REFRESH_INTERVAL = int(os.getenv("UNIVERSE_REFRESH_SECONDS", "21600"))
+
+COLUMNS = ["symbol", "name", "exchange"]
+
+
+@dataclass(frozen=True)
+class UniverseSnapshot:
+    """
+    An immutable view of the symbol universe at one point in time.
+
+    Attributes:
+        frame (pd.DataFrame): The symbol table with ``symbol``, ``name`` and
+            ``exchange`` columns. Shared between readers, do not modify.
+        by_symbol (Mapping[str, dict]): Records keyed by symbol.
+        positions (Mapping[str, int]): Position in ``frame`` of each symbol's
+            row, with every provider column.
+        tickers (Mapping[str, tuple]): Precomputed option lists for the
+            ``*/tickers`` endpoints, keyed by ``"HKEX"`` and ``"CN"``.
+        index (SymbolIndex): Typeahead index over the records.
+        loaded_at (float): Unix timestamp of when the snapshot was built.
+    """
+    frame: pd.DataFrame
+    by_symbol: Mapping[str, dict]
+    positions: Mapping[str, int]
+    tickers: Mapping[str, tuple]
+    index: SymbolIndex
+    loaded_at: float
+
+    def get_tickers(self, exchange: str = "") -> tuple:
+        """Return the ticker options for HKEX, or for the CN exchanges."""
+        return self.tickers["HKEX" if exchange == "HKEX" else "CN"]
+
+    def row(self, symbol: str) -> Optional[pd.Series]:
+        """Return the full provider row of ``symbol``, or ``None`` if it is unknown."""
+        position = self.positions.get(symbol)
+        return None if position is None else self.frame.iloc[position]
+
+
+def _ticker_option(record: dict) -> dict:
+    return {
+        "label": record["name"] or "Unknown Company",
+        "value": record["symbol"] or "invalid ticker",
+        "extraInfo": {
+            "description": record["symbol"] or "invalid ticker",
+            "rightOfDescription": record["exchange"] or "invalid"
+        }
+    }
+
+
+def build_snapshot(df: Optional[pd.DataFrame]) -> UniverseSnapshot:
+    """
+    Build a snapshot from the symbol table returned by the provider.
+
+    Args:
+        df (pd.DataFrame): Symbol table, possibly ``None`` or empty.
+
+    Returns:
+        UniverseSnapshot: The new snapshot.
+    """
+    if df is None:
+        df = pd.DataFrame(columns=COLUMNS)
+    frame = df.copy()
+    for column in COLUMNS:
+        if column not in frame.columns:
+            frame[column] = None
+    frame = frame.reset_index(drop=True)
+
+    records = frame[COLUMNS].astype(object).where(frame[COLUMNS].notna(), None).to_dict(orient="records")
+    by_symbol, positions = {}, {}
+    for position, record in enumerate(records):
+        if record["symbol"] not in by_symbol:
+            by_symbol[record["symbol"]] = record
+            positions[record["symbol"]] = position
+
+    hk = tuple(_ticker_option(r) for r in records if r["exchange"] == "HKEX")
+    cn = tuple(_ticker_option(r) for r in records if r["exchange"] != "HKEX")
+
+    return UniverseSnapshot(
+        frame=frame,
+        by_symbol=MappingProxyType(by_symbol),
+        positions=MappingProxyType(positions),
+        tickers=MappingProxyType({"HKEX": hk, "CN": cn}),
+        index=SymbolIndex(records),
+        loaded_at=time.time(),
+    )
+
+
+def search_symbols(use_cache: bool = True) -> pd.DataFrame:
+    """Fetch the full CN+HK symbol table from the akshare provider."""
+    from openbb import obb
+    from core.metrics import provider_call
+    with provider_call("akshare", "obb.equity.search"):
+        return obb.equity.search(provider="akshare", use_cache=use_cache).to_dataframe()
+
+
+class SymbolUniverse:
+    """
+    Holds the current universe snapshot and refreshes it in the background.
+
+    The first reader loads the universe synchronously (concurrent first
+    readers wait for the same load). Afterwards ``start`` keeps a daemon
+    thread that rebuilds the snapshot every ``refresh_interval`` seconds. A
+    failed refresh is logged and the previous snapshot keeps being served.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[bool], pd.DataFrame] = search_symbols,
+        refresh_interval: int = REFRESH_INTERVAL
+    ):
+        self._loader = loader
+        self._refresh_interval = refresh_interval
+        self._snapshot: Optional[UniverseSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a snapshot is available without loading."""
+        return self._snapshot is not None
+
+    def snapshot(self) -> UniverseSnapshot:
+        """Return the current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = build_snapshot(self._loader(True))
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self) -> UniverseSnapshot:
+        """
+        Reload the universe from the provider and swap in the new snapshot.
+
+        An empty provider result does not replace a non-empty snapshot.
+        """
+        with self._load_lock:
+            snapshot = build_snapshot(self._loader(False))
+            if snapshot.frame.empty and self._snapshot is not None and not self._snapshot.frame.empty:
+                logger.warning("Symbol universe refresh returned no symbols, keeping previous snapshot")
+                return self._snapshot
+            self._snapshot = snapshot
+        logger.info(f"Symbol universe refreshed with {len(snapshot.frame)} symbols")
+        return snapshot
+
+    def start(self):
+        """Warm the universe and start the background refresh thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="symbol-universe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+
+    def _run(self):
+        try:
+            self.snapshot()
+        except Exception as e:
+            logger.error(f"Error loading symbol universe: {e}")
+        if self._refresh_interval <= 0:
+            return
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing symbol universe: {e}")
+
+
+universe = SymbolUniverse()
+
+
+def get_universe() -> UniverseSnapshot:
+    """Return the current process-wide universe snapshot."""
+    return universe.snapshot()
+
+
+async def aget_universe() -> UniverseSnapshot:
+    """
+    Return the universe snapshot from async code.
+
+    Once loaded this is a plain attribute read; the first load runs on the
+    akshare provider pool so it does not block the event loop.
+    """
+    if universe.loaded:
+        return universe.snapshot()
+    from core.providers import run_provider
+    return await run_provider("akshare", universe.snapshot)
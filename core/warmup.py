@@ -0,0 +1,78 @@
+"""
+Background warm-up of heavy dependencies.
+
+The routers import OpenBB, akshare, plotly and magentic on first use instead
+of at module load, so the server accepts requests (and answers ``/health``)
+within a fraction of the cold import time. ``start_warmup`` then imports
+those modules in a daemon thread, so the first widget request usually finds
+them loaded already. Set ``STARTUP_WARMUP=0`` to skip it, e.g. with
+``uvicorn --reload``.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Slowest first: the OpenBB static package dominates the cold start
+WARMUP_MODULES = (
+    "openbb",
+    "fin_data.profile",
+    "fin_data.financials",
+    "plotly.graph_objects",
+    "core.agent",
+)
+
+WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "1") != "0"
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_timings: Dict[str, float] = {}
+_errors: Dict[str, str] = {}
+
+
+def _warm(modules: Iterable[str], tasks: Iterable[Callable[[], object]]):
+    steps = [(name, lambda name=name: importlib.import_module(name)) for name in modules]
+    steps += [(task.__name__, task) for task in tasks]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            _errors[name] = repr(e)
+            logger.warning("Warm-up of %s failed: %s", name, e)
+            continue
+        _timings[name] = round(time.perf_counter() - started, 3)
+    logger.info("Warm-up finished: %s", _timings)
+
+
+def start_warmup(modules: Iterable[str] = WARMUP_MODULES,
+                 tasks: Iterable[Callable[[], object]] = ()) -> Optional[threading.Thread]:
+    """
+    Import ``modules`` and then run ``tasks`` in a background thread, once per process.
+
+    Returns:
+        threading.Thread | None: The warm-up thread, ``None`` if warm-up is
+        disabled.
+    """
+    global _thread
+    if not WARMUP_ENABLED:
+        return None
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm, args=(tuple(modules), tuple(tasks)), name="warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def warmup_stats() -> dict:
+    """Return whether warm-up finished, the time of each step and the failed steps."""
+    return {
+        "enabled": WARMUP_ENABLED,
+        "done": _thread is not None and not _thread.is_alive(),
+        "seconds": dict(_timings),
+        "errors": dict(_errors),
+    }
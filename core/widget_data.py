@@ -0,0 +1,114 @@
+"""
+In-process data retrieval for widgets served by this backend.
+
+The ``/a/chatglm`` agent used to answer a widget-grounded question by
+sending ``get_widget_data`` back to the Workspace, which then called our
+own widget endpoints and posted the data in a second request. Widgets
+registered in ``core.registry.WIDGETS`` are now fetched by calling the app
+itself through an in-process ASGI transport: the requests run concurrently
+and go through the same parameter validation, auth, caches, metrics and
+tracing spans as a Workspace request, without leaving the process. Only
+widgets of other backends still take the client round trip.
+
+Only widgets whose endpoint is a GET route of the app are resolved locally;
+the TradingView widget, for one, points at the base URL of the ``/udf/*``
+routes and keeps the round trip. ``LOCAL_WIDGET_ORIGINS`` limits local
+resolution to widgets whose origin is in the comma-separated list (empty =
+any origin with a known widget id).
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Set
+
+import httpx
+from openbb_ai.models import Widget, WidgetRequest
+
+from core.registry import WIDGETS
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+LOCAL_WIDGET_ORIGINS = {o.strip() for o in os.getenv("LOCAL_WIDGET_ORIGINS", "").split(",") if o.strip()}
+LOCAL_WIDGET_TIMEOUT = float(os.getenv("LOCAL_WIDGET_TIMEOUT_SECONDS", "60"))
+
+
+def get_paths(app) -> Set[str]:
+    """Return the paths ``app`` serves to GET requests."""
+    return {route.path for route in app.routes if "GET" in getattr(route, "methods", ())}
+
+
+def local_endpoint(widget: Widget, paths: Optional[Set[str]] = None) -> Optional[str]:
+    """
+    Return the path serving ``widget`` on this backend, ``None`` for a foreign widget.
+
+    With ``paths`` (see ``get_paths``), a widget whose endpoint is not one of
+    them is foreign too.
+    """
+    if LOCAL_WIDGET_ORIGINS and widget.origin not in LOCAL_WIDGET_ORIGINS:
+        return None
+    widget_config = WIDGETS.get(widget.widget_id)
+    if widget_config is None:
+        return None
+    path = "/" + widget_config["endpoint"].lstrip("/")
+    if paths is not None and path not in paths:
+        return None
+    return path
+
+
+def split_widget_requests(widget_requests: List[WidgetRequest], app) -> tuple:
+    """Split ``widget_requests`` into the ones ``app`` serves and the foreign ones."""
+    paths = get_paths(app)
+    local, foreign = [], []
+    for widget_request in widget_requests:
+        (local if local_endpoint(widget_request.widget, paths) else foreign).append(widget_request)
+    return local, foreign
+
+
+def _query(input_arguments: Dict) -> Dict:
+    return {name: value for name, value in input_arguments.items() if value is not None}
+
+
+async def _fetch(client: httpx.AsyncClient, widget_request: WidgetRequest) -> str:
+    widget = widget_request.widget
+    path = local_endpoint(widget)
+    with span("widget_data.local", widget=widget.widget_id):
+        try:
+            response = await client.get(path, params=_query(widget_request.input_arguments))
+            content = response.text
+            if response.status_code >= 400:
+                content = f"Error retrieving data for {widget.name}: HTTP {response.status_code} {content}"
+        except httpx.HTTPError as e:
+            logger.error("Error retrieving local widget %s: %s", widget.widget_id, e)
+            content = f"Error retrieving data for {widget.name}: {e}"
+    return content
+
+
+async def fetch_local_widget_data(app, widget_requests: List[WidgetRequest],
+                                  api_key: Optional[str] = None) -> List[str]:
+    """
+    Fetch the data of local widgets concurrently by calling ``app`` in-process.
+
+    Args:
+        app: The ASGI application serving the widget endpoints.
+        widget_requests (list[WidgetRequest]): Widgets for which
+            ``local_endpoint`` is not ``None``, with their input arguments.
+        api_key (str, optional): Key sent to the widget endpoints, defaults
+            to ``APP_API_KEY``.
+
+    Returns:
+        list[str]: The response body of each request, in order. A failed
+        widget gives its error text, as the Workspace reports failed data
+        sources.
+    """
+    if not widget_requests:
+        return []
+    if api_key is None:
+        from core.config import config
+        api_key = config.app_api_key
+    transport = httpx.ASGITransport(app=app)
+    # The response is read in this process: compressing it would be wasted work
+    headers = {"Authorization": f"Bearer {api_key}", "Accept-Encoding": "identity"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://widgets.local", headers=headers,
+                                 timeout=LOCAL_WIDGET_TIMEOUT) as client:
+        return list(await asyncio.gather(*(_fetch(client, r) for r in widget_requests)))
@@ -1,7 +1,70 @@
+import os
+import time
 import pandas as pd
 from openbb import obb
+from core.cache import TTLCache
+from core.metrics import provider_call
+from core.singleflight import singleflight
+from core.tracing import traced
 from . import default_provider
 
+# Number of statements fetched per (symbol, statement, period); smaller limits are sliced from it
+STATEMENT_HISTORY_LIMIT = int(os.getenv("STATEMENT_HISTORY_LIMIT", "40"))
+
+# Statements only change around reporting dates, so they are kept for a day
+_statement_cache = TTLCache(ttl=int(os.getenv("STATEMENT_CACHE_SECONDS", "86400")), maxsize=512, name="statement")
+
+def _fetch_statement(statement: str, symbol: str, period: str, limit: int) -> pd.DataFrame:
+    fetch = getattr(obb.equity.fundamental, statement)
+    with provider_call(default_provider, f"obb.equity.fundamental.{statement}"):
+        return fetch(symbol=symbol, period=period, limit=limit, provider=default_provider).to_dataframe()
+
+def _content_version(df: pd.DataFrame) -> int:
+    """A number that only changes when the contents of `df` change"""
+    try:
+        return int(pd.util.hash_pandas_object(df, index=True).sum())
+    except TypeError:
+        return time.time_ns()
+
+def _load_statement(statement: str, symbol: str, period: str, limit: int) -> tuple:
+    def load(depth):
+        df = _fetch_statement(statement, symbol, period, depth)
+        return depth, df, _content_version(df)
+
+    key = (symbol, statement, period)
+    entry = _statement_cache.get_or_load(key, lambda: load(max(limit, STATEMENT_HISTORY_LIMIT)))
+    fetched, df, _ = entry
+    if fetched < limit and len(df) >= fetched:
+        _statement_cache.invalidate(key)
+        entry = _statement_cache.get_or_load(key, lambda: load(limit))
+    return entry
+
+def get_statement(statement: str, symbol: str, period: str, limit: int) -> pd.DataFrame:
+    """
+    Get the latest `limit` statements of a symbol
+
+    The statement history is fetched once per (symbol, statement, period) and
+    every limit is served by slicing it. A limit deeper than the cached history
+    triggers one refetch with that limit.
+    """
+    _, df, _ = _load_statement(statement, symbol, period, limit)
+    return df.head(limit)
+
+def statement_version(statement: str, ticker: str, period: str, limit: int) -> int:
+    """
+    Get the version of the statements `get_statement` serves for a ticker
+
+    The version changes only when refetched statements differ, so it can
+    validate responses built from them.
+    """
+    from mysharelib.tools import normalize_symbol
+
+    symbol_b, _, _ = normalize_symbol(ticker)
+    _, _, version = _load_statement(statement, symbol_b, period, limit)
+    return version
+
+@traced()
+@singleflight("fin_data")
 def get_balance(ticker: str, period: str, limit: int) -> pd.DataFrame:
     """
     Get balance sheet
@@ -9,7 +72,7 @@ def get_balance(ticker: str, period: str, limit: int) -> pd.DataFrame:
     from mysharelib.tools import normalize_symbol
 
     symbol_b, symbol_f, market = normalize_symbol(ticker)
-    balance_df = obb.equity.fundamental.balance(symbol=symbol_b, period=period, limit=limit, provider=default_provider).to_dataframe().head(limit)
+    balance_df = get_statement("balance", symbol_b, period, limit)
     if market  == "HK":
         if "股东权益合计" in balance_df.columns:
             return balance_df[["period_ending", "股东权益合计", "总负债", "总资产"]]
@@ -18,6 +81,8 @@ def get_balance(ticker: str, period: str, limit: int) -> pd.DataFrame:
     else:
         return balance_df[["period_ending", "fiscal_period", "股东权益", "总负债", "总资产"]]
 
+@traced()
+@singleflight("fin_data")
 def get_cash_flow(ticker: str, period: str, limit: int) -> pd.DataFrame:
     """
     Get cash flow
@@ -25,12 +90,14 @@ def get_cash_flow(ticker: str, period: str, limit: int) -> pd.DataFrame:
     from mysharelib.tools import normalize_symbol
 
     symbol_b, symbol_f, market = normalize_symbol(ticker)
-    cash_flow_df = obb.equity.fundamental.cash(symbol=symbol_b, period=period, limit=limit, provider=default_provider).to_dataframe().head(limit)
+    cash_flow_df = get_statement("cash", symbol_b, period, limit)
     if market  == "HK":
         return cash_flow_df
     else:
         return cash_flow_df[["period_ending", "fiscal_period","营业性现金流","投资性现金流","融资性现金流"]]
 
+@traced()
+@singleflight("fin_data")
 def get_income(ticker: str, period: str, limit: int) -> pd.DataFrame:
     """
     Get income statement
@@ -39,7 +106,7 @@ def get_income(ticker: str, period: str, limit: int) -> pd.DataFrame:
 
     symbol_b, symbol_f, market = normalize_symbol(ticker)
 
-    income_df = obb.equity.fundamental.income(symbol=symbol_b, period=period, limit=limit, provider=default_provider).to_dataframe()
+    income_df = get_statement("income", symbol_b, period, limit)
     if market  == "HK":
         if "经营收入总额" in income_df.columns:
             return income_df[["period_ending",'经营收入总额','股东应占溢利']].head(limit)
@@ -1,15 +1,31 @@
+import logging
+import os
+from concurrent.futures import Future
+from functools import cache, partial
 import pandas as pd
 from typing import List
 from openbb import obb
 import akshare as ak
 from mysharelib.tools import normalize_symbol
 from core.config import config
+from core.cache import MISSING, TTLCache
+from core.metrics import provider_call
+from core.providers import ProviderBusyError, get_pool
+from core.singleflight import singleflight
+from core.tracing import traced
 from . import default_provider
 
+logger = logging.getLogger(__name__)
+
+@traced()
+@singleflight("fin_data")
 def get_news(ticker: str, limit: int = 10)->pd.DataFrame:
     """Get latest news for a stock"""
-    return obb.news.company(ticker, provider=default_provider).to_dataframe().head(limit)
+    with provider_call(default_provider, "obb.news.company"):
+        return obb.news.company(ticker, provider=default_provider).to_dataframe().head(limit)
 
+@traced()
+@singleflight("fin_data")
 def get_info(ticker: str)->pd.DataFrame:
     """
     获取A股基本信息
@@ -18,20 +34,26 @@ def get_info(ticker: str)->pd.DataFrame:
 
     _, symbol_f, _ = normalize_symbol(ticker)
 
-    df_base = obb.equity.fundamental.metrics(symbol=symbol_f, provider=default_provider).to_dataframe().T
+    with provider_call(default_provider, "obb.equity.fundamental.metrics"):
+        df_base = obb.equity.fundamental.metrics(symbol=symbol_f, provider=default_provider).to_dataframe().T
     return df_base[0]
 
+@traced()
+@singleflight("fin_data")
 def get_profile(ticker: str)->pd.DataFrame:
     """
     Get company profile
     """
     from mysharelib.tools import get_timestamp
-    profile_df = obb.equity.profile(symbol=ticker, provider=default_provider).to_dataframe()
+    with provider_call(default_provider, "obb.equity.profile"):
+        profile_df = obb.equity.profile(symbol=ticker, provider=default_provider).to_dataframe()
     profile_df=profile_df[["symbol", "公司名称", "公司简介", "主要范围", "成立日期", "上市日期"]]
     profile_df['成立日期']=pd.to_datetime(get_timestamp(profile_df['成立日期']), unit='s').date()
     profile_df.set_index('symbol', inplace=True)
     return profile_df
 
+@traced()
+@singleflight("fin_data")
 def get_historical_prices(
     ticker: str,
     interval: str,
@@ -40,52 +62,85 @@ def get_historical_prices(
     end_date: str
     )->pd.DataFrame:
     """
-    Get historical prices
+    Get historical prices at the requested interval
     """
-    return obb.equity.price.historical(symbol=ticker, start_date=start_date, end_date=end_date, provider=default_provider).to_dataframe()
+    from mysharelib.tools import get_valid_date
+    from core.bar_store import as_date_index
+    from core.resample import get_resampled_bars
+    bars = get_resampled_bars(
+        ticker, interval, interval_multiplier, get_valid_date(start_date), get_valid_date(end_date)
+    )
+    return as_date_index(bars)
 
+@traced()
 def get_tickers(exchange: str = "") -> List[dict]:
     """Get available tickers for OpenBB Workspace widget."""
-    result_df = obb.equity.search(provider="akshare").to_dataframe()
-    if exchange == "HKEX":
-        result_df = result_df[result_df['exchange'] == "HKEX"]
-    else:
-        result_df = result_df[result_df['exchange'] != "HKEX"]
-    if not result_df.empty:
-        equity_list = [
-            {
-                "label": row['name'] if 'name' in result_df.columns else "Unknown Company",
-                "value": row['symbol'] if 'symbol' in result_df.columns else "invalid ticker",
-                "extraInfo": {
-                    "description": row['symbol'] if 'symbol' in result_df.columns else "invalid ticker",
-                    "rightOfDescription": row['exchange'] if 'exchange' in result_df.columns else "invalid"
-                }
-            }
-            for index, row in result_df.iterrows()
-        ]
-        return equity_list
-    return []
+    from core.universe import get_universe
+    return list(get_universe().get_tickers(exchange))
+
+@cache
+def _set_xq_token():
+    """Set the xueqiu token on akshare once per process."""
+    ak.stock.cons.xq_a_token=config.akshare_api_key
 
+@traced()
+@singleflight("fin_data")
 def get_price(symbol: str):
     symbol_b, symbol_f, market = normalize_symbol(symbol)
     if market == "HK":
         symbol_xq = symbol_b
     else:
         symbol_xq = f"{market}{symbol_b}"
-    ak.stock.cons.xq_a_token=config.akshare_api_key
-    stock_individual_spot_xq_df = ak.stock_individual_spot_xq(symbol=symbol_xq)
+    _set_xq_token()
+    with provider_call("xueqiu", "ak.stock_individual_spot_xq"):
+        stock_individual_spot_xq_df = ak.stock_individual_spot_xq(symbol=symbol_xq)
     stock_individual_spot_xq_df.set_index('item', inplace=True)
     stock_individual_spot_xq_df.loc[["代码"]]=symbol_b
     return stock_individual_spot_xq_df.T
 
+QUOTE_COLUMNS = ["代码", "名称", "现价", "52周最低", "52周最高", "成交量", "股息率(TTM)", "股息(TTM)"]
+
+# Quotes are shared between widget refreshes for a few seconds
+_quote_cache = TTLCache(ttl=int(os.getenv("QUOTE_CACHE_SECONDS", "10")), maxsize=2048, name="quote")
+
+def _get_quote_record(symbol: str) -> dict:
+    data = get_price(symbol)
+    return data[QUOTE_COLUMNS].to_dict(orient="records")[0]
+
+@traced()
+def refresh_quote(symbol: str) -> dict:
+    """Fetch the current quote of ``symbol`` and share it with the quote widgets."""
+    record = _get_quote_record(symbol)
+    _quote_cache.set(symbol, record)
+    return record
+
+@traced()
 def get_quote(symbols: str):
+    """
+    Get the current quote of every symbol in a comma separated list.
+
+    Uncached symbols are fetched in parallel on the xueqiu provider pool.
+    Concurrent requests for the same symbol share one upstream call. A symbol
+    that cannot be quoted, because its call fails or the pool is busy, is
+    left out, so the cached quotes are still served.
+    """
+    symbol_list = list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))
+    pool = get_pool("xueqiu")
+    results = {}
+    for symbol in symbol_list:
+        record = _quote_cache.peek(symbol)
+        if record is MISSING:
+            try:
+                record = pool.submit(_quote_cache.get_or_load, symbol, partial(_get_quote_record, symbol))
+            except ProviderBusyError as e:
+                logger.warning("Skipping the quote of %s: %s", symbol, e)
+                continue
+        results[symbol] = record
+
     all_data = []
-    list = symbols.split(",")
-    for symbol in list:
+    for symbol, record in results.items():
         try:
-            data = get_price(symbol)
-            all_data.append(data[["代码", "名称", "现价", "52周最低", "52周最高", "成交量", "股息率(TTM)", "股息(TTM)"]].to_dict(orient="records")[0])
+            all_data.append(record.result() if isinstance(record, Future) else record)
         except Exception as e:
-            print(f"Error fetching data for symbol {symbol}: {e}")
-            continue
-    return all_data
\ No newline at end of file
+            logger.error("Error fetching the quote of %s: %s", symbol, e)
+    return all_data
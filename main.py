@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from core.registry import register_widget, WIDGETS, add_template, TEMPLATES, load_agent_config
+from core.registry import register_widget, WIDGETS, add_template, TEMPLATES, load_agent_config, freeze_registry, frozen_payload
 from core.config import config
-from routes.charts import charts_router
+from core.universe import universe
+from core.providers import ProviderBusyError, provider_stats, shutdown_pools
+from core.singleflight import singleflight_stats
+from core.compression import CompressionMiddleware, compression_stats
+from core.warmup import start_warmup, warmup_stats
+from core.quote_hub import hub as quote_hub, quote_hub_stats
+from core.metrics import MetricsMiddleware, metrics_response
+from core.tracing import TracingMiddleware
+from core.llm import start_llm_clients, close_llm_clients, openrouter_model
+from routes.charts import charts_router, warm_chart_layouts
 from routes.tradingview import tradingview_router
 from routes.equity_cn import equity_cn_router
 from routes.equity_hk import equity_hk_router
@@ -14,9 +24,28 @@ from mysharelib.tools import setup_logger
 setup_logger(__name__)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the symbol universe in the background and keep it fresh
+    universe.start()
+    # Import OpenBB, akshare, plotly and magentic, resolve the chart layouts
+    # and build the OpenRouter model in the background, so /health answers
+    # right away
+    start_warmup(tasks=(warm_chart_layouts, openrouter_model))
+    # Encode and compress /widgets.json, /apps.json and /agents.json once
+    freeze_registry()
+    # One keep-alive connection pool for the LLM calls of both agents
+    start_llm_clients()
+    yield
+    universe.stop()
+    await quote_hub.close()
+    shutdown_pools()
+    await close_llm_clients()
+
 app = FastAPI(title=config.title,
     description=config.description,
-    version="0.1.2")
+    version="0.1.2",
+    lifespan=lifespan)
 
 origins = [
     "https://pro.openbb.co",
@@ -31,14 +60,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses for clients on slow links
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so request latency includes compression
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
 @app.get("/")
 def read_root():
     return {"Info": f"{config.description}"}
 
+@app.exception_handler(ProviderBusyError)
+async def provider_busy_handler(request: Request, exc: ProviderBusyError):
+    """Tell clients to back off when a provider pool queue is full"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 @app.get("/health")
 def health_check():
     """Health check endpoint for monitoring"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "providers": provider_stats(), "singleflight": singleflight_stats(),
+            "compression": compression_stats(), "warmup": warmup_stats(),
+            "quote_hub": quote_hub_stats()}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of routes, widgets, provider calls and caches"""
+    return metrics_response()
 
 app.include_router(
     tradingview_router,
@@ -68,27 +116,26 @@ app.include_router(
 )
 
 @app.get("/agents.json")
-def get_agents_config():
+def get_agents_config(request: Request):
     """Agents configuration file for the OpenBB Workspace"""
-    return JSONResponse(load_agent_config())
+    return frozen_payload("agents.json").response(request)
 
-# Apps configuration file for the OpenBB Workspace
-# it contains the information and configuration about all the
-# apps that will be displayed in the OpenBB Workspace
-@app.get("/apps.json")
 def get_apps():
     """Apps configuration file for the OpenBB Workspace
     
     Returns:
-        JSONResponse: The contents of apps.json file
+        list: The registered templates
     """
-    # Read and return the apps configuration file
     return list(TEMPLATES.values())
 
-# Endpoint that returns the registered widgets configuration
-# The WIDGETS dictionary is maintained by the registry.py helper
-# which automatically registers widgets when using the @register_widget decorator
-@app.get("/widgets.json")
+# Apps configuration file for the OpenBB Workspace
+# it contains the information and configuration about all the
+# apps that will be displayed in the OpenBB Workspace
+@app.get("/apps.json")
+def serve_apps(request: Request):
+    """Serve get_apps() from its pre-serialized, compressed payload"""
+    return frozen_payload("apps.json").response(request)
+
 def get_widgets():
     """Returns the configuration of all registered widgets
     
@@ -102,3 +149,11 @@ def get_widgets():
     """
     return WIDGETS
 
+# Endpoint that returns the registered widgets configuration
+# The WIDGETS dictionary is maintained by the registry.py helper
+# which automatically registers widgets when using the @register_widget decorator
+@app.get("/widgets.json")
+def serve_widgets(request: Request):
+    """Serve get_widgets() from its pre-serialized, compressed payload"""
+    return frozen_payload("widgets.json").response(request)
+
@@ -1,11 +1,18 @@
-from fastapi import APIRouter
+import time
+
+from fastapi import APIRouter, Request
 from typing import AsyncGenerator
 from sse_starlette.sse import EventSourceResponse
 
-import openai
 from openbb_ai.models import MessageChunkSSE, QueryRequest
 from openbb_ai import get_widget_data, WidgetRequest, message_chunk
 
+from core.answer_cache import answer_key, cached_answer
+from core.compaction import compact_contents
+from core.llm import openai_client, openai_model, stream_ttft
+from core.sse import coalesced, encode_events
+from core.widget_data import fetch_local_widget_data, split_widget_requests
+
 from openai.types.chat import (
     ChatCompletionMessageParam,
     ChatCompletionUserMessageParam,
@@ -13,30 +20,35 @@ from openai.types.chat import (
     ChatCompletionSystemMessageParam,
 )
 
-from core.agent import execution_loop
-
 
 agents_router = APIRouter()
 
+def format_data(contents) -> str:
+    """Format widget data for the LLM context, compacted to the prompt token budget."""
+    result_str = "--- Data ---\n"
+    for compacted in compact_contents(contents):
+        result_str += f"{compacted.text}\n"
+        result_str += "------\n"
+    return result_str
+
 @agents_router.post("/openrouter/query")
 async def openrouter_query(
     request: QueryRequest) -> EventSourceResponse:
     """Query the OpenRouter."""
-    return EventSourceResponse(
-        (event.model_dump() async for event in execution_loop(request))
-    )
+    # magentic is only loaded when the agent is first used
+    from core.agent import execution_loop
+
+    return EventSourceResponse(encode_events("openrouter", execution_loop(request)))
 
 @agents_router.post("/chatglm/query")
-async def query(request: QueryRequest) -> EventSourceResponse:
+async def query(request: QueryRequest, http_request: Request) -> EventSourceResponse:
     """Query the Copilot."""
 
-    # We only automatically fetch widget data if the last message is from a
-    # human, and widgets have been explicitly added to the request.
-    if (
-        request.messages[-1].role == "human"
-        and request.widgets
-        and request.widgets.primary
-    ):
+    # Data of widgets served by this backend is fetched in-process, see
+    # core.widget_data; only widgets of other backends are requested from
+    # the Workspace.
+    local_data = []
+    if request.widgets and request.widgets.primary:
         widget_requests: list[WidgetRequest] = []
         for widget in request.widgets.primary:
             widget_requests.append(
@@ -47,15 +59,24 @@ async def query(request: QueryRequest) -> EventSourceResponse:
                     },
                 )
             )
+        local_requests, foreign_requests = split_widget_requests(widget_requests, http_request.app)
+
+        # We only automatically fetch widget data if the last message is from
+        # a human, and widgets have been explicitly added to the request.
+        if request.messages[-1].role == "human" and foreign_requests:
+            async def retrieve_widget_data():
+                yield get_widget_data(foreign_requests).model_dump()
+
+            # Early exit to retrieve widget data
+            return EventSourceResponse(
+                content=retrieve_widget_data(),
+                media_type="text/event-stream",
+            )
 
-        async def retrieve_widget_data():
-            yield get_widget_data(widget_requests).model_dump()
-
-        # Early exit to retrieve widget data
-        return EventSourceResponse(
-            content=retrieve_widget_data(),
-            media_type="text/event-stream",
-        )
+        # Either no foreign widgets, or the Workspace has just posted their
+        # data: add the local widgets to the context of this turn
+        if request.messages[-1].role in ("human", "tool"):
+            local_data = await fetch_local_widget_data(http_request.app, local_requests)
 
     # Format the messages into a list of OpenAI messages
     openai_messages: list[ChatCompletionMessageParam] = [
@@ -65,7 +86,8 @@ async def query(request: QueryRequest) -> EventSourceResponse:
         )
     ]
 
-    context_str = ""
+    # Widget data posted by the Workspace, then the data fetched locally
+    contents = []
     for index, message in enumerate(request.messages):
         if message.role == "human":
             openai_messages.append(
@@ -83,40 +105,40 @@ async def query(request: QueryRequest) -> EventSourceResponse:
         # previously-retrieved widget data from piling up and exceeding the
         # context limit of the LLM.
         elif message.role == "tool" and index == len(request.messages) - 1:
-            context_str += "Use the following data to answer the question:\n\n"
-            result_str = "--- Data ---\n"
-            for result in message.data:
-                for item in result.items:
-                    result_str += f"{item.content}\n"
-                    result_str += "------\n"
-            context_str += result_str
-
-    if context_str:
+            contents.extend(item.content for result in message.data for item in result.items)
+    contents.extend(local_data)
+
+    if contents:
+        context_str = "Use the following data to answer the question:\n\n" + format_data(contents)
         openai_messages[-1]["content"] += "\n\n" + context_str  # type: ignore
 
-    # Define the execution loop.
-    async def execution_loop() -> AsyncGenerator[MessageChunkSSE, None]:
-        import os
-        from dotenv import load_dotenv
-
-        load_dotenv() 
-        OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-        OPENAI_MODEL = os.environ.get("OPENAI_MODEL")
-        OPENAI_BASE_URL = os.environ.get("BASE_URL")
-        client = openai.AsyncOpenAI(
-            base_url=OPENAI_BASE_URL,
-            api_key=OPENAI_API_KEY,
-        )
-        async for event in await client.chat.completions.create(
-            model=OPENAI_MODEL,
+    # Identical questions about identical data may be answered from the
+    # answer cache (opt-in, see core.answer_cache)
+    key = answer_key(
+        "chatglm",
+        openai_model(),
+        [(m.role, m.content) for m in request.messages if m.role in ("human", "ai") and isinstance(m.content, str)],
+        contents,
+    )
+
+    async def answer() -> AsyncGenerator[str, None]:
+        started = time.perf_counter()
+        stream = await openai_client().chat.completions.create(
+            model=openai_model(),
             messages=openai_messages,
             stream=True,
-        ):
+        )
+        async for event in stream_ttft("chatglm", stream, started):
             if chunk := event.choices[0].delta.content:
-                yield message_chunk(chunk).model_dump()
+                yield chunk
+
+    # Define the execution loop.
+    async def execution_loop() -> AsyncGenerator[MessageChunkSSE, None]:
+        async for chunk in coalesced("chatglm", cached_answer(key, answer)):
+            yield message_chunk(chunk)
 
     # Stream the SSEs back to the client.
     return EventSourceResponse(
-        content=execution_loop(),
+        content=encode_events("chatglm", execution_loop()),
         media_type="text/event-stream",
     )
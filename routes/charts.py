@@ -1,68 +1,76 @@
 from fastapi import APIRouter, HTTPException
-import plotly.graph_objects as go
 import pandas as pd
 from typing import List
 import json
 import asyncio
 import numpy as np
-from openbb import obb
 from core.registry import register_widget
+from core.bar_store import as_date_index
+from core.resample import get_resampled_bars
+from core.downsample import downsample_ohlc
+from core.tracing import traced
 from core.plotly_config import (
-    apply_config_to_figure, 
+    THEMES,
+    axis_values,
     get_chart_colors,
-    create_base_layout
+    get_figure_layout,
+    typed_array
 )
 
 charts_router = APIRouter()
 
+# Y-axis settings of the candlestick chart, applied on top of the base layout
+CANDLESTICK_YAXIS = (
+    ("rangemode", "nonnegative"),
+    ("zeroline", True),
+    ("zerolinewidth", 2),
+    ("zerolinecolor", "lightgrey"),
+)
+
+def candlestick_layout(theme: str = "dark") -> dict:
+    """Layout of the candlestick chart, resolved once per theme (shared, do not modify)."""
+    return get_figure_layout(theme, x_title="Date", y_title="Price", y_dtype="$,.4f", yaxis=CANDLESTICK_YAXIS)
+
+def warm_chart_layouts():
+    """Resolve the chart layouts of every theme ahead of the first request."""
+    for theme in THEMES:
+        candlestick_layout(theme)
+
+@traced("figure.candlestick")
+def build_candlestick_figure(data: pd.DataFrame, theme: str = "dark") -> dict:
+    """
+    Build the candlestick figure dict directly, without ``go.Figure``.
+
+    The result is equal to ``json.loads(figure.to_json())`` of the same chart
+    built with Plotly; its layout is shared between calls.
+    """
+    colors = get_chart_colors(theme)
+    trace = {
+        "close": typed_array(data['close']),
+        "decreasing": {"line": {"color": colors['negative']}},
+        "high": typed_array(data['high']),
+        "increasing": {"line": {"color": colors['positive']}},
+        "low": typed_array(data['low']),
+        "name": "Price",
+        "open": typed_array(data['open']),
+        "x": axis_values(data.index),
+        "type": "candlestick",
+    }
+    return {"data": [trace], "layout": candlestick_layout(theme)}
+
 def get_chart_data(
     ticker: str,
     interval: str,
     interval_multiplier: int,
     start_date: str,
-    end_date: str
+    end_date: str,
+    max_points: int = 0
 ) -> dict:
     from mysharelib.tools import get_valid_date
     start_dt = get_valid_date(start_date)
     end_dt = get_valid_date(end_date)
-    data = obb.equity.price.historical(symbol=ticker, start_date=start_dt, end_date=end_dt, provider="akshare").to_dataframe()
+    data = get_resampled_bars(ticker, interval, interval_multiplier, start_dt, end_dt)
+    # Merge bars beyond what the widget can draw
+    data = as_date_index(downsample_ohlc(data, max_points))
     theme: str = "dark"
-    # Get chart colors based on theme
-    colors = get_chart_colors(theme)
-
-    figure = go.Figure(
-        layout=create_base_layout(
-            x_title="Date",
-            y_title="Price",
-            y_dtype="$,.4f",
-            theme=theme
-        )
-    )
-    # Add candlestick chart second so it appears on top
-    figure.add_candlestick(
-        x=data.index,
-        open=data['open'],
-        high=data['high'],
-        low=data['low'],
-        close=data['close'],
-        name="Price",
-        increasing_line_color=colors['positive'],
-        decreasing_line_color=colors['negative']
-    )
-    # Update layout to include secondary y-axis for volume
-    figure.update_layout(
-        yaxis=dict(
-            rangemode="nonnegative",
-            zeroline=True,
-            zerolinewidth=2,
-            zerolinecolor="lightgrey"
-        ),
-    )
-    # Apply the standard configuration to the figure with theme
-    figure = apply_config_to_figure(figure, theme=theme)
-
-    # Convert figure to JSON with the config
-    figure_json = figure.to_json()
-    figure_dict = json.loads(figure_json)
-    
-    return figure_dict
+    return build_candlestick_figure(data, theme=theme)
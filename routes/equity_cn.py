@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response, WebSocket, status
+from sse_starlette.sse import EventSourceResponse
 from core.registry import register_widget
 import pandas as pd
-from typing import List
+from typing import List, Optional
 import json
 import asyncio
 import numpy as np
 from fastapi import Depends
 
-from core.auth import get_current_user
+from core.auth import get_current_user, websocket_authorized
+from core.providers import run_provider
+from core.downsample import default_max_points, downsample_line
+from core.http_cache import check_etag, etag_headers, etag_matches, make_etag, not_modified
+from core.serialization import JSONBytesResponse, dumps
+from core.metrics import provider_call
+from core.tracing import span
+from core.quote_hub import parse_symbols, quote_events, serve_websocket
 
 equity_cn_router = APIRouter()
 
+# Default tickers of the quote widget
+CN_WATCHLIST = "601288,601988,601939,601398,600325,600104,601006,600028"
+
+@equity_cn_router.get("/financial_data")
 @register_widget({
     "name": "财务指标",
     "description": "获取A股的财务指标",
@@ -40,7 +52,6 @@ equity_cn_router = APIRouter()
         }
     ]
 })
-@equity_cn_router.get("/financial_data")
 def get_financial_data(
     ticker: str,
     token: str = Depends(get_current_user)
@@ -51,9 +62,11 @@ def get_financial_data(
 
     _, symbol_f, _ = normalize_symbol(ticker)
 
-    df_comparison = fetch_compare_company(symbol_f)
+    with provider_call("akshare", "fetch_compare_company"):
+        df_comparison = fetch_compare_company(symbol_f)
     return df_comparison.to_dict(orient="records")
 
+@equity_cn_router.get("/income")
 @register_widget({
     "name": "利润表",
     "description": "Financial statements that provide information about a company's revenues, expenses, and profits over a specific period.",
@@ -118,15 +131,20 @@ def get_financial_data(
         }
     ]
 })
-@equity_cn_router.get("/income")
-def get_cn_income(ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
+def get_cn_income(request: Request, response: Response, ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
     """Get 利润表"""
-    from fin_data.financials import get_income
+    from fin_data.financials import get_income, statement_version
+    unchanged = check_etag(request, response, "cn/income", ticker, period, limit, statement_version("income", ticker, period, limit))
+    if unchanged is not None:
+        return unchanged
     income_data = get_income(ticker, period, limit)
-    income_data = income_data.fillna(0)
+    with span("transform"):
+        income_data = income_data.fillna(0)
     #logger.info(f"Income data for {ticker}, period: {period}, limit: {limit}: {income_data}")
-    return income_data.to_dict(orient="records")
+    with span("serialize"):
+        return income_data.to_dict(orient="records")
 
+@equity_cn_router.get("/balance")
 @register_widget({
     "name": "资产负债表",
     "description": "A financial statement that summarizes a company's assets, liabilities and shareholders' equity at a specific point in time.",
@@ -191,14 +209,19 @@ def get_cn_income(ticker: str, period: str, limit: int, token: str = Depends(get
         }
     ]
 })
-@equity_cn_router.get("/balance")
-def get_cn_balance(ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
+def get_cn_balance(request: Request, response: Response, ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
     """Get 资产负债表"""
-    from fin_data.financials import get_balance
+    from fin_data.financials import get_balance, statement_version
+    unchanged = check_etag(request, response, "cn/balance", ticker, period, limit, statement_version("balance", ticker, period, limit))
+    if unchanged is not None:
+        return unchanged
     balance_data = get_balance(ticker, period, limit)
-    balance_data = balance_data.fillna(0)
-    return balance_data.to_dict(orient="records")
+    with span("transform"):
+        balance_data = balance_data.fillna(0)
+    with span("serialize"):
+        return balance_data.to_dict(orient="records")
 
+@equity_cn_router.get("/cash_flow")
 @register_widget({
     "name": "现金流量表",
     "description": "Financial statements that provide information about a company's cash inflows and outflows over a specific period.",
@@ -263,14 +286,19 @@ def get_cn_balance(ticker: str, period: str, limit: int, token: str = Depends(ge
         }
     ]
 })
-@equity_cn_router.get("/cash_flow")
-def get_cn_cash_flow(ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
+def get_cn_cash_flow(request: Request, response: Response, ticker: str, period: str, limit: int, token: str = Depends(get_current_user)):
     """Get 现金流量表"""
-    from fin_data.financials import get_cash_flow
+    from fin_data.financials import get_cash_flow, statement_version
+    unchanged = check_etag(request, response, "cn/cash_flow", ticker, period, limit, statement_version("cash", ticker, period, limit))
+    if unchanged is not None:
+        return unchanged
     cash_data = get_cash_flow(ticker, period, limit)
-    cash_data = cash_data.fillna(0)
-    return cash_data.to_dict(orient="records")
+    with span("transform"):
+        cash_data = cash_data.fillna(0)
+    with span("serialize"):
+        return cash_data.to_dict(orient="records")
 
+@equity_cn_router.get("/key_metrics")
 @register_widget({
     "name": "基本信息",
     "description": "Get key company information including name, CIK, market cap, total employees, website URL, and more.",
@@ -304,7 +332,6 @@ def get_cn_cash_flow(ticker: str, period: str, limit: int, token: str = Depends(
         }
     ]
 })
-@equity_cn_router.get("/key_metrics")
 def get_cn_key_metrics(
     ticker: str, 
     token: str = Depends(get_current_user)
@@ -312,9 +339,10 @@ def get_cn_key_metrics(
     """Get company facts for a ticker"""
     from fin_data.profile import get_info
     key_metrics = get_info(ticker)
-    key_metrics.name = key_metrics["证券简称"]
+    key_metrics = key_metrics.rename(key_metrics["证券简称"])
     return key_metrics.to_markdown()
 
+@equity_cn_router.get("/news")
 @register_widget({
     "name": "相关新闻",
     "description": "Get recent news articles for stocks, including headlines, publish dates, and article summaries.",
@@ -360,13 +388,14 @@ def get_cn_key_metrics(
         }
     ]
 })
-@equity_cn_router.get("/news")
 async def get_cn_news(ticker: str = Query(..., description="Stock ticker"), 
                          limit: int = 10, token: str = Depends(get_current_user)):
     """Get news articles for a stock"""
     from fin_data.profile import get_news
-    return get_news(ticker, limit).to_dict(orient="records")
+    news = await run_provider("akshare", get_news, ticker, limit)
+    return news.to_dict(orient="records")
 
+@equity_cn_router.get("/prices")
 @register_widget({
     "name": "历史股价",
     "description": "Get historical price data for stocks with customizable intervals and date ranges.",
@@ -444,20 +473,31 @@ async def get_cn_news(ticker: str = Query(..., description="Stock ticker"),
         }
     ]
 })
-@equity_cn_router.get("/prices")
 def get_cn_prices(
+    request: Request,
+    response: Response,
     ticker: str,
     interval: str,
     interval_multiplier: int,
     start_date: str,
-    end_date: str, 
+    end_date: str,
+    max_points: int = Query(0, description="Maximum number of rows, picked with LTTB on the close (0 for all)"),
     token: str = Depends(get_current_user)
 ):
     """Get historical stock prices"""
+    from core.bar_store import sync_bars
     from fin_data.profile import get_historical_prices
+    version = sync_bars(ticker, start_date, end_date)
+    unchanged = check_etag(request, response, "cn/prices", ticker, interval, interval_multiplier, start_date, end_date, max_points, version)
+    if unchanged is not None:
+        return unchanged
     stock_prices = get_historical_prices(ticker, interval, interval_multiplier, start_date, end_date)
-    return stock_prices.reset_index().to_dict(orient="records")
+    with span("transform"):
+        stock_prices = downsample_line(stock_prices, "close", max_points)
+    with span("serialize"):
+        return stock_prices.reset_index().to_dict(orient="records")
 
+@equity_cn_router.get("/candles")
 @register_widget({
     "name": "k线图",
     "description": "股价k线图",
@@ -517,17 +557,26 @@ def get_cn_prices(
     ],
     "data": {"chart": {"type": "candlestick"}},
 })
-@equity_cn_router.get("/candles")
 async def get_candles_cn(
+    request: Request,
     ticker: str,
     interval: str,
     interval_multiplier: int,
     start_date: str,
     end_date: str,
+    max_points: Optional[int] = Query(None, description="Maximum number of candles, defaults to the widget width (0 for all)"),
     token: str = Depends(get_current_user)
 ):
+    from core.bar_store import sync_bars
     from routes.charts import get_chart_data
-    return get_chart_data(ticker, interval, interval_multiplier, start_date, end_date)
+    if max_points is None:
+        max_points = default_max_points("cn/candles")
+    version = await run_provider("akshare", sync_bars, ticker, start_date, end_date)
+    etag = make_etag("cn/candles", ticker, interval, interval_multiplier, start_date, end_date, max_points, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    figure = await run_provider("akshare", get_chart_data, ticker, interval, interval_multiplier, start_date, end_date, max_points)
+    return JSONBytesResponse(dumps(figure), headers=etag_headers(etag))
 
 @equity_cn_router.get("/tickers")
 def get_cn_tickers(token: str = Depends(get_current_user)):
@@ -535,6 +584,7 @@ def get_cn_tickers(token: str = Depends(get_current_user)):
     from fin_data.profile import get_tickers
     return get_tickers()
 
+@equity_cn_router.get("/quote")
 @register_widget({
     "name": "股价",
     "description": "Get the current prices.",
@@ -583,12 +633,36 @@ def get_cn_tickers(token: str = Depends(get_current_user)):
             "multiSelect": False,
             "show": True
         },
+        {
+            "type": "text",
+            "paramName": "symbols",
+            "label": "Watchlist",
+            "value": CN_WATCHLIST,
+            "description": "Comma separated tickers to quote"
+        },
     ]
 })
-@equity_cn_router.get("/quote")
 def get_cn_quote(
+    symbols: str = Query(CN_WATCHLIST, description="Comma separated tickers"),
     token: str = Depends(get_current_user)
 ):
     """Get current stock prices"""
     from fin_data.profile import get_quote
-    return get_quote("601288,601988,601939,601398,600325,600104,601006,600028")
+    return get_quote(symbols)
+
+@equity_cn_router.get("/quote/stream")
+async def stream_cn_quotes(
+    symbols: str = Query(CN_WATCHLIST, description="Comma separated tickers"),
+    token: str = Depends(get_current_user)
+):
+    """Stream quote changes as SSE, one upstream poller per symbol for all viewers"""
+    return EventSourceResponse(quote_events(parse_symbols(symbols)))
+
+@equity_cn_router.websocket("/quote/ws")
+async def cn_quotes_websocket(websocket: WebSocket, symbols: str = CN_WATCHLIST):
+    """Stream quote changes over a WebSocket, one upstream poller per symbol for all viewers"""
+    if not websocket_authorized(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await serve_websocket(websocket, parse_symbols(symbols))
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Query, HTTPException
 import pandas as pd
-from typing import List
-import json
-import asyncio
-import numpy as np
-from openbb import obb
+from typing import Optional
 from core.registry import register_widget
+from core.universe import aget_universe
+from core.resample import get_resampled_bars, parse_resolution
+from core.downsample import downsample_ohlc
+from core.providers import ProviderBusyError, run_provider
+from core.serialization import JSONBytesResponse, encode_udf_history
 
 tradingview_router = APIRouter()
 
@@ -43,46 +44,22 @@ async def search_symbols(
     search response: symbol, full_name, description, exchange, type.
     """
     try:
-        df = obb.equity.search(provider="akshare").to_dataframe()
+        index = (await aget_universe()).index
+    except ProviderBusyError:
+        # Answered with 503 and Retry-After by the app
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying symbols provider: {e}")
 
-    if df is None or df.empty:
-        return []
-
-    q = query.strip()
+    # Ranked exact > prefix > contains over code, name and pinyin keys
     results = []
-
-    # If query empty, return top N
-    if q == "":
-        candidates = df.head(limit)
-    else:
-        # Prioritize symbol exact match, then symbol startswith, then name contains
-        candidates = pd.DataFrame()
-        if 'symbol' in df.columns:
-            exact = df[df['symbol'].str.lower() == q.lower()]
-            starts = df[df['symbol'].str.lower().str.startswith(q.lower())]
-            candidates = pd.concat([exact, starts])
-        if 'name' in df.columns:
-            name_contains = df[df['name'].str.contains(q, case=False, na=False)]
-            candidates = pd.concat([candidates, name_contains])
-        # drop duplicates while preserving order
-        if not candidates.empty:
-            candidates = candidates.drop_duplicates(subset=['symbol'], keep='first')
-        else:
-            candidates = df
-
-        candidates = candidates.head(limit)
-
-    for _, row in candidates.iterrows():
-        symbol = row.get('symbol') if 'symbol' in row.index else None
-        name = row.get('name') if 'name' in row.index else None
-        exchange = row.get('exchange') if 'exchange' in row.index else None
-
+    for record in index.search(query, limit):
+        symbol = record['symbol']
+        exchange = record['exchange']
         results.append({
             'symbol': symbol or "",
             'full_name': f"{exchange}:{symbol}" if exchange and symbol else (symbol or ""),
-            'description': name or "",
+            'description': record['name'] or "",
             'exchange': exchange or "",
             'type': 'stock'
         })
@@ -97,31 +74,29 @@ async def get_symbol_info(symbol: str = Query(..., description="Symbol to get in
     the result to the TradingView UDF symbol info schema.
     """
     try:
-        result_df = obb.equity.search(provider="akshare").to_dataframe()
+        universe = await aget_universe()
+    except ProviderBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying symbols provider: {e}")
 
-    if result_df is None or result_df.empty:
+    if universe.frame.empty:
         raise HTTPException(status_code=404, detail="No symbols available from provider")
 
     # Accept symbols like "EXCHANGE:SYMBOL" or plain "SYMBOL"
     search_symbol = symbol
-    exchange_part = None
     if ":" in symbol:
-        exchange_part, search_symbol = symbol.split(":", 1)
+        _, search_symbol = symbol.split(":", 1)
 
-    match = None
-    if 'symbol' in result_df.columns:
-        df_match = result_df[result_df['symbol'] == search_symbol]
-        if df_match.empty and exchange_part is not None:
-            df_match = result_df[(result_df['symbol'] == search_symbol) & (result_df.get('exchange') == exchange_part)]
-        if df_match.empty:
-            df_match = result_df[result_df['symbol'] == symbol]
-        if not df_match.empty:
-            match = df_match.iloc[0]
+    match = universe.row(search_symbol)
+    if match is None:
+        match = universe.row(symbol)
 
-    if match is None and 'name' in result_df.columns:
-        df_match = result_df[result_df['name'].str.contains(search_symbol, na=False)]
+    if match is None:
+        # Not the typeahead index: its prefix and pinyin matches would turn a
+        # mistyped symbol into some other ticker
+        frame = universe.frame
+        df_match = frame[frame['name'].str.contains(search_symbol, na=False, regex=False)]
         if not df_match.empty:
             match = df_match.iloc[0]
 
@@ -170,6 +145,7 @@ async def get_symbol_info(symbol: str = Query(..., description="Symbol to get in
 
     return response
 
+@tradingview_router.get("/history")
 @register_widget({
         "name": "TradingView Charting",
         "description": "Advanced charting for China and Hong Kong stocks using TradingView UDF protocol.",
@@ -185,18 +161,19 @@ async def get_symbol_info(symbol: str = Query(..., description="Symbol to get in
             "updateFrequency": 60000
         }
 })
-@tradingview_router.get("/history")
 async def get_history(
     symbol: str = Query(..., description="Symbol"),
     resolution: str = Query(..., description="Resolution"),
     from_time: int = Query(..., alias="from", description="From timestamp"),
-    to_time: int = Query(..., alias="to", description="To timestamp")
+    to_time: int = Query(..., alias="to", description="To timestamp"),
+    max_points: Optional[int] = None
 ):
     """TradingView UDF history endpoint.
 
     Returns OHLCV data between `from_time` and `to_time` inclusive.
     Supports daily/weekly/monthly resolutions and numeric minute resolutions
-    when intraday data is available from the provider.
+    when intraday data is available from the provider. With `max_points`,
+    consecutive bars are merged so that at most that many are returned.
     """
     # parse timestamps
     try:
@@ -205,87 +182,36 @@ async def get_history(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid from/to timestamps: {e}")
 
-    # fetch data
     try:
-        df = obb.equity.price.historical(
-            symbol=symbol,
-            start_date=start_dt.date().isoformat(),
-            end_date=end_dt.date().isoformat(),
-            provider="akshare"
-        ).to_dataframe()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching historical prices: {e}")
-
-    if df is None or df.empty:
+        interval, multiplier = parse_resolution(resolution)
+    except ValueError:
         return {"s": "no_data"}
 
-    # ensure datetime index
-    if not isinstance(df.index, pd.DatetimeIndex):
-        try:
-            df.index = pd.to_datetime(df.index)
-        except Exception:
-            pass
-
-    # filter to requested window
-    df = df[(df.index >= start_dt) & (df.index <= end_dt)]
-    if df.empty:
-        return {"s": "no_data"}
-
-    # helper to map lower-case column name to actual
-    cols = {c.lower(): c for c in df.columns}
-    def col(name):
-        return cols.get(name, name)
-
-    res = resolution.upper()
-    resampled = None
+    # fetch and resample data
     try:
-        if res in ("D", "1D"):
-            resampled = df
-        elif res in ("W", "1W"):
-            resampled = df.resample('W').agg({col('open'): 'first', col('high'): 'max', col('low'): 'min', col('close'): 'last', col('volume'): 'sum'})
-        elif res in ("M", "1M"):
-            resampled = df.resample('M').agg({col('open'): 'first', col('high'): 'max', col('low'): 'min', col('close'): 'last', col('volume'): 'sum'})
-        else:
-            # numeric minute resolution
-            try:
-                minutes = int(resolution)
-                diffs = df.index.to_series().diff().dropna()
-                if not diffs.empty and diffs.min() < pd.Timedelta('1D'):
-                    rule = f"{minutes}T"
-                    resampled = df.resample(rule).agg({col('open'): 'first', col('high'): 'max', col('low'): 'min', col('close'): 'last', col('volume'): 'sum'})
-                else:
-                    return {"s": "no_data"}
-            except ValueError:
-                return {"s": "no_data"}
-    except Exception:
-        return {"s": "no_data"}
+        resampled = await run_provider(
+            "akshare", get_resampled_bars, symbol, interval, multiplier, start_dt, end_dt, strict=True
+        )
+    except ProviderBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching historical prices: {e}")
 
     if resampled is None or resampled.empty:
         return {"s": "no_data"}
 
-    close_col = col('close')
+    # map lower-case column name to actual
+    cols = {c.lower(): c for c in resampled.columns}
+    close_col = cols.get('close', 'close')
     if close_col in resampled.columns:
         resampled = resampled.dropna(subset=[close_col])
     if resampled.empty:
         return {"s": "no_data"}
 
-    try:
-        t = (resampled.index.astype('int64') // 10**9).astype(int).tolist()
-    except Exception:
-        t = [int(dt.timestamp()) for dt in resampled.index.to_pydatetime()]
-
-    def series_list(n):
-        if n in resampled.columns:
-            return [None if pd.isna(x) else float(x) for x in resampled[n].tolist()]
-        return [None] * len(resampled)
-
-    o = series_list(col('open'))
-    h = series_list(col('high'))
-    l = series_list(col('low'))
-    c = series_list(col('close'))
-    v = series_list(col('volume'))
+    if max_points:
+        resampled = downsample_ohlc(resampled, max_points)
 
-    return {"s": "ok", "t": t, "o": o, "h": h, "l": l, "c": c, "v": v}
+    return JSONBytesResponse(encode_udf_history(resampled, cols))
 
 
 @tradingview_router.get("/time")
@@ -0,0 +1,10 @@
+import pytest
+
+from core import bar_store, resample
+
+
+@pytest.fixture(autouse=True)
+def isolated_bar_store(tmp_path, monkeypatch):
+    """Give every test its own empty bar store."""
+    monkeypatch.setattr(bar_store, "bar_store", bar_store.BarStore(root=str(tmp_path / "bars")))
+    resample._memo.clear()
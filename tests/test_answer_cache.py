@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from core import answer_cache
+from core.answer_cache import answer_key, cached_answer, normalize
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SECONDS", 60)
+    answer_cache.clear_answers()
+    yield
+    answer_cache.clear_answers()
+
+
+def make_answer(calls, chunks=("腾讯", "收入", "增长"), fail=False):
+    async def answer():
+        calls.append(1)
+        for chunk in chunks:
+            yield chunk
+        if fail:
+            raise RuntimeError("stream cut off")
+    return answer
+
+
+def collect(key, answer):
+    async def run():
+        return [chunk async for chunk in cached_answer(key, answer)]
+    return asyncio.run(run())
+
+
+def test_key_ignores_formatting_and_data_order_but_not_data():
+    question = [("human", "Summarize 00700 income trend?")]
+    key = answer_key("chatglm", "m", question, ["a", "b"])
+    assert key == answer_key("chatglm", "m", [("human", "  summarize   00700 income TREND ")], ["b", "a"])
+    assert key != answer_key("chatglm", "m", question, ["a", "c"])
+    assert key != answer_key("chatglm", "other", question, ["a", "b"])
+    assert normalize("总结一下腾讯的业绩？") == "总结一下腾讯的业绩"
+
+
+def test_cached_answer_replays_the_same_chunks(enabled):
+    calls = []
+    first = collect("k", make_answer(calls))
+    second = collect("k", make_answer(calls))
+    assert first == second == ["腾讯", "收入", "增长"]
+    assert len(calls) == 1
+
+
+def test_failed_answers_are_not_cached(enabled):
+    calls = []
+    with pytest.raises(RuntimeError):
+        collect("k", make_answer(calls, fail=True))
+    assert collect("k", make_answer(calls)) == ["腾讯", "收入", "增长"]
+    assert len(calls) == 2
+
+
+def test_disabled_cache_always_calls_the_llm(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SECONDS", 0)
+    calls = []
+    collect("k", make_answer(calls))
+    collect("k", make_answer(calls))
+    assert len(calls) == 2
@@ -0,0 +1,149 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from core.bar_store import BarStore, merge_ranges, missing_ranges
+
+
+def make_bars(start, end):
+    idx = pd.bdate_range(start, end)
+    n = len(idx)
+    return pd.DataFrame({
+        "open": [float(i) for i in range(n)],
+        "high": [float(i) + 1 for i in range(n)],
+        "low": [float(i) - 1 for i in range(n)],
+        "close": [float(i) + 0.5 for i in range(n)],
+        "volume": [100.0] * n,
+    }, index=pd.Index(idx.date, name="date"))
+
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, start_date, end_date):
+        self.calls.append((symbol, start_date, end_date))
+        return make_bars(start_date, end_date)
+
+
+def test_missing_ranges_and_weekend_trimming():
+    covered = [(date(2024, 1, 1), date(2024, 1, 5))]
+    # 2024-01-06/07 is a weekend, so the gap starts on Monday 2024-01-08
+    assert missing_ranges(covered, date(2024, 1, 2), date(2024, 1, 10)) == [
+        (date(2024, 1, 8), date(2024, 1, 10))
+    ]
+    assert missing_ranges(covered, date(2024, 1, 2), date(2024, 1, 7)) == []
+    assert missing_ranges([], date(2024, 1, 6), date(2024, 1, 7)) == []
+
+
+def test_merge_ranges_joins_adjacent_ranges():
+    ranges = [(date(2024, 1, 8), date(2024, 1, 9)), (date(2024, 1, 1), date(2024, 1, 7))]
+    assert merge_ranges(ranges) == [(date(2024, 1, 1), date(2024, 1, 9))]
+
+
+def test_only_missing_ranges_are_fetched(tmp_path):
+    provider = FakeProvider()
+    store = BarStore(root=str(tmp_path), fetcher=provider)
+
+    first = store.get_bars("600000", "2024-01-01", "2024-01-31")
+    assert len(first) == 23
+    assert provider.calls == [("600000", date(2024, 1, 1), date(2024, 1, 31))]
+
+    # fully covered, served locally
+    inner = store.get_bars("600000", "2024-01-08", "2024-01-12")
+    assert list(inner.index) == [date(2024, 1, d) for d in range(8, 13)]
+    assert len(provider.calls) == 1
+
+    # extending the window only fetches the new dates
+    wider = store.get_bars("600000", "2023-12-15", "2024-02-09")
+    assert provider.calls[1:] == [
+        ("600000", date(2023, 12, 15), date(2023, 12, 29)),
+        ("600000", date(2024, 2, 1), date(2024, 2, 9)),
+    ]
+    assert wider.index.is_monotonic_increasing
+    assert wider.index[0] == date(2023, 12, 15)
+    assert wider.index[-1] == date(2024, 2, 9)
+
+
+def test_bars_persist_across_instances(tmp_path):
+    provider = FakeProvider()
+    BarStore(root=str(tmp_path), fetcher=provider).get_bars("00700", "2024-03-01", "2024-03-29")
+
+    reopened = BarStore(root=str(tmp_path), fetcher=provider)
+    bars = reopened.get_bars("00700", "2024-03-04", "2024-03-08")
+    assert len(bars) == 5
+    assert len(provider.calls) == 1
+    assert reopened.version("00700") > 0
+
+
+def test_today_is_refetched(tmp_path):
+    provider = FakeProvider()
+    store = BarStore(root=str(tmp_path), fetcher=provider, live_seconds=0)
+    today = date.today()
+    start = today - timedelta(days=14)
+
+    store.get_bars("600000", start, today)
+    store.get_bars("600000", start, today)
+    if today.weekday() < 5:
+        assert provider.calls[-1] == ("600000", today, today)
+        assert len(provider.calls) == 2
+
+
+def test_live_window_and_stable_version(tmp_path):
+    provider = FakeProvider()
+    store = BarStore(root=str(tmp_path), fetcher=provider)
+    today = date.today()
+    start = today - timedelta(days=14)
+
+    version = store.sync("600000", start, today)
+    store.get_bars("600000", start, today)
+    # today's bars were fetched moments ago, so they are served locally
+    assert len(provider.calls) == 1
+
+    refetching = BarStore(root=str(tmp_path), fetcher=provider, live_seconds=0)
+    # refetching unchanged bars keeps the version
+    assert refetching.sync("600000", start, today) == version
+
+
+def test_provider_error_is_raised_when_nothing_is_stored(tmp_path):
+    def failing(symbol, start_date, end_date):
+        raise RuntimeError("provider down")
+
+    store = BarStore(root=str(tmp_path), fetcher=failing)
+    with pytest.raises(RuntimeError):
+        store.get_bars("600000", "2024-01-01", "2024-01-31")
+
+
+def test_partial_failure_serves_stored_bars(tmp_path):
+    provider = FakeProvider()
+    store = BarStore(root=str(tmp_path), fetcher=provider)
+    store.get_bars("600000", "2024-01-01", "2024-01-31")
+
+    def failing(symbol, start_date, end_date):
+        raise RuntimeError("provider down")
+
+    store._fetcher = failing
+    bars = store.get_bars("600000", "2024-01-15", "2024-02-15")
+    assert bars.index[0] == date(2024, 1, 15)
+    assert bars.index[-1] == date(2024, 1, 31)
+
+
+def test_recent_empty_answer_is_asked_again(tmp_path):
+    calls = []
+
+    def empty(symbol, start_date, end_date):
+        calls.append((start_date, end_date))
+        return pd.DataFrame()
+
+    store = BarStore(root=str(tmp_path), fetcher=empty, live_seconds=0)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=5)
+    store.get_bars("600000", start, end)
+    store.get_bars("600000", start, end)
+    assert len(calls) == 2
+
+    # Long past ranges without bars (holidays, before listing) are not fetched again
+    store.get_bars("600000", "2024-01-01", "2024-01-31")
+    store.get_bars("600000", "2024-01-01", "2024-01-31")
+    assert len(calls) == 3
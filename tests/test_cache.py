@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.cache import MISSING, TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is MISSING
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.peek("b") is MISSING
+    assert cache.peek("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_loads_share_one_call():
+    cache = TTLCache(ttl=60)
+    calls = []
+    started = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        first = pool.submit(cache.get_or_load, "key", loader)
+        started.wait()
+        others = [pool.submit(cache.get_or_load, "key", loader) for _ in range(7)]
+        results = [first.result()] + [f.result() for f in others]
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_loader_errors_are_not_cached():
+    cache = TTLCache(ttl=60)
+
+    def failing():
+        raise RuntimeError("upstream error")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("key", failing)
+    assert cache.get_or_load("key", lambda: "ok") == "ok"
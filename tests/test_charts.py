@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_charts import legacy_figure, make_bars
+from core.plotly_config import axis_values, typed_array
+from routes.charts import build_candlestick_figure
+
+
+@pytest.mark.parametrize("theme", ["dark", "light"])
+def test_direct_figure_matches_plotly_daily(theme):
+    frame = make_bars(50)
+    frame.iloc[3, 0] = np.nan
+    assert build_candlestick_figure(frame, theme) == legacy_figure(frame, theme)
+
+
+def test_direct_figure_matches_plotly_intraday_and_int_prices():
+    idx = pd.date_range("2024-01-02 09:31", periods=5, freq="min")
+    frame = pd.DataFrame({
+        "open": np.array([1, 2, 3, 4, 5], dtype=np.int64),
+        "high": np.array([10, 20, 30, 40, 300], dtype=np.int64),
+        "low": np.array([0, 1, 2, 3, 4], dtype=np.int64),
+        "close": np.array([1, 2, 3, 4, 70000], dtype=np.int64),
+    }, index=idx)
+    assert build_candlestick_figure(frame) == legacy_figure(frame)
+
+
+def test_empty_frame_matches_plotly():
+    frame = make_bars(1).iloc[:0]
+    assert build_candlestick_figure(frame) == legacy_figure(frame)
+
+
+def test_typed_array_and_axis_values():
+    assert typed_array(np.array([1.0]))["dtype"] == "f8"
+    assert typed_array(np.array([1, 2**40], dtype=np.int64)) == [1, 2**40]
+    assert typed_array(np.array(["a"], dtype=object)) == ["a"]
+    assert axis_values(pd.DatetimeIndex(["2024-01-02 09:30:00.5"])) == ["2024-01-02T09:30:00.500000"]
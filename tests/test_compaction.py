@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pandas as pd
+from prometheus_client import REGISTRY
+
+from core.compaction import compact, compact_contents, estimate_tokens
+
+
+def price_records(n):
+    dates = pd.bdate_range("2015-01-01", periods=n)
+    close = 50 + np.sin(np.arange(n) / 20) * 10
+    return [{"date": f"{d.date()}T00:00:00", "open": c * 1.001, "close": c, "volume": 1000 + i, "symbol": "00700",
+             "note": None} for i, (d, c) in enumerate(zip(dates, close))]
+
+
+def test_estimate_tokens_counts_cjk_characters_one_each():
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("腾讯控股") == 4
+
+
+def test_small_table_becomes_pruned_csv():
+    result = compact(json.dumps(price_records(5)), budget=1000)
+    lines = result.text.splitlines()
+    assert result.method == "csv"
+    assert lines[0] == "symbol: 00700"
+    assert lines[1] == "date,open,close,volume"
+    assert lines[2].startswith("2015-01-01,50.05,50,1000")
+    assert result.tokens_after < result.tokens_before
+
+
+def test_long_table_is_summarized_within_budget():
+    result = compact(json.dumps(price_records(3000)), budget=800)
+    assert result.method == "summary"
+    assert result.tokens_after <= 800 < result.tokens_before
+    assert "3000 rows. Summary of the numeric columns:" in result.text
+    assert "of 3000 rows:" in result.text
+
+
+def test_text_and_json_are_kept_or_cut():
+    assert compact("plain text", budget=100).method == "verbatim"
+    assert compact(json.dumps("| 证券简称 | 腾讯 |"), budget=100).text == "| 证券简称 | 腾讯 |"
+    assert compact(json.dumps({"名称": "腾讯", "pe": 20}), budget=100).text == '{"名称":"腾讯","pe":20}'
+    cut = compact("x" * 4000, budget=100)
+    assert cut.text.endswith("tokens omitted]") and cut.tokens_after < 150
+
+
+def test_compact_contents_shares_budget_and_counts_tokens():
+    def counted(stage):
+        return REGISTRY.get_sample_value("openbb_hka_prompt_data_tokens_total", {"stage": stage}) or 0
+
+    before, after = counted("before"), counted("after")
+    results = compact_contents([json.dumps(price_records(3000))] * 2, budget=1600)
+    assert all(r.tokens_after <= 800 for r in results)
+    assert counted("before") - before == sum(r.tokens_before for r in results)
+    assert counted("after") - after == sum(r.tokens_after for r in results)
+
+
+def test_nested_values_are_written_as_json():
+    news = [{"title": "a", "images": [{"url": "x"}], "source": {"name": "xq"}},
+            {"title": "b", "images": [{"url": "y"}], "source": {"name": "xq"}}]
+    result = compact(json.dumps(news), budget=1000)
+    assert result.method == "csv"
+    assert result.text.splitlines() == ['source: {"name":"xq"}', "title,images",
+                                        'a,"[{""url"":""x""}]"', 'b,"[{""url"":""y""}]"']
@@ -0,0 +1,110 @@
+import gzip
+import json
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core import compression
+from core.compression import ENCODERS, CompressionMiddleware, accepted_encodings, choose_encoding, compress
+from core.http_cache import StaticPayload, check_etag
+
+
+def make_app(payload):
+    app = FastAPI()
+
+    @app.get("/widgets.json")
+    def widgets(request: Request):
+        return payload.response(request)
+
+    return app
+
+
+def test_choose_encoding_honours_q_values_and_preference():
+    assert accepted_encodings("gzip;q=0.5, br") == {"gzip": 0.5, "br": 1.0}
+    assert choose_encoding("gzip, deflate", ENCODERS) == "gzip"
+    assert choose_encoding("gzip;q=0, identity", ENCODERS) is None
+    assert choose_encoding("", ENCODERS) is None
+    assert choose_encoding("*", ["gzip"]) == "gzip"
+    assert choose_encoding("gzip, br", ["gzip", "br"]) == "br"
+
+
+def test_compress_is_deterministic():
+    data = b'{"a": 1}' * 100
+    assert compress(data, "gzip") == compress(data, "gzip")
+    assert gzip.decompress(compress(data, "gzip")) == data
+
+
+def test_static_payload_serves_each_coding_with_its_own_etag():
+    content = {"hk/candles": {"name": "K线图", "gridData": {"w": 40, "h": 20}}}
+    payload = StaticPayload.build(content)
+    client = TestClient(make_app(payload))
+
+    plain = client.get("/widgets.json", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert json.loads(plain.content) == content
+
+    gzipped = client.get("/widgets.json", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert json.loads(gzipped.content) == content
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+
+    again = client.get("/widgets.json", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def make_compressed_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    rows = [{"symbol": f"{i:05d}", "name": "腾讯控股", "close": 500.0 + i} for i in range(200)]
+
+    @app.get("/prices")
+    def prices(request: Request, response: Response):
+        unchanged = check_etag(request, response, "prices", 1)
+        if unchanged is not None:
+            return unchanged
+        return rows
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"data: 1\n\n"] * 100), media_type="text/event-stream")
+
+    return app, rows
+
+
+def test_middleware_compresses_once_and_revalidates_weak_etag():
+    compression._compressed.clear()
+    app, rows = make_compressed_app()
+    client = TestClient(app)
+
+    first = client.get("/prices", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.headers["etag"].startswith('W/"')
+    assert int(first.headers["content-length"]) < len(json.dumps(rows))
+    assert first.json() == rows
+
+    second = client.get("/prices", headers={"Accept-Encoding": "gzip"})
+    assert second.json() == rows
+    stats = compression.compression_stats()
+    assert stats["gzip"]["cached"] >= 1
+    assert stats["gzip"]["ratio"] > 1
+
+    again = client.get("/prices", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_middleware_skips_small_streamed_and_unaccepted_responses():
+    app, _ = make_compressed_app()
+    client = TestClient(app)
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/prices", headers={"Accept-Encoding": "identity"}).headers
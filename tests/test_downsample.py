@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from core.downsample import default_max_points, downsample_line, downsample_ohlc, lttb_indices
+from core.registry import WIDGETS
+
+
+def daily_bars(n):
+    rng = np.random.default_rng(1)
+    close = 100 + rng.standard_normal(n).cumsum()
+    idx = pd.bdate_range("2000-01-03", periods=n)
+    return pd.DataFrame({
+        "open": close + 0.1,
+        "high": close + rng.random(n),
+        "low": close - rng.random(n),
+        "close": close,
+        "volume": np.full(n, 10.0),
+    }, index=pd.Index(idx.date, name="date"))
+
+
+def test_ohlc_buckets_preserve_extremes_and_totals():
+    frame = daily_bars(5000)
+    merged = downsample_ohlc(frame, 800)
+
+    assert len(merged) == 800
+    assert merged["high"].max() == frame["high"].max()
+    assert merged["low"].min() == frame["low"].min()
+    assert merged["volume"].sum() == frame["volume"].sum()
+    assert merged["open"].iloc[0] == frame["open"].iloc[0]
+    assert merged["close"].iloc[-1] == frame["close"].iloc[-1]
+    assert merged.index[0] == pd.Timestamp(frame.index[0])
+    assert merged.index.is_monotonic_increasing
+
+
+def test_small_frames_are_returned_unchanged():
+    frame = daily_bars(100)
+    assert downsample_ohlc(frame, 800) is frame
+    assert downsample_ohlc(frame, 0) is frame
+    assert downsample_line(frame, "close", 0) is frame
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    y[700] = -10.0
+    picked = lttb_indices(x, y, 50)
+
+    assert len(picked) == 50
+    assert picked[0] == 0 and picked[-1] == 999
+    assert 500 in picked and 700 in picked
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_lttb_skips_missing_values():
+    y = np.arange(100, dtype=float)
+    y[::7] = np.nan
+    picked = lttb_indices(np.arange(100), y, 10)
+    assert len(picked) == 10
+    assert not np.isnan(y[picked]).any()
+
+
+def test_line_downsampling_keeps_whole_rows():
+    frame = daily_bars(3000)
+    rows = downsample_line(frame, "close", 300)
+    assert len(rows) == 300
+    assert rows.equals(frame.loc[rows.index])
+
+
+def test_default_follows_widget_width(monkeypatch):
+    monkeypatch.setitem(WIDGETS, "test/candles", {"gridData": {"w": 40, "h": 20}})
+    assert default_max_points("test/candles") == 1000
+    assert default_max_points("missing/widget") == 0
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import pytest
+
+for name in ("AGENT_HOST_URL", "APP_API_KEY", "OPENROUTER_API_KEY", "FMP_API_KEY", "AKSHARE_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+from core.cache import TTLCache
+from fin_data import financials
+
+
+class Statements:
+    """Stands in for the provider: returns up to ``limit`` of ``history`` statements."""
+
+    def __init__(self, history=60):
+        self.history = history
+        self.calls = []
+        self.revenue = 100.0
+
+    def __call__(self, statement, symbol, period, limit):
+        self.calls.append((statement, symbol, period, limit))
+        rows = min(limit, self.history)
+        return pd.DataFrame({
+            "period_ending": pd.date_range("2025-12-31", periods=rows, freq="-1YE").strftime("%Y-%m-%d"),
+            "总营收": [self.revenue] * rows,
+        })
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    upstream = Statements()
+    monkeypatch.setattr(financials, "_fetch_statement", upstream)
+    monkeypatch.setattr(financials, "_statement_cache", TTLCache(ttl=60, maxsize=16, name="test_statement"))
+    monkeypatch.setattr(financials, "STATEMENT_HISTORY_LIMIT", 40)
+    return upstream
+
+
+def test_limits_are_sliced_from_one_fetch(statements):
+    assert len(financials.get_statement("income", "600028", "annual", 5)) == 5
+    assert len(financials.get_statement("income", "600028", "annual", 20)) == 20
+    assert len(financials.get_statement("income", "600028", "annual", 40)) == 40
+    assert statements.calls == [("income", "600028", "annual", 40)]
+
+
+def test_deeper_limit_refetches_once(statements):
+    financials.get_statement("income", "600028", "annual", 5)
+    assert len(financials.get_statement("income", "600028", "annual", 50)) == 50
+    assert len(financials.get_statement("income", "600028", "annual", 50)) == 50
+    assert len(financials.get_statement("income", "600028", "annual", 10)) == 10
+    assert [call[-1] for call in statements.calls] == [40, 50]
+
+
+def test_short_history_is_not_refetched(statements):
+    statements.history = 12
+    financials.get_statement("income", "600028", "annual", 5)
+    # The provider has fewer statements than asked for: a deeper limit gets the same
+    assert len(financials.get_statement("income", "600028", "annual", 50)) == 12
+    assert len(statements.calls) == 1
+
+
+def test_periods_and_statements_are_cached_apart(statements):
+    financials.get_statement("income", "600028", "annual", 5)
+    financials.get_statement("income", "600028", "quarter", 5)
+    financials.get_statement("balance", "600028", "annual", 5)
+    assert len(statements.calls) == 3
+
+
+def test_version_changes_only_with_the_content(statements):
+    first = financials.statement_version("income", "600028", "annual", 5)
+    assert financials.statement_version("income", "600028", "annual", 10) == first
+
+    # A refetch of the same statements keeps the version
+    financials._statement_cache.clear()
+    assert financials.statement_version("income", "600028", "annual", 5) == first
+
+    statements.revenue = 200.0
+    financials._statement_cache.clear()
+    assert financials.statement_version("income", "600028", "annual", 5) != first
+    assert len(statements.calls) == 3
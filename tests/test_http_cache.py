@@ -0,0 +1,52 @@
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from core.http_cache import check_etag, make_etag
+
+
+def make_app(state):
+    app = FastAPI()
+
+    @app.get("/table")
+    def table(request: Request, response: Response, ticker: str):
+        unchanged = check_etag(request, response, "table", ticker, state["version"])
+        if unchanged is not None:
+            return unchanged
+        state["builds"] += 1
+        return [{"ticker": ticker, "version": state["version"]}]
+
+    return app
+
+
+def test_make_etag_is_strong_and_depends_on_validators():
+    etag = make_etag("hk/prices", "00700", 1)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("hk/prices", "00700", 1)
+    assert etag != make_etag("hk/prices", "00700", 2)
+
+
+def test_conditional_get_skips_building_the_response():
+    state = {"version": 1, "builds": 0}
+    client = TestClient(make_app(state))
+
+    first = client.get("/table", params={"ticker": "00700"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get("/table", params={"ticker": "00700"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+    assert state["builds"] == 1
+
+    # weak and listed validators match too
+    listed = client.get("/table", params={"ticker": "00700"}, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert listed.status_code == 304
+
+    # new data, new ETag
+    state["version"] = 2
+    changed = client.get("/table", params={"ticker": "00700"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert state["builds"] == 2
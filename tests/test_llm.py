@@ -0,0 +1,65 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from core import llm
+
+
+def test_openai_client_is_shared_and_rebuilt_after_close(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("BASE_URL", "http://127.0.0.1:9/v1")
+    asyncio.run(llm.close_llm_clients())
+
+    client = llm.openai_client()
+    assert llm.openai_client() is client
+    assert client._client is llm.http_client()
+
+    asyncio.run(llm.close_llm_clients())
+    assert llm.openai_client() is not client
+    asyncio.run(llm.close_llm_clients())
+
+
+def test_start_llm_clients_tolerates_missing_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    asyncio.run(llm.close_llm_clients())
+    llm.start_llm_clients()
+    asyncio.run(llm.close_llm_clients())
+
+
+def test_stream_ttft_records_first_chunk_once():
+    def observations():
+        return REGISTRY.get_sample_value(
+            "openbb_hka_llm_time_to_first_token_seconds_count", {"agent": "test"}) or 0
+
+    async def chunks():
+        for chunk in ("a", "b", "c"):
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in llm.stream_ttft("test", chunks(), 0.0)]
+
+    before = observations()
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+    assert observations() == before + 1
+
+
+def test_openrouter_model_uses_the_shared_pool(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    asyncio.run(llm.close_llm_clients())
+
+    model = llm.openrouter_model()
+    assert llm.openrouter_model() is model
+    assert model._openrouter_openai_chat_model._async_client._client is llm.http_client()
+    asyncio.run(llm.close_llm_clients())
+
+
+def test_unknown_magentic_model_keeps_its_client(caplog):
+    class Model:
+        """A magentic model whose private client moved."""
+
+    model = Model()
+    asyncio.run(llm.close_llm_clients())
+    assert not llm._use_shared_client(model, llm.http_client())
+    assert vars(model) == {}
+    assert "keeping its own connection pool" in caplog.text
+    asyncio.run(llm.close_llm_clients())
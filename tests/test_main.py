@@ -1,7 +1,50 @@
-from main import get_apps
+import threading
+
+from fastapi.testclient import TestClient
+
+from core import providers
+from core.universe import universe
+from core.registry import WIDGETS
+from main import app, get_apps
 
 def test_get_apps(tmp_path):
     # Call the function and verify response
     data = get_apps()
     assert isinstance(data, list)
     assert len(data) > 0
+
+def test_widget_routes_are_instrumented():
+    # register_widget only times and traces a widget if the route serves its wrapper
+    routes = {route.path: route for route in app.routes if "GET" in getattr(route, "methods", ())}
+    for widget_id, widget in WIDGETS.items():
+        if widget.get("type") == "advanced_charting":
+            # The TradingView UDF base URL, served by the /udf/* routes
+            continue
+        route = routes["/" + widget["endpoint"].lstrip("/")]
+        assert hasattr(route.endpoint, "__wrapped__"), widget_id
+
+def test_full_provider_queue_is_a_503(monkeypatch):
+    pool = providers.ProviderPool("akshare", max_workers=1, max_queue=1)
+    monkeypatch.setitem(providers._pools, "akshare", pool)
+    # Search and symbol info only call the provider to load the universe
+    monkeypatch.setattr(universe, "_snapshot", None)
+    release = threading.Event()
+    running = threading.Event()
+    # One call running and one waiting: the queue is full
+    pool.submit(lambda: (running.set(), release.wait()))
+    running.wait()
+    pool.submit(lambda: None)
+    client = TestClient(app)
+    try:
+        responses = [
+            client.get("/udf/history", params={"symbol": "600000", "resolution": "D",
+                                               "from": 1704067200, "to": 1706659200}),
+            client.get("/udf/search", params={"query": "浦发"}),
+            client.get("/udf/symbols", params={"symbol": "600000"}),
+        ]
+    finally:
+        release.set()
+        pool.shutdown()
+    for response in responses:
+        assert response.status_code == 503, response.url
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,67 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from core.cache import TTLCache
+from core.metrics import MetricsMiddleware, metrics_response, provider_call
+from core.registry import register_widget
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/test/items/{item}")
+    @register_widget({"name": "Test", "endpoint": "test/metrics_widget"})
+    def items(item: str):
+        if item == "bad":
+            raise ValueError(item)
+        return {"item": item}
+
+    @app.get("/metrics")
+    def metrics():
+        return metrics_response()
+
+    return app
+
+
+def test_routes_and_widgets_are_timed_by_template():
+    client = TestClient(make_app(), raise_server_exceptions=False)
+    count = "openbb_hka_http_request_duration_seconds_count"
+    labels = {"method": "GET", "route": "/test/items/{item}", "status": "200"}
+    widget = "openbb_hka_widget_duration_seconds_count"
+    before = sample(count, **labels), sample(widget, widget="test/metrics_widget")
+    client.get("/test/items/a")
+    client.get("/test/items/b")
+    client.get("/test/items/bad")
+
+    assert sample(count, **labels) - before[0] == 2
+    assert sample(widget, widget="test/metrics_widget") - before[1] == 3
+    assert sample("openbb_hka_widget_errors_total", widget="test/metrics_widget", exception="ValueError") >= 1
+    assert sample("openbb_hka_widget_in_flight", widget="test/metrics_widget") == 0
+    assert "openbb_hka_http_requests_in_flight" in client.get("/metrics").text
+
+
+def test_provider_calls_and_caches_are_exported():
+    with provider_call("test", "obb.test.ok"):
+        pass
+    with pytest.raises(RuntimeError):
+        with provider_call("test", "obb.test.fail"):
+            raise RuntimeError("upstream down")
+    cache = TTLCache(ttl=60, name="test_metrics")
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    assert sample("openbb_hka_provider_call_duration_seconds_count", provider="test", function="obb.test.ok") >= 1
+    assert sample("openbb_hka_provider_call_errors_total",
+                  provider="test", function="obb.test.fail", exception="RuntimeError") >= 1
+    assert sample("openbb_hka_cache_hits_total", cache="test_metrics") == 1
+    assert sample("openbb_hka_cache_misses_total", cache="test_metrics") == 1
+    assert sample("openbb_hka_cache_size", cache="test_metrics") == 1
+    assert b"openbb_hka_cache_hits_total" in metrics_response().body
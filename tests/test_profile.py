@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import pytest
+
+for name in ("AGENT_HOST_URL", "APP_API_KEY", "OPENROUTER_API_KEY", "FMP_API_KEY", "AKSHARE_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+from core.cache import TTLCache
+from core.providers import ProviderPool
+from fin_data import profile
+
+
+class SlowQuotes:
+    """Stands in for xueqiu: each call takes ``delay`` seconds."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        with self._lock:
+            self.calls.append(symbol)
+        time.sleep(self.delay)
+        return {"代码": symbol, "现价": 1.0}
+
+
+@pytest.fixture
+def quotes(monkeypatch):
+    upstream = SlowQuotes()
+    monkeypatch.setattr(profile, "_get_quote_record", upstream)
+    monkeypatch.setattr(profile, "_quote_cache", TTLCache(ttl=60, maxsize=16, name="test_quote"))
+    pool = ProviderPool("test_xueqiu", max_workers=8, max_queue=0)
+    monkeypatch.setattr(profile, "get_pool", lambda provider: pool)
+    yield upstream
+    pool.shutdown()
+
+
+def test_symbols_are_fetched_in_parallel(quotes):
+    started = time.perf_counter()
+    result = profile.get_quote("00700,09988,03690,00700")
+    elapsed = time.perf_counter() - started
+    assert [r["代码"] for r in result] == ["00700", "09988", "03690"]
+    # Duplicates share one call, and the calls overlap
+    assert sorted(quotes.calls) == ["00700", "03690", "09988"]
+    assert elapsed < 2 * quotes.delay
+
+
+def test_concurrent_requests_share_one_call(quotes):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(profile.get_quote("00700"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert quotes.calls == ["00700"]
+    assert results == [[{"代码": "00700", "现价": 1.0}]] * 5
+
+
+def test_cached_symbols_skip_the_pool(quotes, monkeypatch):
+    profile._quote_cache.set("00700", {"代码": "00700", "现价": 2.0})
+    pool = profile.get_pool("xueqiu")
+    monkeypatch.setattr(pool, "submit", lambda *a, **k: pytest.fail("pool used"))
+    assert profile.get_quote("00700") == [{"代码": "00700", "现价": 2.0}]
+    assert quotes.calls == []
+
+
+def test_busy_pool_serves_the_cached_quotes(quotes, monkeypatch):
+    profile._quote_cache.set("00700", {"代码": "00700", "现价": 2.0})
+    pool = ProviderPool("busy_xueqiu", max_workers=1, max_queue=1)
+    monkeypatch.setattr(profile, "get_pool", lambda provider: pool)
+    release = threading.Event()
+    running = threading.Event()
+    # One call running and one waiting: the queue is full
+    pool.submit(lambda: (running.set(), release.wait()))
+    running.wait()
+    pool.submit(lambda: None)
+    try:
+        result = profile.get_quote("00700,09988")
+    finally:
+        release.set()
+        pool.shutdown()
+    assert result == [{"代码": "00700", "现价": 2.0}]
+    assert quotes.calls == []
+
+
+def test_failed_symbol_is_left_out(quotes, monkeypatch):
+    def flaky(symbol):
+        if symbol == "09988":
+            raise RuntimeError("xueqiu down")
+        return quotes(symbol)
+
+    monkeypatch.setattr(profile, "_get_quote_record", flaky)
+    assert [r["代码"] for r in profile.get_quote("00700,09988")] == ["00700"]
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.providers import ProviderBusyError, ProviderPool, get_pool, run_provider
+
+
+def test_pool_limits_concurrency_and_counts_calls():
+    pool = ProviderPool("test", max_workers=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def call(i):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(i)
+        return i
+
+    futures = [pool.submit(call, i) for i in range(6)]
+    assert [f.result() for f in futures] == list(range(6))
+    assert max(peak) == 2
+    stats = pool.stats()
+    assert stats["completed"] == 6
+    assert stats["queued"] == 0 and stats["active"] == 0
+    assert stats["max_queued"] >= 4
+    pool.shutdown()
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = ProviderPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    first = pool.submit(release.wait)
+    while pool.stats()["active"] == 0:
+        time.sleep(0.001)
+    second = pool.submit(lambda: "queued")
+    with pytest.raises(ProviderBusyError):
+        pool.submit(lambda: "rejected")
+    release.set()
+    assert first.result() is True
+    assert second.result() == "queued"
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_failed_calls_are_counted_and_raised():
+    pool = ProviderPool("test", max_workers=1)
+
+    def boom():
+        raise ValueError("upstream error")
+
+    with pytest.raises(ValueError):
+        pool.submit(boom).result()
+    assert pool.stats()["failed"] == 1
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_provider_keeps_event_loop_free(monkeypatch):
+    monkeypatch.setenv("PROVIDER_MAX_WORKERS_OVERLAP", "4")
+    assert get_pool("overlap").max_workers == 4
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    # distinct arguments, so the calls are not coalesced
+    results = await asyncio.gather(*(run_provider("overlap", time.sleep, 0.1 + i / 1000) for i in range(4)))
+    elapsed = time.perf_counter() - start
+    task.cancel()
+
+    assert results == [None] * 4
+    # the four blocking calls overlapped and the loop kept running meanwhile
+    assert elapsed < 0.3
+    assert ticks >= 5
@@ -0,0 +1,206 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from core import quote_hub, tracing
+from core.quote_hub import MARKET_TZ, QuoteHub, Subscriber, diff_quote, market_open, parse_symbols, poll_interval
+
+
+class FakeUpstream:
+    """Returns a scripted quote per call, counting the calls per symbol."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = {}
+
+    async def fetch(self, symbol):
+        n = self.calls.get(symbol, 0)
+        self.calls[symbol] = n + 1
+        price = self.prices[min(n, len(self.prices) - 1)]
+        if isinstance(price, Exception):
+            raise price
+        return {"代码": symbol, "现价": price, "股息率(TTM)": float("nan")}
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(quote_hub, "QUOTE_STREAM_OPEN_SECONDS", 0.01)
+    monkeypatch.setattr(quote_hub, "QUOTE_STREAM_CLOSED_SECONDS", 0.01)
+
+
+async def take(subscriber, n):
+    updates = subscriber.updates()
+    return [await asyncio.wait_for(updates.__anext__(), 1) for _ in range(n)]
+
+
+def test_one_poller_per_symbol_for_all_subscribers():
+    upstream = FakeUpstream([1.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        subscribers = [Subscriber() for _ in range(100)]
+        for subscriber in subscribers:
+            hub.subscribe(subscriber, ["00700", "09988"])
+        await asyncio.sleep(0.05)
+        running = hub.stats()
+        messages = [await take(subscriber, 1) for subscriber in subscribers]
+        await hub.close()
+        return running, hub.stats(), messages
+
+    running, stats, messages = asyncio.run(run())
+    assert running["HKEX"]["symbols"] == 2
+    assert running["HKEX"]["subscriptions"] == 200
+    # Polls keep going at the cadence, but per symbol, not per subscriber
+    assert upstream.calls["00700"] + upstream.calls["09988"] == stats["HKEX"]["polls"]
+    assert upstream.calls["00700"] < 20
+    assert all(m == [{"00700": {"代码": "00700", "现价": 1.0, "股息率(TTM)": pytest.approx(float("nan"), nan_ok=True)},
+                      "09988": {"代码": "09988", "现价": 1.0, "股息率(TTM)": pytest.approx(float("nan"), nan_ok=True)}}]
+               for m in messages)
+
+
+def test_only_changed_fields_are_sent():
+    upstream = FakeUpstream([1.0, 1.0, 2.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        subscriber = Subscriber()
+        hub.subscribe(subscriber, ["00700"])
+        messages = await take(subscriber, 2)
+        await hub.close()
+        return messages, hub.stats()
+
+    messages, stats = asyncio.run(run())
+    assert set(messages[0]["00700"]) == {"代码", "现价", "股息率(TTM)"}
+    # The unchanged refresh sends nothing, NaN included
+    assert messages[1] == {"00700": {"现价": 2.0}}
+    assert stats["HKEX"]["updates"] == 2
+
+
+def test_late_subscriber_gets_a_snapshot():
+    upstream = FakeUpstream([1.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        first, late = Subscriber(), Subscriber()
+        hub.subscribe(first, ["600028"])
+        await take(first, 1)
+        hub.subscribe(late, ["600028"])
+        messages = await take(late, 1)
+        await hub.close()
+        return messages
+
+    assert asyncio.run(run())[0]["600028"]["现价"] == 1.0
+
+
+def test_poller_stops_with_the_last_subscriber():
+    upstream = FakeUpstream([1.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        a, b = Subscriber(), Subscriber()
+        hub.subscribe(a, ["00700"])
+        hub.subscribe(b, ["00700"])
+        await asyncio.sleep(0.03)
+        hub.unsubscribe(a)
+        running = hub.stats()["HKEX"]["symbols"]
+        hub.unsubscribe(b)
+        calls = upstream.calls["00700"]
+        await asyncio.sleep(0.05)
+        return running, hub.stats()["HKEX"]["symbols"], calls, upstream.calls["00700"]
+
+    running, after, calls, later = asyncio.run(run())
+    assert (running, after) == (1, 0)
+    assert later == calls
+
+
+def test_failed_poll_is_retried():
+    upstream = FakeUpstream([RuntimeError("xueqiu down"), 3.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        subscriber = Subscriber()
+        hub.subscribe(subscriber, ["00700"])
+        messages = await take(subscriber, 1)
+        await hub.close()
+        return messages, hub.stats()
+
+    messages, stats = asyncio.run(run())
+    assert messages[0]["00700"]["现价"] == 3.0
+    assert stats["HKEX"]["errors"] == 1
+
+
+def test_stream_unsubscribes_when_closed():
+    upstream = FakeUpstream([1.0])
+
+    async def run():
+        hub = QuoteHub(upstream.fetch)
+        stream = hub.stream(["00700"])
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first, hub.stats()["HKEX"]["symbols"]
+
+    first, symbols = asyncio.run(run())
+    assert first["00700"]["现价"] == 1.0
+    assert symbols == 0
+
+
+def test_poller_spans_stay_out_of_the_request_trace():
+    upstream = FakeUpstream([1.0])
+
+    async def fetch(symbol):
+        with tracing.span("provider xueqiu"):
+            return await upstream.fetch(symbol)
+
+    async def run():
+        hub = QuoteHub(fetch)
+        # The SSE request whose subscriber starts the poller stays open
+        with tracing.span("GET /hk/quote/stream") as root:
+            hub.subscribe(Subscriber(), ["00700"])
+            await asyncio.sleep(0.05)
+            piled_up = len(tracing._open.get(root.trace_id, []))
+            await hub.close()
+        return piled_up
+
+    assert asyncio.run(run()) == 0
+    assert upstream.calls["00700"] > 1
+
+
+def test_websocket_ignores_frames_that_are_not_json(monkeypatch):
+    monkeypatch.setattr(quote_hub, "hub", QuoteHub(FakeUpstream([1.0]).fetch))
+    app = FastAPI()
+
+    @app.websocket("/quote/ws")
+    async def quotes(websocket: WebSocket):
+        await websocket.accept()
+        await quote_hub.serve_websocket(websocket, ["00700"])
+
+    with TestClient(app).websocket_connect("/quote/ws") as ws:
+        assert "00700" in ws.receive_json()
+        ws.send_text("not json")
+        ws.send_bytes(b"\xff")
+        ws.send_json(["09988"])
+        ws.send_json({"subscribe": "09988"})
+        assert "09988" in ws.receive_json()
+
+
+def test_cadence_follows_market_hours(monkeypatch):
+    monkeypatch.setattr(quote_hub, "QUOTE_STREAM_OPEN_SECONDS", 3)
+    monkeypatch.setattr(quote_hub, "QUOTE_STREAM_CLOSED_SECONDS", 300)
+    friday = datetime(2026, 10, 16, tzinfo=MARKET_TZ)
+    assert market_open("00700", friday.replace(hour=10))
+    # Lunch break
+    assert not market_open("00700", friday.replace(hour=12, minute=30))
+    # HKEX trades until 16:00, SSE until 15:00
+    assert poll_interval("00700", friday.replace(hour=15, minute=30)) == 3
+    assert poll_interval("600028", friday.replace(hour=15, minute=30)) == 300
+    assert poll_interval("600028", datetime(2026, 10, 17, 10, tzinfo=MARKET_TZ)) == 300
+
+
+def test_diff_and_parse():
+    nan = float("nan")
+    assert diff_quote({"a": 1, "b": nan}, {"a": 1, "b": nan, "c": 2}) == {"c": 2}
+    assert diff_quote({}, {"a": None}) == {"a": None}
+    assert parse_symbols(" 00700,09988,,00700 ") == ["00700", "09988"]
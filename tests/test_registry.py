@@ -72,4 +72,16 @@ def test_add_template_other_exception(tmp_path, monkeypatch):
     with mock.patch("builtins.open", side_effect=OSError("fail")):
         result = registry.add_template(template_name)
         assert result is False
-        assert template_name not in registry.TEMPLATES
\ No newline at end of file
+        assert template_name not in registry.TEMPLATES
+
+
+def test_frozen_payload_is_rebuilt_after_registration(monkeypatch):
+    monkeypatch.setattr(registry, "WIDGETS", {})
+    monkeypatch.setattr(registry, "_PAYLOADS", {})
+    first = registry.frozen_payload("widgets.json")
+    assert registry.frozen_payload("widgets.json") is first
+
+    registry.register_widget({"endpoint": "test/frozen"})(lambda: None)
+    rebuilt = registry.frozen_payload("widgets.json")
+    assert rebuilt.etag != first.etag
+    assert b"test/frozen" in rebuilt.body
@@ -0,0 +1,144 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import bar_store
+from core.bar_store import BarStore
+from core.resample import get_resampled_bars, parse_resolution, resample_bars
+
+
+def minute_bars(day, start, end):
+    idx = pd.date_range(f"{day} {start}", f"{day} {end}", freq="min")
+    n = len(idx)
+    return pd.DataFrame({
+        "open": np.arange(n, dtype=float),
+        "high": np.arange(n, dtype=float) + 1,
+        "low": np.arange(n, dtype=float) - 1,
+        "close": np.arange(n, dtype=float) + 0.5,
+        "volume": np.ones(n, dtype=np.int64),
+    }, index=idx)
+
+
+def session_day(day, exchange="SSE"):
+    close = "16:00" if exchange == "HKEX" else "15:00"
+    lunch = "12:00" if exchange == "HKEX" else "11:30"
+    return pd.concat([minute_bars(day, "09:31", lunch), minute_bars(day, "13:01", close)])
+
+
+def test_parse_resolution():
+    assert parse_resolution("15") == ("minute", 15)
+    assert parse_resolution("D") == ("day", 1)
+    assert parse_resolution("1d") == ("day", 1)
+    assert parse_resolution("2W") == ("week", 2)
+    assert parse_resolution("M") == ("month", 1)
+    with pytest.raises(ValueError):
+        parse_resolution("1S")
+
+
+def test_minute_bars_respect_lunch_break():
+    bars = resample_bars(session_day("2024-01-02"), "minute", 60, "SSE")
+    assert [t.strftime("%H:%M") for t in bars.index] == ["09:30", "10:30", "13:00", "14:00"]
+    assert bars["volume"].tolist() == [60, 60, 60, 60]
+    assert bars["volume"].dtype == np.int64
+
+    hk = resample_bars(session_day("2024-01-02", "HKEX"), "minute", 60, "HKEX")
+    assert [t.strftime("%H:%M") for t in hk.index] == ["09:30", "10:30", "11:30", "13:00", "14:00", "15:00"]
+    assert hk["volume"].tolist() == [60, 60, 30, 60, 60, 60]
+
+
+def test_minute_bars_aggregate_ohlcv():
+    frame = minute_bars("2024-01-02", "09:30", "09:39")
+    bars = resample_bars(frame, "minute", 5)
+    assert len(bars) == 2
+    first = bars.iloc[0]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (0.0, 5.0, -1.0, 4.5)
+
+
+def test_minute_interval_needs_intraday_data():
+    daily = pd.DataFrame({"close": [1.0, 2.0]}, index=pd.Index([date(2024, 1, 2), date(2024, 1, 3)]))
+    assert resample_bars(daily, "minute", 5).empty
+
+
+def test_calendar_intervals_on_daily_bars():
+    idx = pd.bdate_range("2024-01-01", "2024-03-29")
+    daily = pd.DataFrame({
+        "open": np.arange(len(idx), dtype=float),
+        "high": np.arange(len(idx), dtype=float),
+        "low": np.arange(len(idx), dtype=float),
+        "close": np.arange(len(idx), dtype=float),
+        "volume": np.full(len(idx), 10.0),
+    }, index=idx)
+
+    weeks = resample_bars(daily, "week", 1)
+    assert len(weeks) == 13
+    assert weeks.index[0] == pd.Timestamp("2024-01-01")
+    assert weeks["volume"].iloc[0] == 50.0
+
+    months = resample_bars(daily, "month", 1)
+    assert list(months.index) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01")]
+    assert months["close"].iloc[0] == daily.loc["2024-01-31", "close"]
+
+    assert len(resample_bars(daily, "month", 3)) == 1
+    assert len(resample_bars(daily, "year", 1)) == 1
+    five_days = resample_bars(daily, "day", 5)
+    assert len(five_days) == 13
+    assert five_days["volume"].iloc[0] == 50.0
+
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        resample_bars(minute_bars("2024-01-02", "09:30", "09:31"), "hour", 1)
+    with pytest.raises(ValueError):
+        resample_bars(minute_bars("2024-01-02", "09:30", "09:31"), "minute", 0)
+
+
+def test_resampled_bars_are_memoized_until_the_store_changes(tmp_path, monkeypatch):
+    calls = []
+
+    def fetcher(symbol, start_date, end_date):
+        calls.append((start_date, end_date))
+        idx = pd.bdate_range(start_date, end_date)
+        return pd.DataFrame({"close": np.arange(len(idx), dtype=float)}, index=pd.Index(idx.date, name="date"))
+
+    monkeypatch.setattr(bar_store, "bar_store", BarStore(root=str(tmp_path), fetcher=fetcher))
+
+    first = get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 1, 31))
+    again = get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 1, 31))
+    assert again is first
+    assert len(calls) == 1
+
+    # widening the range fills the store and produces a new frame
+    wider = get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 2, 29))
+    assert wider is not first
+    assert len(wider) > len(first)
+
+    # minute bars cannot be built from daily data
+    assert len(get_resampled_bars("600000", "minute", 5, date(2024, 1, 1), date(2024, 1, 31))) == 23
+    assert get_resampled_bars("600000", "minute", 5, date(2024, 1, 1), date(2024, 1, 31), strict=True).empty
+
+
+def test_memo_hit_does_not_read_the_store(tmp_path, monkeypatch):
+    def fetcher(symbol, start_date, end_date):
+        idx = pd.bdate_range(start_date, end_date)
+        return pd.DataFrame({"close": np.arange(len(idx), dtype=float)}, index=pd.Index(idx.date, name="date"))
+
+    store = BarStore(root=str(tmp_path), fetcher=fetcher)
+    monkeypatch.setattr(bar_store, "bar_store", store)
+    reads = []
+    slice_bars = store._slice
+    monkeypatch.setattr(store, "_slice", lambda *args: reads.append(args) or slice_bars(*args))
+
+    first = get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 1, 31))
+    assert get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 1, 31)) is first
+    assert len(reads) == 1
+
+
+def test_provider_error_is_raised_on_a_miss(tmp_path, monkeypatch):
+    def failing(symbol, start_date, end_date):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(bar_store, "bar_store", BarStore(root=str(tmp_path), fetcher=failing))
+    with pytest.raises(RuntimeError):
+        get_resampled_bars("600000", "week", 1, date(2024, 1, 1), date(2024, 1, 31))
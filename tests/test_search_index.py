@@ -0,0 +1,54 @@
+from core.search_index import SymbolIndex, pinyin_keys
+
+RECORDS = [
+    {"symbol": "601988", "name": "中国银行", "exchange": "SSE"},
+    {"symbol": "03988", "name": "中国银行", "exchange": "HKEX"},
+    {"symbol": "600036", "name": "招商银行", "exchange": "SSE"},
+    {"symbol": "000001", "name": "平安银行", "exchange": "SZSE"},
+    {"symbol": "000100", "name": "TCL科技", "exchange": "SZSE"},
+    {"symbol": "00700", "name": "腾讯控股", "exchange": "HKEX"},
+]
+
+
+def symbols(results):
+    return [r["symbol"] for r in results]
+
+
+def test_pinyin_keys():
+    assert pinyin_keys("中国银行") == ("zhongguoyinhang", "zgyh")
+    assert pinyin_keys("TCL科技") == ("tclkeji", "tclkj")
+
+
+def test_empty_query_returns_first_records():
+    index = SymbolIndex(RECORDS)
+    assert symbols(index.search("", 3)) == ["601988", "03988", "600036"]
+
+
+def test_pinyin_initials_and_full_pinyin():
+    index = SymbolIndex(RECORDS)
+    assert symbols(index.search("zgyh")) == ["601988", "03988"]
+    assert symbols(index.search("ZhongGuo")) == ["601988", "03988"]
+
+
+def test_ranking_exact_then_prefix_then_contains():
+    index = SymbolIndex(RECORDS)
+    assert symbols(index.search("000100")) == ["000100"]
+    # 000100 starts with the query, 000001 only contains it
+    assert symbols(index.search("0001")) == ["000100", "000001"]
+    # exact name match for one listing ranks before the prefix matches
+    assert symbols(index.search("tcl科技")) == ["000100"]
+    assert symbols(index.search("0036")) == ["600036"]
+
+
+def test_name_contains_and_prefix():
+    index = SymbolIndex(RECORDS)
+    assert symbols(index.search("中国")) == ["601988", "03988"]
+    assert symbols(index.search("银行")) == ["601988", "03988", "600036", "000001"]
+    assert symbols(index.search("yinhang")) == ["601988", "03988", "600036", "000001"]
+
+
+def test_limit_caps_results():
+    index = SymbolIndex(RECORDS)
+    assert len(index.search("银行", limit=2)) == 2
+    assert index.search("银行", limit=0) == []
+    assert index.search("不存在") == []
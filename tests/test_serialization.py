@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from core.serialization import encode_udf_history, udf_history_arrays
+
+
+def test_encode_udf_history_writes_nan_as_null():
+    frame = pd.DataFrame({
+        "Open": [1.0, np.nan],
+        "high": [2.0, 3.0],
+        "low": [0.5, 1.5],
+        "close": [1.5, 2.5],
+    }, index=pd.to_datetime(["2024-01-02", "2024-01-03"]))
+
+    body = json.loads(encode_udf_history(frame, {"open": "Open"}))
+
+    assert body == {
+        "s": "ok",
+        "t": [1704153600, 1704240000],
+        "o": [1.0, None],
+        "h": [2.0, 3.0],
+        "l": [0.5, 1.5],
+        "c": [1.5, 2.5],
+        "v": [None, None],
+    }
+
+
+def test_udf_history_arrays_handle_nullable_columns():
+    frame = pd.DataFrame(
+        {"close": pd.array([1, None], dtype="Int64")},
+        index=pd.to_datetime(["2024-01-02 09:30", "2024-01-02 09:31"]),
+    )
+    arrays = udf_history_arrays(frame)
+    assert arrays["t"].dtype == np.int64
+    assert np.isnan(arrays["c"][1])
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.providers import run_provider
+from core.singleflight import SingleFlight, call_key, get_flight, singleflight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+
+    def load(symbol):
+        calls.append(symbol)
+        release.wait()
+        return {"symbol": symbol}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do(("AAA",), load, "AAA")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    while flight.stats()["calls"] < 5:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["AAA"]
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "collapsed": 4, "inflight": 0}
+
+    # once finished, the next call executes again
+    flight.do(("AAA",), load, "AAA")
+    assert calls == ["AAA", "AAA"]
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def boom():
+        release.wait()
+        raise ValueError("upstream error")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", boom)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while flight.stats()["calls"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_unhashable_arguments_are_not_coalesced():
+    assert call_key(len, ([1, 2],), {}) is None
+    assert call_key(len, ("ab",), {}) == call_key(len, ("ab",), {})
+    assert call_key(len, ("ab",), {}) != call_key(len, ("abc",), {})
+
+
+def test_decorator_uses_named_group():
+    @singleflight("decorated")
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    assert double.__name__ == "double"
+    assert get_flight("decorated").stats()["executions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_provider_collapses_identical_calls():
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.05)
+        return symbol.lower()
+
+    results = await asyncio.gather(
+        *(run_provider("coalesce", fetch, "AAA") for _ in range(4)),
+        run_provider("coalesce", fetch, "BBB"),
+    )
+
+    assert results == ["aaa"] * 4 + ["bbb"]
+    assert sorted(calls) == ["AAA", "BBB"]
+    assert get_flight("coalesce").stats()["collapsed"] == 3
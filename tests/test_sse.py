@@ -0,0 +1,68 @@
+import asyncio
+
+from openbb_ai import message_chunk
+from prometheus_client import REGISTRY
+from sse_starlette.sse import ServerSentEvent
+
+from core.sse import coalesce, coalesce_settings, coalesced, encode_events
+
+
+async def deltas(texts, delay=0.0):
+    for text in texts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield text
+
+
+def collect(stream):
+    async def run():
+        return [item async for item in stream]
+    return asyncio.run(run())
+
+
+def test_burst_is_joined_after_the_first_delta():
+    texts = [f"t{i} " for i in range(50)]
+    batches = collect(coalesce(deltas(texts), window=0.05, max_bytes=0))
+    assert batches == [("t0 ", 1), ("".join(texts[1:]), 49)]
+
+
+def test_slow_stream_is_not_held_back():
+    batches = collect(coalesce(deltas(["a", "b", "c"], delay=0.03), window=0.005, max_bytes=0))
+    assert batches == [("a", 1), ("b", 1), ("c", 1)]
+
+
+def test_byte_limit_flushes_before_the_window():
+    batches = collect(coalesce(deltas(["腾讯"] * 7), window=10, max_bytes=12))
+    assert [count for _, count in batches] == [1, 2, 2, 2]
+    assert "".join(text for text, _ in batches) == "腾讯" * 7
+
+
+def test_zero_window_passes_deltas_through():
+    assert collect(coalesce(deltas(["a", "b"]), window=0, max_bytes=0)) == [("a", 1), ("b", 1)]
+
+
+def test_settings_per_endpoint(monkeypatch):
+    monkeypatch.setenv("SSE_COALESCE_MS_CHATGLM", "0")
+    monkeypatch.setenv("SSE_COALESCE_BYTES_CHATGLM", "64")
+    assert coalesce_settings("chatglm") == (0.0, 64)
+
+
+def test_coalesced_counts_events_and_tokens(monkeypatch):
+    monkeypatch.setenv("SSE_COALESCE_MS_TEST", "50")
+
+    def sample(name):
+        return REGISTRY.get_sample_value(name, {"endpoint": "test"}) or 0
+
+    before_events, before_tokens = sample("openbb_hka_sse_events_per_answer_sum"), sample("openbb_hka_sse_tokens_total")
+    assert "".join(collect(coalesced("test", deltas(["x"] * 20)))) == "x" * 20
+    assert sample("openbb_hka_sse_events_per_answer_sum") - before_events == 2
+    assert sample("openbb_hka_sse_tokens_total") - before_tokens == 20
+
+
+def test_encode_events_matches_event_source_response_encoding():
+    async def events():
+        yield message_chunk("你好")
+
+    encoded = collect(encode_events("test", events()))
+    assert encoded == [ServerSentEvent(**message_chunk("你好").model_dump()).encode()]
+    assert REGISTRY.get_sample_value("openbb_hka_sse_cpu_seconds_total", {"endpoint": "test"}) >= 0
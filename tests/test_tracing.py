@@ -0,0 +1,94 @@
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core import tracing
+from core.providers import ProviderPool
+from core.tracing import TracingMiddleware, span, to_otlp, traced
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Collect exported traces instead of writing them."""
+    traces = []
+    monkeypatch.setattr(tracing, "TRACE_FILE", "spans.jsonl")
+    monkeypatch.setattr(tracing, "_exporter", lambda: type("Sink", (), {"put": staticmethod(traces.append)}))
+    return traces
+
+
+def test_spans_nest_and_export_once_per_trace(exported):
+    @traced("fetch")
+    def fetch():
+        with span("provider obb.test", provider="test"):
+            return 1
+
+    with span("request") as root:
+        fetch()
+        with pytest.raises(ValueError):
+            with span("transform"):
+                raise ValueError("bad frame")
+
+    assert len(exported) == 1
+    spans = {s.name: s for s in exported[0]}
+    assert set(spans) == {"request", "fetch", "provider obb.test", "transform"}
+    assert spans["provider obb.test"].parent_id == spans["fetch"].span_id
+    assert spans["fetch"].parent_id == root.span_id
+    assert {s.trace_id for s in exported[0]} == {root.trace_id}
+    assert spans["transform"].error == "ValueError: bad frame"
+    assert tracing.current_span() is None
+
+
+def test_provider_pool_runs_in_the_callers_trace(exported):
+    pool = ProviderPool("tracing-test", max_workers=1)
+    try:
+        with span("request") as root:
+            assert pool.submit(tracing.current_span).result() is root
+    finally:
+        pool.shutdown()
+
+
+def test_slow_traces_are_logged_with_their_breakdown(monkeypatch, caplog):
+    monkeypatch.setattr(tracing, "TRACE_SLOW_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="core.tracing"):
+        with span("GET /hk/income"):
+            with span("provider obb.equity.fundamental.income"):
+                pass
+    assert "Slow GET /hk/income" in caplog.text
+    assert "  provider obb.equity.fundamental.income" in caplog.text
+
+
+def test_otlp_and_file_encoding(tmp_path):
+    with span("request", ticker="00700", limit=10) as root:
+        with span("serialize"):
+            pass
+    spans = [root]
+    request = to_otlp(spans)
+    encoded = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert encoded["traceId"] == root.trace_id and len(encoded["traceId"]) == 32
+    assert {"key": "limit", "value": {"intValue": "10"}} in encoded["attributes"]
+    assert "parentSpanId" not in encoded
+
+    exporter = tracing._Exporter.__new__(tracing._Exporter)
+    exporter.path, exporter.endpoint = str(tmp_path / "spans.jsonl"), ""
+    exporter.export(spans)
+    line = json.loads((tmp_path / "spans.jsonl").read_text().splitlines()[0])
+    assert line["name"] == "request" and line["attributes"]["ticker"] == "00700"
+
+
+def test_middleware_names_root_span_after_route(exported):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/hk/items/{item}")
+    def item(item: str):
+        with span("transform"):
+            return {"item": item}
+
+    TestClient(app).get("/hk/items/00700")
+    root = [s for s in exported[-1] if s.parent_id is None][0]
+    assert root.name == "GET /hk/items/{item}"
+    assert root.attributes["http.status_code"] == 200
+    assert any(s.name == "transform" and s.parent_id == root.span_id for s in exported[-1])
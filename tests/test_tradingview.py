@@ -1,6 +1,7 @@
 import sys
 import types
 import importlib
+import json
 import asyncio
 from types import SimpleNamespace
 import pytest
@@ -32,6 +33,12 @@ if "core.registry" not in sys.modules:
 
 # import the module under test
 tv = importlib.import_module("routes.tradingview")
+obb = sys.modules["openbb"].obb
+
+
+def payload(res):
+    """Decode a pre-encoded history response into a dict."""
+    return json.loads(res.body) if hasattr(res, "body") else res
 
 
 @pytest.mark.asyncio
@@ -39,7 +46,7 @@ async def test_provider_returns_none_results_in_no_data(monkeypatch):
     # historical returns None -> should result in {"s": "no_data"}
     def fake_historical(*a, **k):
         return SimpleNamespace(to_dataframe=lambda: None)
-    monkeypatch.setattr(tv.obb.equity.price, "historical", fake_historical)
+    monkeypatch.setattr(obb.equity.price, "historical", fake_historical)
     res = await tv.get_history(symbol="AAA", resolution="D", from_time=1577836800, to_time=1577923200)
     assert res == {"s": "no_data"}
 
@@ -56,10 +63,10 @@ async def test_daily_resolution_returns_ok_and_ohlcv(monkeypatch):
         "volume": [100, 200, 300],
     }, index=idx)
 
-    monkeypatch.setattr(tv.obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
+    monkeypatch.setattr(obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
     from_ts = int(pd.Timestamp("2020-01-01").timestamp())
     to_ts = int(pd.Timestamp("2020-01-03 23:59:59").timestamp())
-    res = await tv.get_history(symbol="AAA", resolution="D", from_time=from_ts, to_time=to_ts)
+    res = payload(await tv.get_history(symbol="AAA", resolution="D", from_time=from_ts, to_time=to_ts))
 
     assert res["s"] == "ok"
     assert len(res["t"]) == 3
@@ -78,7 +85,7 @@ async def test_numeric_minute_resolution_with_daily_data_returns_no_data(monkeyp
     # data spaced by 1 day -> numeric minute resolution should detect no intraday and return no_data
     idx = pd.date_range("2020-01-01", periods=5, freq="D")
     df = pd.DataFrame({"open": [1,2,3,4,5], "high":[1,2,3,4,5], "low":[1,2,3,4,5], "close":[1,2,3,4,5], "volume":[1,1,1,1,1]}, index=idx)
-    monkeypatch.setattr(tv.obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
+    monkeypatch.setattr(obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
     from_ts = int(pd.Timestamp("2020-01-01").timestamp())
     to_ts = int(pd.Timestamp("2020-01-05").timestamp())
     res = await tv.get_history(symbol="AAA", resolution="5", from_time=from_ts, to_time=to_ts)
@@ -97,10 +104,10 @@ async def test_numeric_minute_resolution_intraday_resamples_and_returns_ok(monke
         "volume": [10]*10
     }, index=idx)
 
-    monkeypatch.setattr(tv.obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
+    monkeypatch.setattr(obb.equity.price, "historical", lambda *a, **k: SimpleNamespace(to_dataframe=lambda: df))
     from_ts = int(pd.Timestamp("2020-01-02 09:30").timestamp())
     to_ts = int(pd.Timestamp("2020-01-02 09:39").timestamp())
-    res = await tv.get_history(symbol="AAA", resolution="5", from_time=from_ts, to_time=to_ts)
+    res = payload(await tv.get_history(symbol="AAA", resolution="5", from_time=from_ts, to_time=to_ts))
 
     assert res["s"] == "ok"
     # 10 minutes with 5T resampling -> expect 2 buckets
@@ -114,4 +121,40 @@ async def test_invalid_timestamps_raise_http_exception():
     # invalid from_time should raise HTTPException with status_code 400
     with pytest.raises(HTTPException) as exc:
         await tv.get_history(symbol="AAA", resolution="D", from_time="not_a_timestamp", to_time=1577923200)
-    assert exc.value.status_code == 400
\ No newline at end of file
+    assert exc.value.status_code == 400
+
+def use_universe(monkeypatch, frame):
+    from core.universe import build_snapshot
+    snapshot = build_snapshot(frame)
+
+    async def aget_universe():
+        return snapshot
+    monkeypatch.setattr(tv, "aget_universe", aget_universe)
+
+
+@pytest.mark.asyncio
+async def test_symbol_info_keeps_provider_columns(monkeypatch):
+    use_universe(monkeypatch, pd.DataFrame({
+        "symbol": ["00700", "600000"],
+        "name": ["腾讯控股", "浦发银行"],
+        "exchange": ["HKEX", "SSE"],
+        "precision": [3, 2],
+    }))
+    info = await tv.get_symbol_info(symbol="HKEX:00700")
+    assert (info["ticker"], info["exchange"], info["pricescale"]) == ("00700", "HKEX", 1000)
+    assert (await tv.get_symbol_info(symbol="600000"))["pricescale"] == 100
+
+
+@pytest.mark.asyncio
+async def test_symbol_info_falls_back_to_names_only(monkeypatch):
+    use_universe(monkeypatch, pd.DataFrame({
+        "symbol": ["601988", "600000"],
+        "name": ["中国银行", "浦发银行"],
+        "exchange": ["SSE", "SSE"],
+    }))
+    assert (await tv.get_symbol_info(symbol="中国银行"))["ticker"] == "601988"
+    # A prefix of a code or pinyin initials are not a match
+    for unknown in ("6019", "zgyh", "999999"):
+        with pytest.raises(HTTPException) as exc:
+            await tv.get_symbol_info(symbol=unknown)
+        assert exc.value.status_code == 404
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from core.universe import SymbolUniverse, build_snapshot
+
+
+def make_symbols(*rows):
+    return pd.DataFrame(list(rows), columns=["symbol", "name", "exchange"])
+
+
+def test_build_snapshot_splits_tickers_by_exchange():
+    snapshot = build_snapshot(make_symbols(
+        ("600000", "浦发银行", "SSE"),
+        ("00700", "腾讯控股", "HKEX"),
+        ("000001", "平安银行", "SZSE"),
+    ))
+
+    hk = snapshot.get_tickers("HKEX")
+    cn = snapshot.get_tickers()
+    assert [t["value"] for t in hk] == ["00700"]
+    assert [t["value"] for t in cn] == ["600000", "000001"]
+    assert hk[0] == {
+        "label": "腾讯控股",
+        "value": "00700",
+        "extraInfo": {"description": "00700", "rightOfDescription": "HKEX"},
+    }
+    assert snapshot.by_symbol["600000"]["name"] == "浦发银行"
+
+
+def test_build_snapshot_handles_missing_data():
+    snapshot = build_snapshot(None)
+    assert snapshot.frame.empty
+    assert snapshot.get_tickers("HKEX") == ()
+    assert snapshot.get_tickers() == ()
+
+
+def test_snapshot_is_loaded_once():
+    calls = []
+
+    def loader(use_cache):
+        calls.append(use_cache)
+        return make_symbols(("600000", "浦发银行", "SSE"))
+
+    universe = SymbolUniverse(loader, refresh_interval=0)
+    first = universe.snapshot()
+    second = universe.snapshot()
+
+    assert first is second
+    assert calls == [True]
+
+
+def test_refresh_swaps_snapshot_and_bypasses_provider_cache():
+    frames = [
+        make_symbols(("600000", "浦发银行", "SSE")),
+        make_symbols(("600000", "浦发银行", "SSE"), ("00700", "腾讯控股", "HKEX")),
+    ]
+    calls = []
+
+    def loader(use_cache):
+        calls.append(use_cache)
+        return frames[len(calls) - 1]
+
+    universe = SymbolUniverse(loader, refresh_interval=0)
+    old = universe.snapshot()
+    new = universe.refresh()
+
+    assert calls == [True, False]
+    assert universe.snapshot() is new
+    assert len(old.frame) == 1
+    assert len(new.frame) == 2
+
+
+def test_failed_or_empty_refresh_keeps_previous_snapshot():
+    results = [make_symbols(("600000", "浦发银行", "SSE")), make_symbols()]
+
+    def loader(use_cache):
+        return results.pop(0)
+
+    universe = SymbolUniverse(loader, refresh_interval=0)
+    old = universe.snapshot()
+    assert universe.refresh() is old
+
+    def failing_loader(use_cache):
+        raise RuntimeError("provider down")
+
+    universe._loader = failing_loader
+    with pytest.raises(RuntimeError):
+        universe.refresh()
+    assert universe.snapshot() is old
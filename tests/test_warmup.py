@@ -0,0 +1,29 @@
+from core import warmup
+
+
+def test_warmup_imports_modules_and_runs_tasks_once(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_timings", {})
+    monkeypatch.setattr(warmup, "_errors", {})
+    calls = []
+
+    def warm_layouts():
+        calls.append(1)
+
+    thread = warmup.start_warmup(("json", "no_such_module_xyz"), (warm_layouts,))
+    assert warmup.start_warmup(("json",)) is thread
+    thread.join(5)
+
+    stats = warmup.warmup_stats()
+    assert stats["done"]
+    assert set(stats["seconds"]) == {"json", "warm_layouts"}
+    assert "no_such_module_xyz" in stats["errors"]
+    assert calls == [1]
+
+
+def test_warmup_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(warmup, "_thread", None)
+    assert warmup.start_warmup() is None
+    assert not warmup.warmup_stats()["done"]
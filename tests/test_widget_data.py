@@ -0,0 +1,70 @@
+import asyncio
+
+from fastapi import FastAPI, HTTPException, Request
+from openbb_ai.models import Widget, WidgetParam, WidgetRequest
+
+from core import widget_data
+from core.registry import WIDGETS, register_widget
+
+
+def make_widget(widget_id, origin="OpenBB HKA", ticker="00700"):
+    return Widget(origin=origin, widget_id=widget_id, name=widget_id, description="",
+                  params=[WidgetParam(name="ticker", type="endpoint", description="", current_value=ticker)])
+
+
+def make_request(widget):
+    return WidgetRequest(widget=widget, input_arguments={p.name: p.current_value for p in widget.params})
+
+
+def make_app(calls):
+    app = FastAPI()
+
+    @app.get("/test/local_widget")
+    @register_widget({"name": "Local", "endpoint": "test/local_widget", "params": []})
+    async def local_widget(request: Request, ticker: str, limit: int = 5):
+        calls.append((ticker, limit, request.headers.get("authorization"), request.headers.get("accept-encoding")))
+        if ticker == "bad":
+            raise HTTPException(status_code=404, detail="unknown ticker")
+        return [{"ticker": ticker, "limit": limit}]
+
+    return app
+
+
+def test_split_widget_requests_by_registry_and_origin(monkeypatch):
+    app = make_app([])
+    try:
+        local = make_request(make_widget("test/local_widget"))
+        foreign = make_request(make_widget("other/widget"))
+        assert widget_data.split_widget_requests([local, foreign], app) == ([local], [foreign])
+
+        monkeypatch.setattr(widget_data, "LOCAL_WIDGET_ORIGINS", {"Elsewhere"})
+        assert widget_data.split_widget_requests([local], app) == ([], [local])
+    finally:
+        WIDGETS.pop("test/local_widget", None)
+
+
+def test_registered_widget_without_a_get_route_is_foreign():
+    app = make_app([])
+    # Like the TradingView widget, whose endpoint is the base URL of the /udf/* routes
+    register_widget({"name": "Chart", "type": "advanced_charting", "endpoint": "/test_udf"})(lambda: None)
+    try:
+        chart = make_request(make_widget("/test_udf"))
+        assert widget_data.local_endpoint(chart.widget) == "/test_udf"
+        assert widget_data.split_widget_requests([chart], app) == ([], [chart])
+    finally:
+        WIDGETS.pop("test/local_widget", None)
+        WIDGETS.pop("/test_udf", None)
+
+
+def test_fetch_local_widget_data_calls_the_app():
+    calls = []
+    app = make_app(calls)
+    try:
+        requests = [make_request(make_widget("test/local_widget", ticker=t)) for t in ("00700", "bad")]
+        results = asyncio.run(widget_data.fetch_local_widget_data(app, requests, api_key="secret"))
+    finally:
+        WIDGETS.pop("test/local_widget", None)
+
+    assert results[0] == '[{"ticker":"00700","limit":5}]'
+    assert "HTTP 404" in results[1]
+    assert sorted(calls) == [("00700", 5, "Bearer secret", "identity"), ("bad", 5, "Bearer secret", "identity")]